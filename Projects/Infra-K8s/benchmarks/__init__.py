@@ -0,0 +1,13 @@
+"""
+⏱️ Benchmarks - Threading vs Multiprocessing y modos de procesamiento
+
+- corpus: corpora de imágenes fijas (generadas con semilla o desde un directorio)
+- runner: escenarios con warm-up + repeticiones, percentiles, RSS y baselines
+- threading_vs_mp.py: CLI principal (barrido + comparación contra baseline)
+- fused_chain.py, batch_tensor.py, warm_pool.py: micro-benchmarks puntuales
+
+runner importa image_api (y con él lee los flags de cache del entorno), por
+eso no se importa aquí: el CLI fija el entorno antes de cargarlo.
+"""
+
+__version__ = "1.0.0"
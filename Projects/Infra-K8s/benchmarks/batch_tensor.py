@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+📦 Benchmark: cadena por imagen vs BatchTensorExecutor
+
+Para cada tamaño de lote (por defecto 8, 32 y 128 copias de la misma imagen,
+igual que el stress test que cicla sobre las mismas fuentes) mide el throughput de:
+- per_image: FilterFactory.apply_filter_chain(in_memory=True) una vez por imagen
+- fused:     FusedChainExecutor una vez por imagen (mismas operaciones ndarray)
+- batch:     BatchTensorExecutor sobre el lote completo
+
+Uso (desde Projects/Infra-K8s):
+    python benchmarks/batch_tensor.py
+    python benchmarks/batch_tensor.py --sizes 8 32 128 --chain resize brightness sharpen grayscale
+"""
+
+import os
+import sys
+import time
+import argparse
+import contextlib
+import io
+import json
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from image_api.filters import FilterFactory
+from image_api.fused import FusedChainExecutor
+from image_api.batch import BatchTensorExecutor
+
+DEFAULT_CHAIN = ['resize', 'brightness', 'sharpen', 'grayscale']
+
+
+def time_call(func):
+    """⏱️ Una ejecución silenciosa, devuelve segundos"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        func()
+        return time.perf_counter() - start
+
+
+def run_benchmark(image_path, chain, sizes, save):
+    fused = FusedChainExecutor(chain)
+    batch = BatchTensorExecutor(chain)
+
+    # Warm-up (imports perezosos, caches de OpenCV)
+    time_call(lambda: batch.run([image_path] * 2, save=False))
+    time_call(lambda: fused.run(image_path, save=False))
+
+    print(f"🖼️ Image: {image_path}, chain: {'->'.join(chain)}, save={save}")
+    print(f"{'batch':>6} {'per_image img/s':>16} {'fused img/s':>12} {'batch img/s':>12} {'vs per_image':>13} {'vs fused':>9}")
+
+    rows = []
+    for size in sizes:
+        paths = [image_path] * size
+
+        def per_image_path():
+            for path in paths:
+                FilterFactory._apply_filter_chain_in_memory(path, chain, save_final=save,
+                                                            use_prefix_cache=False)
+
+        per_image_s = time_call(per_image_path)
+        fused_s = time_call(lambda: [fused.run(path, save=save) for path in paths])
+        batch_s = time_call(lambda: batch.run(paths, save=save))
+
+        row = {
+            'batch_size': size,
+            'per_image_s': per_image_s,
+            'fused_s': fused_s,
+            'batch_s': batch_s,
+            'per_image_throughput': size / per_image_s,
+            'fused_throughput': size / fused_s,
+            'batch_throughput': size / batch_s,
+            'speedup_vs_per_image': per_image_s / batch_s,
+            'speedup_vs_fused': fused_s / batch_s,
+        }
+        rows.append(row)
+        print(f"{size:>6} {row['per_image_throughput']:>16.1f} {row['fused_throughput']:>12.1f} "
+              f"{row['batch_throughput']:>12.1f} {row['speedup_vs_per_image']:>12.2f}x "
+              f"{row['speedup_vs_fused']:>8.2f}x")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch tensor filter benchmark")
+    parser.add_argument('--image', default='static/images/sample_4k.jpg')
+    parser.add_argument('--chain', nargs='+', default=DEFAULT_CHAIN)
+    parser.add_argument('--sizes', nargs='+', type=int, default=[8, 32, 128])
+    parser.add_argument('--save', action='store_true', help='Codificar cada resultado a disco')
+    parser.add_argument('--json', help='Guardar resultados en un archivo JSON')
+    args = parser.parse_args()
+
+    rows = run_benchmark(args.image, args.chain, args.sizes, args.save)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'image': args.image, 'chain': args.chain, 'rows': rows}, f, indent=2)
+        print(f"💾 Results: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+🖼️ Corpus de benchmark - imágenes fijas y reproducibles
+
+Los benchmarks tienen que medir siempre las mismas imágenes: un corpus se
+genera de forma determinista (semilla fija: gradientes + ruido + formas, que
+comprimen como una foto y no como un color plano) y se guarda en
+benchmarks/corpora/<nombre>/. Si ya existe con el mismo manifiesto no se
+regenera. También se puede usar un directorio existente (p.ej. static/images).
+"""
+
+import os
+import json
+import hashlib
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+from PIL import Image
+
+CORPORA_DIR = Path(__file__).resolve().parent / 'corpora'
+
+# nombre -> (ancho, alto, número de imágenes)
+CORPUS_SIZES = {
+    'small': (640, 480, 8),
+    'hd': (1920, 1080, 8),
+    '4k': (3840, 2160, 4),
+}
+
+CORPUS_SEED = 2024
+JPEG_QUALITY = 90
+
+
+def _synthetic_image(width: int, height: int, rng: np.random.Generator) -> np.ndarray:
+    """🎨 RGB uint8 con estructura de foto: gradiente + bloques + ruido"""
+    y = np.linspace(0, 1, height, dtype=np.float32)[:, None]
+    x = np.linspace(0, 1, width, dtype=np.float32)[None, :]
+    phase = rng.uniform(0, 2 * np.pi, size=3)
+    channels = [
+        0.5 + 0.5 * np.sin(2 * np.pi * (x * rng.uniform(1, 4) + y * rng.uniform(1, 4)) + phase[c])
+        for c in range(3)
+    ]
+    image = np.stack(channels, axis=-1) * 200
+
+    # Rectángulos de color: bordes reales para edges/sharpen
+    for _ in range(12):
+        x0, y0 = rng.integers(0, width - 1), rng.integers(0, height - 1)
+        x1 = min(width, x0 + int(rng.integers(width // 20, width // 4)))
+        y1 = min(height, y0 + int(rng.integers(height // 20, height // 4)))
+        image[y0:y1, x0:x1] = rng.uniform(0, 255, size=3)
+
+    image += rng.normal(0, 12, size=(height, width, 3))
+    return np.clip(image, 0, 255).astype(np.uint8)
+
+
+def _manifest(name: str, width: int, height: int, count: int) -> Dict:
+    return {'name': name, 'width': width, 'height': height, 'count': count,
+            'seed': CORPUS_SEED, 'quality': JPEG_QUALITY}
+
+
+def build_corpus(name: str, force: bool = False) -> List[str]:
+    """
+    🏗️ Generar (o reutilizar) el corpus `name` de CORPUS_SIZES
+
+    Returns:
+        Rutas de las imágenes, en orden estable
+    """
+    width, height, count = CORPUS_SIZES[name]
+    corpus_dir = CORPORA_DIR / name
+    manifest_path = corpus_dir / 'manifest.json'
+    manifest = _manifest(name, width, height, count)
+
+    if not force and manifest_path.exists():
+        existing = json.loads(manifest_path.read_text())
+        paths = [corpus_dir / f for f in existing.get('files', [])]
+        if {k: existing.get(k) for k in manifest} == manifest and all(p.exists() for p in paths):
+            return [str(p) for p in paths]
+
+    corpus_dir.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng([CORPUS_SEED, width, height])
+    files, digests = [], {}
+    for i in range(count):
+        filename = f'{name}_{i:03d}.jpg'
+        path = corpus_dir / filename
+        Image.fromarray(_synthetic_image(width, height, rng)).save(path, 'JPEG', quality=JPEG_QUALITY)
+        files.append(filename)
+        digests[filename] = hashlib.sha256(path.read_bytes()).hexdigest()[:16]
+
+    manifest.update(files=files, sha256=digests)
+    manifest_path.write_text(json.dumps(manifest, indent=2))
+    print(f"🖼️ Corpus '{name}': {count} x {width}x{height} -> {corpus_dir}")
+    return [str(corpus_dir / f) for f in files]
+
+
+def select_corpus(directory: str, extensions=('.jpg', '.jpeg', '.png', '.webp')) -> List[str]:
+    """📁 Corpus a partir de un directorio existente (orden alfabético)"""
+    return sorted(str(p) for p in Path(directory).iterdir() if p.suffix.lower() in extensions)
+
+
+def load_corpus(spec: str) -> List[str]:
+    """
+    🔎 `spec` es un nombre de CORPUS_SIZES o la ruta a un directorio de imágenes
+    """
+    if spec in CORPUS_SIZES:
+        return build_corpus(spec)
+    if os.path.isdir(spec):
+        paths = select_corpus(spec)
+        if paths:
+            return paths
+        raise ValueError(f"Corpus vacío: {spec}")
+    raise ValueError(f"Corpus desconocido '{spec}'. Disponibles: {list(CORPUS_SIZES)} o un directorio")
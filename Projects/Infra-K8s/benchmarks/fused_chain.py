@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+⚡ Benchmark: cadena clásica (PIL <-> cv2) vs FusedChainExecutor
+
+Compara, por cadena de filtros:
+- Tiempo medio de la cadena clásica (path-based), la clásica in_memory y la fusionada
+- Antes de medir, que la salida fusionada coincida con la clásica (si no,
+  se estaría cronometrando otro trabajo): sin speedup y código de salida 1
+- Pico de memoria asignada (tracemalloc) de la clásica y la fusionada, medido
+  igual en ambos caminos; el speedup compara solo tiempos
+
+Uso (desde Projects/Infra-K8s):
+    python benchmarks/fused_chain.py
+    python benchmarks/fused_chain.py --image static/images/sample_4k.jpg --repeat 5
+"""
+
+import os
+import sys
+import time
+import argparse
+import contextlib
+import io
+import statistics
+import tracemalloc
+
+import cv2
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Cada repetición debe recalcular la cadena: sin reanudar desde el PrefixCache
+os.environ.setdefault('PREFIX_CACHE_ENABLED', '0')
+
+from PIL import Image
+
+from image_api.filters import FilterFactory
+from image_api.fused import FusedChainExecutor
+
+# Tolerancia de equivalencia: diferencia media y % de píxeles con diferencia > 2 niveles
+MATCH_MAX_MEAN_DIFF = 0.5
+MATCH_MAX_OFF_PERCENT = 0.1
+
+DEFAULT_CHAINS = [
+    ['resize', 'sharpen', 'brightness', 'edges'],
+    ['resize', 'blur', 'brightness'],
+    ['sharpen', 'edges'],
+    ['blur', 'sharpen', 'brightness'],
+]
+
+
+def traced_peak_bytes(func):
+    """
+    📏 Pico de memoria asignada durante func() según tracemalloc
+
+    Se mide igual en los dos caminos: buffers NumPy/OpenCV (numpy los registra
+    en tracemalloc) y objetos Python. Los buffers internos de PIL no pasan por
+    tracemalloc, así que en el camino clásico (PIL) la cifra es una cota inferior.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        func()  # Warm-up: imports y caches perezosos fuera de la medición
+        tracemalloc.start()
+        try:
+            tracemalloc.reset_peak()
+            func()
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+
+def compare_outputs(image_path, chain, executor):
+    """
+    🔎 Diferencia entre la salida clásica (in_memory) y la fusionada
+
+    Returns:
+        (coincide, diferencia máxima, diferencia media, % de píxeles con diferencia > 2)
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        classic = FilterFactory.apply_filter_chain(image_path, chain, in_memory=True)['final_image']
+        fused = executor.run(image_path, save=False)['final_image']
+    classic = np.asarray(classic.convert('RGB'), dtype=np.int16)
+    fused = cv2.cvtColor(fused, cv2.COLOR_GRAY2RGB if fused.ndim == 2 else cv2.COLOR_BGR2RGB).astype(np.int16)
+    if classic.shape != fused.shape:
+        return False, 255, 255.0, 100.0
+    diff = np.abs(classic - fused)
+    mean_diff, off_percent = float(diff.mean()), float((diff > 2).mean() * 100)
+    ok = mean_diff <= MATCH_MAX_MEAN_DIFF and off_percent <= MATCH_MAX_OFF_PERCENT
+    return ok, int(diff.max()), mean_diff, off_percent
+
+
+def time_call(func, repeat):
+    """⏱️ Warm-up + N repeticiones, devuelve la media en segundos"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        func()
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            samples.append(time.perf_counter() - start)
+    return statistics.mean(samples)
+
+
+def run_benchmark(image_path, chains, repeat):
+    with Image.open(image_path) as img:
+        width, height = img.size
+
+    print(f"🖼️ Image: {image_path} ({width}x{height}), repeat={repeat}")
+    print(f"{'chain':<36} {'legacy':>9} {'in_mem':>9} {'fused':>9} {'speedup':>8} "
+          f"{'legacy peak MB':>15} {'fused peak MB':>14}")
+
+    rows = []
+    for chain in chains:
+        executor = FusedChainExecutor(chain)
+        ok, max_diff, mean_diff, off_percent = compare_outputs(image_path, chain, executor)
+        if not ok:
+            print(f"{'->'.join(chain):<36} ❌ MISMATCH: fused output differs from classic "
+                  f"(max {max_diff}, mean {mean_diff:.2f}, {off_percent:.2f}% px > 2) - not timed")
+            rows.append({'chain': chain, 'match': False, 'max_diff': max_diff, 'mean_diff': mean_diff})
+            continue
+
+        legacy = time_call(lambda: FilterFactory.apply_filter_chain(image_path, chain), repeat)
+        in_memory = time_call(lambda: FilterFactory.apply_filter_chain(image_path, chain, in_memory=True), repeat)
+        fused = time_call(lambda: executor.run(image_path), repeat)
+
+        legacy_peak = traced_peak_bytes(lambda: FilterFactory.apply_filter_chain(image_path, chain))
+        fused_peak = traced_peak_bytes(lambda: executor.run(image_path, save=False))
+
+        row = {
+            'chain': chain,
+            'match': True,
+            'max_diff': max_diff,
+            'mean_diff': mean_diff,
+            'legacy_s': legacy,
+            'in_memory_s': in_memory,
+            'fused_s': fused,
+            'speedup': legacy / fused if fused > 0 else 0.0,
+            'legacy_peak_bytes': legacy_peak,
+            'fused_peak_bytes': fused_peak,
+        }
+        rows.append(row)
+        print(f"{'->'.join(chain):<36} {legacy:>8.3f}s {in_memory:>8.3f}s {fused:>8.3f}s "
+              f"{row['speedup']:>7.2f}x {legacy_peak / 1e6:>15.1f} {fused_peak / 1e6:>14.1f}")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fused filter chain benchmark")
+    parser.add_argument('--image', default='static/images/sample_4k.jpg')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    rows = run_benchmark(args.image, DEFAULT_CHAINS, args.repeat)
+    if not all(row['match'] for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
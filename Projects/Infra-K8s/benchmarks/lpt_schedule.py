@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+📐 Benchmark: orden de la lista (FIFO) vs LPT scheduler en lotes mixtos
+
+Lote con imágenes pequeñas y una grande al FINAL (el peor caso FIFO: el
+straggler empieza cuando los demás workers ya casi han terminado). Mide el
+makespan real de process_batch_multiprocessing con y sin scheduler y lo
+compara con el previsto por el modelo de coste.
+
+Uso (desde Projects/Infra-K8s):
+    python benchmarks/lpt_schedule.py
+    python benchmarks/lpt_schedule.py --workers 4 --small 12 --large 2 --chain sharpen edges
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('RESULT_CACHE_ENABLED', '0')
+os.environ.setdefault('PREFIX_CACHE_ENABLED', '0')
+
+from benchmarks.corpus import build_corpus
+from benchmarks.runner import silenced_stdout, processed_files
+from image_api.processors import ImageProcessor
+from image_api.pool import WarmProcessPool
+
+
+def mixed_batch(small: int, large: int):
+    """🖼️ Pequeñas primero, grandes al final"""
+    small_paths = build_corpus('small')
+    large_paths = build_corpus('4k')
+    return ([small_paths[i % len(small_paths)] for i in range(small)]
+            + [large_paths[i % len(large_paths)] for i in range(large)])
+
+
+def measure(processor, paths, chain, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        processor.process_batch_multiprocessing(paths, chain)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def run_benchmark(workers, small, large, chain, repeat):
+    paths = mixed_batch(small, large)
+    before = processed_files()
+    pool = WarmProcessPool(max_workers=workers)
+    try:
+        with silenced_stdout():
+            pool.warm_up()
+            fifo = ImageProcessor(use_cache=False, process_pool=pool, use_scheduler=False)
+            lpt = ImageProcessor(use_cache=False, process_pool=pool, use_scheduler=True)
+            measure(lpt, paths, chain, 1)  # Warm-up (headers, caches de OpenCV)
+            fifo_s = measure(fifo, paths, chain, repeat)
+            lpt_s = measure(lpt, paths, chain, repeat)
+    finally:
+        pool.shutdown()
+        for path in processed_files() - before:
+            path.unlink()
+
+    plan = lpt.last_schedule
+    print(f"📐 {small} small + {large} large, chain {'->'.join(chain)}, {workers} workers "
+          f"(cpu_count={os.cpu_count()})")
+    print(f"   predicted makespan: FIFO {plan['predicted_makespan']['fifo']:.3f}s  "
+          f"LPT {plan['predicted_makespan']['lpt']:.3f}s  ({plan['predicted_makespan']['improvement']})")
+    print(f"   measured makespan:  FIFO {fifo_s:.3f}s  LPT {lpt_s:.3f}s  ({fifo_s / lpt_s:.2f}x)")
+    if plan['split']:
+        print(f"   split: {plan['split']}")
+    return {'fifo_s': fifo_s, 'lpt_s': lpt_s, 'plan': plan}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LPT scheduling benchmark")
+    parser.add_argument('--workers', type=int, default=max(2, os.cpu_count() or 1))
+    parser.add_argument('--small', type=int, default=8)
+    parser.add_argument('--large', type=int, default=1)
+    parser.add_argument('--chain', nargs='+', default=['sharpen', 'edges'])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    run_benchmark(args.workers, args.small, args.large, args.chain, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+🧩 Benchmark: cadenas con prefijo compartido y PrefixCache
+
+Ejecuta cadenas que comparten prefijo (resize -> blur -> ...) sobre la misma
+imagen, en modo normal y lean, y muestra tiempo, prefijo reanudado, memoria
+estable (incluida la retenida por el cache) y los contadores del PrefixCache.
+En lean solo se cachea la cadena completa, así que la primera cadena es el
+prefijo de las demás: si algún modo no registra hits el script sale con
+código 1.
+
+Uso (desde Projects/Infra-K8s):
+    python benchmarks/prefix_cache.py
+    python benchmarks/prefix_cache.py --image static/images/sample_4k.jpg
+"""
+
+import os
+import sys
+import time
+import argparse
+import contextlib
+import io
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from image_api.cache import get_prefix_cache
+from image_api.filters import FilterFactory
+
+DEFAULT_CHAINS = [
+    ['resize', 'blur'],
+    ['resize', 'blur', 'sharpen'],
+    ['resize', 'blur', 'edges'],
+]
+
+
+def run_chain(image_path, chain, lean):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = FilterFactory.apply_filter_chain(image_path, chain, in_memory=True, lean=lean)
+    return time.perf_counter() - start, result
+
+
+def run_benchmark(image_path, chains):
+    cache = get_prefix_cache()
+    print(f"🖼️ Image: {image_path}, prefix cache budget {cache.max_bytes / 1e6:.0f}MB")
+    print(f"{'mode':<7} {'chain':<30} {'time':>8} {'resumed':>8} {'steady MB':>10} {'cached MB':>10}")
+
+    ok = True
+    for lean in (False, True):
+        cache.clear()
+        before = cache.get_stats()
+        for chain in chains:
+            elapsed, result = run_chain(image_path, chain, lean)
+            memory = result.get('memory', {})
+            print(f"{'lean' if lean else 'normal':<7} {'->'.join(chain):<30} {elapsed:>7.3f}s "
+                  f"{result.get('prefix_cache_resumed', 0):>8} {memory.get('steady_image_bytes', 0) / 1e6:>10.1f} "
+                  f"{memory.get('prefix_cache_bytes', 0) / 1e6:>10.1f}")
+        after = cache.get_stats()
+        inserts = after['inserts'] - before['inserts']
+        hits = after['hits'] - before['hits']
+        print(f"        inserts={inserts} hits={hits} bytes={after['bytes'] / 1e6:.1f}MB")
+        if len(chains) > 1 and hits == 0:
+            print(f"❌ {'lean' if lean else 'normal'} chains sharing a prefix recorded no prefix cache hit")
+            ok = False
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prefix cache benchmark")
+    parser.add_argument('--image', default='static/images/sample_4k.jpg')
+    args = parser.parse_args()
+
+    if not run_benchmark(args.image, DEFAULT_CHAINS):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+"""
+⏱️ Benchmark runner - escenarios, repeticiones, percentiles y baselines
+
+Un escenario es (corpus, cadena de filtros, modo, workers). Para cada uno:
+- warm-up (pool arrancado, imports, caches de OpenCV) fuera de la medición
+- N repeticiones del lote completo con perf_counter
+- p50/p95/p99 del tiempo de lote y de la latencia por imagen, throughput
+  y pico de RSS (proceso + hijos si psutil está disponible)
+
+Los resultados se guardan como JSON; compare_to_baseline() marca como
+regresión cualquier métrica que empeore más que el umbral configurado.
+"""
+
+import os
+import sys
+import time
+import json
+import platform
+import threading
+import statistics
+import contextlib
+import io
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from image_api.processors import ImageProcessor
+from image_api.pool import WarmProcessPool
+
+PROCESSED_DIR = Path('static/processed')
+
+# Métricas vigiladas contra el baseline: ruta en el escenario -> True si "más alto es mejor"
+REGRESSION_METRICS = {
+    'wall_ms.p50': False,
+    'wall_ms.p95': False,
+    'throughput_ips': True,
+}
+
+# =====================================================================
+# 🏃 MODOS
+# =====================================================================
+
+def _sequential(processor: ImageProcessor, paths: List[str], filters: List[str]) -> List[Dict[str, Any]]:
+    return [processor.process_single_image(path, filters) for path in paths]
+
+
+MODES: Dict[str, Callable[[ImageProcessor, List[str], List[str]], List[Dict[str, Any]]]] = {
+    'sequential': _sequential,
+    'threading': lambda p, paths, filters: p.process_batch_threading(paths, filters),
+    'multiprocessing': lambda p, paths, filters: p.process_batch_multiprocessing(paths, filters),
+    'shm': lambda p, paths, filters: p.process_batch_shared_memory(paths, filters),
+    'tensor': lambda p, paths, filters: p.process_batch_tensor(paths, filters),
+    'pipelined': lambda p, paths, filters: p.process_batch_pipelined(paths, filters),
+}
+
+# Modos en los que el número de workers cambia algo
+WORKER_MODES = {'threading', 'multiprocessing', 'shm', 'pipelined'}
+POOL_MODES = {'multiprocessing', 'shm', 'pipelined'}
+
+# =====================================================================
+# 📈 MÉTRICAS
+# =====================================================================
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """📈 p50/p95/p99 (interpolación lineal) + mean/stdev/min/max"""
+    if not samples:
+        return {}
+    values = np.asarray(samples, dtype=np.float64)
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        'p50': round(float(p50), 3),
+        'p95': round(float(p95), 3),
+        'p99': round(float(p99), 3),
+        'mean': round(float(values.mean()), 3),
+        'stdev': round(statistics.stdev(samples), 3) if len(samples) > 1 else 0.0,
+        'min': round(float(values.min()), 3),
+        'max': round(float(values.max()), 3),
+    }
+
+
+def _rss_bytes() -> int:
+    """🧠 RSS actual del proceso (y de sus hijos: workers del pool)"""
+    if psutil:
+        process = psutil.Process()
+        total = process.memory_info().rss
+        for child in process.children(recursive=True):
+            with contextlib.suppress(psutil.Error):
+                total += child.memory_info().rss
+        return total
+    with contextlib.suppress(OSError, ValueError):
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    if resource:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return 0
+
+
+class PeakRSSSampler:
+    """
+    🧠 Muestrea el RSS en un thread mientras dura el bloque `with`
+
+    ru_maxrss es el pico de toda la vida del proceso y no ve los workers vivos;
+    muestrear da un pico por escenario que incluye el pool.
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, _rss_bytes())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = _rss_bytes()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _rss_bytes())
+
+    @property
+    def peak_mb(self) -> float:
+        return round(self.peak / (1024 * 1024), 1)
+
+# =====================================================================
+# 🧪 ESCENARIOS
+# =====================================================================
+
+def scenario_key(corpus: str, chain: List[str], mode: str, workers: Optional[int]) -> str:
+    return f"{corpus}|{'->'.join(chain)}|{mode}|w{workers or '-'}"
+
+
+@contextlib.contextmanager
+def silenced_stdout():
+    """
+    🔇 Redirigir el fd 1 a /dev/null
+
+    redirect_stdout no alcanza a los workers del pool (heredan el descriptor al
+    hacer spawn), y sus prints se mezclarían con la tabla.
+    """
+    sys.stdout.flush()
+    saved = os.dup(1)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    try:
+        os.dup2(devnull, 1)
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        sys.stdout.flush()
+        os.dup2(saved, 1)
+        os.close(saved)
+        os.close(devnull)
+
+
+def processed_files() -> set:
+    return set(PROCESSED_DIR.glob('*')) if PROCESSED_DIR.exists() else set()
+
+
+def run_scenario(corpus: str, paths: List[str], chain: List[str], mode: str,
+                 workers: Optional[int] = None, warmup: int = 1, repeat: int = 5,
+                 keep_outputs: bool = False, verbose: bool = False) -> Dict[str, Any]:
+    """
+    🧪 Medir un escenario
+
+    Returns:
+        Dict con wall_ms y latency_ms (percentiles), throughput_ips, peak_rss_mb y errores
+    """
+    run = MODES[mode]
+    before = processed_files()
+    pool = None
+    wall_samples, latency_samples, errors = [], [], 0
+    try:
+        with (contextlib.nullcontext() if verbose else silenced_stdout()):
+            if mode in POOL_MODES:
+                pool = WarmProcessPool(max_workers=workers)
+                pool.warm_up()  # spawn + imports fuera de la medición
+            processor = ImageProcessor(max_workers=workers or 4, use_cache=False, process_pool=pool)
+
+            for _ in range(warmup):
+                run(processor, paths, chain)
+
+            with PeakRSSSampler() as rss:
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    results = run(processor, paths, chain)
+                    wall_samples.append((time.perf_counter() - start) * 1000)
+                    for result in results:
+                        if result.get('error') or result.get('status') == 'error':
+                            errors += 1
+                        elif 'processing_time' in result:
+                            latency_samples.append(result['processing_time'] * 1000)
+    finally:
+        if pool:
+            pool.shutdown()
+        if not keep_outputs:
+            for path in processed_files() - before:
+                if path.is_file():
+                    path.unlink()
+
+    median_wall_s = statistics.median(wall_samples) / 1000
+    return {
+        'key': scenario_key(corpus, chain, mode, workers),
+        'corpus': corpus,
+        'chain': chain,
+        'mode': mode,
+        'workers': workers,
+        'images': len(paths),
+        'warmup': warmup,
+        'repeat': repeat,
+        'wall_ms': percentiles(wall_samples),
+        'latency_ms': percentiles(latency_samples),
+        'throughput_ips': round(len(paths) / median_wall_s, 3) if median_wall_s > 0 else None,
+        'peak_rss_mb': rss.peak_mb,
+        'errors': errors,
+    }
+
+
+def sweep(corpora: Dict[str, List[str]], chains: List[List[str]], modes: List[str],
+          workers: List[int], warmup: int = 1, repeat: int = 5, keep_outputs: bool = False,
+          verbose: bool = False, on_result: Callable[[Dict[str, Any]], None] = None) -> List[Dict[str, Any]]:
+    """🔁 Producto corpus × cadena × modo × workers (los modos sin workers se miden una vez)"""
+    scenarios = []
+    for corpus, paths in corpora.items():
+        for chain in chains:
+            for mode in modes:
+                for worker_count in (workers if mode in WORKER_MODES else [None]):
+                    result = run_scenario(corpus, paths, chain, mode, worker_count,
+                                          warmup=warmup, repeat=repeat,
+                                          keep_outputs=keep_outputs, verbose=verbose)
+                    scenarios.append(result)
+                    if on_result:
+                        on_result(result)
+    return scenarios
+
+# =====================================================================
+# 💾 BASELINES
+# =====================================================================
+
+def environment_info() -> Dict[str, Any]:
+    """🖥️ Contexto de la máquina: un baseline solo es comparable en el mismo entorno"""
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'psutil': bool(psutil),
+    }
+
+
+def build_report(scenarios: List[Dict[str, Any]], config: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'environment': environment_info(),
+        'config': config,
+        'scenarios': scenarios,
+    }
+
+
+def save_report(report: Dict[str, Any], path: str):
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+
+def load_report(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def _metric(scenario: Dict[str, Any], path: str) -> Optional[float]:
+    value = scenario
+    for part in path.split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def compare_to_baseline(report: Dict[str, Any], baseline: Dict[str, Any],
+                        threshold: float = 0.10, metrics: Dict[str, bool] = None) -> Dict[str, Any]:
+    """
+    ⚖️ Comparar escenario a escenario (por key) contra un baseline
+
+    Una métrica regresa si empeora más de `threshold` (0.10 = 10%): tiempos que
+    suben o throughput que baja. Escenarios sin pareja se listan aparte.
+    """
+    metrics = metrics or REGRESSION_METRICS
+    baseline_by_key = {s['key']: s for s in baseline.get('scenarios', [])}
+    comparisons, regressions, missing = [], [], []
+
+    for scenario in report['scenarios']:
+        reference = baseline_by_key.get(scenario['key'])
+        if reference is None:
+            missing.append(scenario['key'])
+            continue
+        for metric, higher_is_better in metrics.items():
+            current, previous = _metric(scenario, metric), _metric(reference, metric)
+            if not current or not previous:
+                continue
+            change = (current - previous) / previous
+            worse = -change if higher_is_better else change
+            entry = {
+                'key': scenario['key'],
+                'metric': metric,
+                'baseline': previous,
+                'current': current,
+                'change_pct': round(change * 100, 1),
+                'regression': worse > threshold,
+            }
+            comparisons.append(entry)
+            if entry['regression']:
+                regressions.append(entry)
+
+    return {
+        'threshold_pct': round(threshold * 100, 1),
+        'comparisons': comparisons,
+        'regressions': regressions,
+        'missing_in_baseline': missing,
+        'passed': not regressions,
+    }
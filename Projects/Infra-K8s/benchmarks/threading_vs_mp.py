@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+📊 Benchmark: Sequential vs Threading vs Multiprocessing (y modos DÍA 4)
+
+Barre corpus × cadena de filtros × modo × workers con warm-up y N repeticiones;
+reporta p50/p95/p99, throughput y pico de RSS, guarda JSON y compara contra
+un baseline (exit code 1 si alguna métrica empeora más que --threshold).
+
+Los caches de resultados y de prefijos se desactivan (salvo --with-cache):
+se mide el procesamiento, no los hits.
+
+Uso (desde Projects/Infra-K8s):
+    python benchmarks/threading_vs_mp.py --images=5 --verbose
+    python benchmarks/threading_vs_mp.py --corpus small hd --modes sequential threading multiprocessing \\
+        --workers 1 2 4 --repeat 10 --output benchmarks/results/latest.json
+    python benchmarks/threading_vs_mp.py --baseline benchmarks/baselines/ci.json --update-baseline
+    python benchmarks/threading_vs_mp.py --baseline benchmarks/baselines/ci.json --threshold 0.15
+"""
+
+import os
+import sys
+import argparse
+import logging
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_CHAINS = ['resize,blur,brightness', 'sharpen,edges']
+DEFAULT_MODES = ['sequential', 'threading', 'multiprocessing']
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Processing modes benchmark with baselines")
+    parser.add_argument('--corpus', nargs='+', default=['hd'],
+                        help="Corpus: small, hd, 4k o un directorio de imágenes (p.ej. static/images)")
+    parser.add_argument('--images', type=int, default=None,
+                        help="Imágenes por lote (se cicla sobre el corpus; por defecto todo el corpus)")
+    parser.add_argument('--chains', nargs='+', default=DEFAULT_CHAINS,
+                        help="Cadenas separadas por comas, p.ej. resize,blur sharpen,edges")
+    parser.add_argument('--modes', nargs='+', default=DEFAULT_MODES,
+                        help="sequential, threading, multiprocessing, shm, tensor, pipelined")
+    parser.add_argument('--workers', nargs='+', type=int, default=[os.cpu_count() or 1])
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help="Guardar el reporte JSON")
+    parser.add_argument('--baseline', help="Baseline JSON contra el que comparar")
+    parser.add_argument('--update-baseline', action='store_true',
+                        help="Escribir el reporte actual como baseline (no compara)")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="Regresión tolerada (0.10 = 10%%)")
+    parser.add_argument('--with-cache', action='store_true', help="No desactivar los caches")
+    parser.add_argument('--keep-outputs', action='store_true', help="No borrar las imágenes generadas")
+    parser.add_argument('--verbose', action='store_true')
+    return parser.parse_args(argv)
+
+
+def print_scenario(result):
+    wall, latency = result['wall_ms'], result['latency_ms']
+    print(f"{result['corpus']:>8} {'->'.join(result['chain']):<24} {result['mode']:<16} "
+          f"{str(result['workers'] or '-'):>3} {wall['p50']:>9.1f} {wall['p95']:>9.1f} {wall['p99']:>9.1f} "
+          f"{latency.get('p50', 0):>9.1f} {result['throughput_ips']:>8.2f} {result['peak_rss_mb']:>8.1f} "
+          f"{result['errors']:>4}")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not args.with_cache:
+        os.environ['RESULT_CACHE_ENABLED'] = '0'
+        os.environ['PREFIX_CACHE_ENABLED'] = '0'
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+
+    # Después de fijar el entorno: image_api lee los flags de cache al importarse
+    from benchmarks.corpus import load_corpus
+    from benchmarks.runner import MODES, sweep, build_report, save_report, load_report, compare_to_baseline
+
+    unknown = [m for m in args.modes if m not in MODES]
+    if unknown:
+        print(f"❌ Modos desconocidos: {unknown}. Disponibles: {list(MODES)}")
+        return 2
+
+    corpora = {}
+    for spec in args.corpus:
+        paths = load_corpus(spec)
+        if args.images:
+            paths = [paths[i % len(paths)] for i in range(args.images)]
+        corpora[os.path.basename(spec.rstrip('/'))] = paths
+    chains = [[f for f in chain.split(',') if f] for chain in args.chains]
+
+    print(f"📊 Benchmark: {len(corpora)} corpus, {len(chains)} cadenas, modos {args.modes}, "
+          f"workers {args.workers}, warmup={args.warmup}, repeat={args.repeat}")
+    print(f"{'corpus':>8} {'chain':<24} {'mode':<16} {'w':>3} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'img p50':>9} {'img/s':>8} {'RSS MB':>8} {'err':>4}")
+
+    scenarios = sweep(corpora, chains, args.modes, args.workers, warmup=args.warmup,
+                      repeat=args.repeat, keep_outputs=args.keep_outputs,
+                      verbose=args.verbose, on_result=print_scenario)
+
+    config = {k: v for k, v in vars(args).items() if k not in ('output', 'baseline', 'update_baseline', 'verbose')}
+    report = build_report(scenarios, config)
+
+    if args.output:
+        save_report(report, args.output)
+        print(f"💾 Results: {args.output}")
+
+    if args.baseline and args.update_baseline:
+        save_report(report, args.baseline)
+        print(f"📌 Baseline updated: {args.baseline}")
+        return 0
+
+    if args.baseline:
+        if not os.path.exists(args.baseline):
+            print(f"⚠️ Baseline {args.baseline} no existe (usa --update-baseline para crearlo)")
+            return 0
+        baseline = load_report(args.baseline)
+        if baseline.get('environment') != report['environment']:
+            print("⚠️ Baseline generado en otro entorno: la comparación puede no ser significativa")
+        comparison = compare_to_baseline(report, baseline, threshold=args.threshold)
+        report['baseline_comparison'] = comparison
+        if args.output:
+            save_report(report, args.output)
+
+        for key in comparison['missing_in_baseline']:
+            print(f"➕ Sin baseline: {key}")
+        for entry in comparison['regressions']:
+            print(f"❌ REGRESSION {entry['key']} {entry['metric']}: "
+                  f"{entry['baseline']} -> {entry['current']} ({entry['change_pct']:+.1f}%)")
+        if not comparison['passed']:
+            print(f"❌ {len(comparison['regressions'])} regresiones por encima de {comparison['threshold_pct']}%")
+            return 1
+        print(f"✅ Sin regresiones (umbral {comparison['threshold_pct']}%, "
+              f"{len(comparison['comparisons'])} métricas comparadas)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
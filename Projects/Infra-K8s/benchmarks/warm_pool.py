@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+🔥 Benchmark: ProcessPoolExecutor por request vs pool persistente caliente
+
+Simula N requests seguidos de un lote pequeño:
+- cold: lo que hacía process_batch_multiprocessing antes (un ProcessPoolExecutor
+  nuevo por llamada, contexto por defecto, bound method pickle-ado)
+- warm: ImageProcessor.process_batch_multiprocessing con el pool compartido
+  (arranque y warm-up pagados una sola vez, fuera de la medición)
+
+Uso (desde Projects/Infra-K8s):
+    python benchmarks/warm_pool.py
+    python benchmarks/warm_pool.py --batch-sizes 1 2 4 --requests 10 --filters resize brightness
+"""
+
+import os
+import sys
+import time
+import argparse
+import logging
+import statistics
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from image_api.processors import ImageProcessor
+from image_api.pool import get_process_pool
+
+
+def cold_batch(processor, image_paths, filters):
+    """🥶 Comportamiento anterior: crear y destruir el pool en cada request"""
+    with ProcessPoolExecutor(max_workers=processor.mp_workers) as executor:
+        futures = [executor.submit(processor.process_single_image, path, filters) for path in image_paths]
+        return [future.result() for future in as_completed(futures)]
+
+
+def measure(func, requests):
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def summarize(samples):
+    return {
+        'mean_ms': statistics.mean(samples) * 1000,
+        'p50_ms': statistics.median(samples) * 1000,
+        'max_ms': max(samples) * 1000,
+    }
+
+
+def run_benchmark(image_path, filters, batch_sizes, requests):
+    processor = ImageProcessor(use_cache=False)
+    pool = get_process_pool()
+
+    warm_start = time.perf_counter()
+    health = pool.warm_up()
+    print(f"🔥 Pool warm-up (una vez por proceso): {(time.perf_counter() - warm_start) * 1000:.0f} ms, "
+          f"{health['responding_workers']}/{pool.max_workers} workers")
+    print(f"🖼️ Image: {image_path}, filters: {filters}, requests={requests}")
+    print(f"{'batch':>6} {'cold p50':>10} {'warm p50':>10} {'saved p50':>10} {'cold mean':>10} {'warm mean':>10}")
+
+    rows = []
+    for size in batch_sizes:
+        paths = [image_path] * size
+        cold = summarize(measure(lambda: cold_batch(processor, paths, filters), requests))
+        warm = summarize(measure(lambda: processor.process_batch_multiprocessing(paths, filters), requests))
+        row = {'batch_size': size, 'cold': cold, 'warm': warm,
+               'saved_p50_ms': cold['p50_ms'] - warm['p50_ms']}
+        rows.append(row)
+        print(f"{size:>6} {cold['p50_ms']:>8.1f}ms {warm['p50_ms']:>8.1f}ms {row['saved_p50_ms']:>8.1f}ms "
+              f"{cold['mean_ms']:>8.1f}ms {warm['mean_ms']:>8.1f}ms")
+
+    pool.shutdown()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm process pool latency benchmark")
+    parser.add_argument('--image', default='static/images/sample_4k.jpg')
+    parser.add_argument('--filters', nargs='+', default=['resize', 'brightness'])
+    parser.add_argument('--batch-sizes', nargs='+', type=int, default=[1, 2, 4])
+    parser.add_argument('--requests', type=int, default=10)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    run_benchmark(args.image, args.filters, args.batch_sizes, args.requests)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,18 +2,31 @@
 🌐 Distributed Processing Module
 
 This module contains components for distributed image processing:
+- Shared Redis connection pools
 - Redis-based task queue
+- Fan-out/fan-in jobs
+- Task state notifications (pub/sub)
 - Worker registry with health monitoring
 - Distributed worker implementation
 """
 
 __version__ = "1.0.0"
 
+from .redis_pool import get_redis_client, get_redis_pool, get_pool_stats
 from .redis_queue import DistributedTaskQueue
+from .job_manager import JobManager
+from .task_events import TaskEventHub, get_task_event_hub, publish_task_event
 from .worker_registry import WorkerRegistry, HeartbeatManager
 
 __all__ = [
+    'get_redis_client',
+    'get_redis_pool',
+    'get_pool_stats',
     'DistributedTaskQueue',
+    'JobManager',
+    'TaskEventHub',
+    'get_task_event_hub',
+    'publish_task_event',
     'WorkerRegistry', 
     'HeartbeatManager'
 ]
\ No newline at end of file
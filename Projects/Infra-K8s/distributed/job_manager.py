@@ -0,0 +1,227 @@
+"""
+🧩 Fan-out/fan-in jobs on top of the Redis task queue
+
+A job splits a batch into one subtask per (image, filter chain), so every
+idle worker can pick up part of it instead of one worker processing the
+whole batch sequentially.
+
+Redis layout (all keys expire after JOB_TTL_SECONDS):
+    job:<id>            hash: metadata + atomic counters (completed, failed, done)
+    job:<id>:tasks      list: subtask ids, in image order
+    job:<id>:results    hash: subtask index -> JSON result summary
+
+Completion is recorded with a Lua script: the result is stored only once per
+index (retries do not double count) and the counters are incremented in
+the same atomic step. The caller whose increment makes done == total runs
+the fan-in and writes the aggregate result.
+"""
+
+import os
+import json
+import uuid
+import time
+from typing import Any, Dict, List, Optional
+
+from .redis_pool import get_redis_client
+from .redis_queue import DistributedTaskQueue
+from .task_events import publish_task_event
+
+JOB_TTL_SECONDS = int(os.getenv('JOB_TTL_SECONDS', 24 * 3600))
+
+# KEYS[1]=job hash, KEYS[2]=results hash
+# ARGV[1]=index, ARGV[2]=result JSON, ARGV[3]=counter ('completed'|'failed'), ARGV[4]=timestamp
+# Returns -1 if this index was already recorded, else the new 'done' count
+_RECORD_SCRIPT = """
+if redis.call('HSETNX', KEYS[2], ARGV[1], ARGV[2]) == 0 then
+    return -1
+end
+redis.call('HINCRBY', KEYS[1], ARGV[3], 1)
+redis.call('HSET', KEYS[1], 'updated_at', ARGV[4])
+return redis.call('HINCRBY', KEYS[1], 'done', 1)
+"""
+
+
+class JobManager:
+    """
+    Creates fan-out jobs, records subtask completions and assembles results.
+
+    Usage:
+        jobs = JobManager(redis_client=get_redis_client())
+        job_id = jobs.create_job(image_paths, ['resize', 'blur'])
+        jobs.get_job_status(job_id)
+    """
+
+    def __init__(self, redis_client=None, task_queue: DistributedTaskQueue = None):
+        self.redis_client = redis_client or get_redis_client()
+        self.task_queue = task_queue or DistributedTaskQueue(redis_client=self.redis_client)
+        self._record = self.redis_client.register_script(_RECORD_SCRIPT)
+
+    @staticmethod
+    def _keys(job_id: str):
+        return f'job:{job_id}', f'job:{job_id}:tasks', f'job:{job_id}:results'
+
+    def create_job(self, image_paths: List[str], filters: List[str], filter_params: Dict = None,
+                   options: Dict = None) -> str:
+        """
+        Create a job and enqueue one subtask per image.
+
+        Args:
+            image_paths: Images to process (one subtask each)
+            filters: Filter chain applied to every image
+            filter_params: Per-filter parameters
+            options: Extra task data passed to every subtask (in_memory, lean, use_cache...)
+
+        Returns:
+            job_id
+        """
+        if not image_paths:
+            raise ValueError("a job needs at least one image")
+        job_id = str(uuid.uuid4())
+        job_key, tasks_key, results_key = self._keys(job_id)
+        now = time.time()
+
+        self.redis_client.hset(job_key, mapping={
+            'id': job_id,
+            'status': 'pending',
+            'total': len(image_paths),
+            'completed': 0,
+            'failed': 0,
+            'done': 0,
+            'filters': json.dumps(filters),
+            'filter_params': json.dumps(filter_params or {}),
+            'created_at': now,
+            'updated_at': now,
+        })
+        self.redis_client.expire(job_key, JOB_TTL_SECONDS)
+
+        subtasks = [
+            dict(options or {}, filters=filters, filter_params=filter_params or {}, images=[image_path],
+                 job_id=job_id, job_index=index, distributed=True)
+            for index, image_path in enumerate(image_paths)
+        ]
+        task_ids = self.task_queue.enqueue_tasks(subtasks)
+
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.rpush(tasks_key, *task_ids)
+        pipe.expire(tasks_key, JOB_TTL_SECONDS)
+        pipe.execute()
+        return job_id
+
+    def mark_started(self, job_id: str, worker_id: str):
+        """Record the first subtask start (status pending -> running)."""
+        job_key = self._keys(job_id)[0]
+        if self.redis_client.hsetnx(job_key, 'started_at', time.time()):
+            self.redis_client.hset(job_key, 'status', 'running')
+            publish_task_event(self.redis_client, job_id, 'running', worker_id=worker_id)
+
+    def record_subtask(self, job_id: str, index: int, result: Dict, failed: bool = False) -> Optional[Dict]:
+        """
+        Record one subtask outcome; the last one to finish runs the fan-in.
+
+        Args:
+            job_id: Job identifier
+            index: Subtask index (image position in the job)
+            result: JSON-serializable summary of the subtask
+            failed: Whether the subtask failed
+
+        Returns:
+            The aggregate job result if this call completed the job, else None
+        """
+        job_key, _, results_key = self._keys(job_id)
+        total = self.redis_client.hget(job_key, 'total')
+        if total is None:
+            return None  # Expired or unknown job
+
+        done = self._record(keys=[job_key, results_key],
+                            args=[index, json.dumps(result), 'failed' if failed else 'completed', time.time()])
+        self.redis_client.expire(results_key, JOB_TTL_SECONDS)
+        if done == int(total):
+            return self._assemble(job_id)
+        if done > 0:
+            publish_task_event(self.redis_client, job_id, 'running', done=done, total=int(total))
+        return None
+
+    def _assemble(self, job_id: str) -> Dict:
+        """Fan-in: aggregate every subtask result into the job hash."""
+        job_key, _, results_key = self._keys(job_id)
+        job = self.redis_client.hgetall(job_key)
+        raw_results = self.redis_client.hgetall(results_key)
+        results = [json.loads(raw_results[index]) for index in sorted(raw_results, key=int)]
+
+        failed = [r for r in results if 'error' in r]
+        per_worker: Dict[str, int] = {}
+        for r in results:
+            per_worker[r.get('worker_id', 'unknown')] = per_worker.get(r.get('worker_id', 'unknown'), 0) + 1
+        completed_at = time.time()
+        wall_time = completed_at - float(job['created_at'])
+        busy_time = sum(r.get('processing_time', 0.0) for r in results)
+
+        aggregate = {
+            'job_id': job_id,
+            'images_processed': len(results),
+            'images_successful': len(results) - len(failed),
+            'images_failed': len(failed),
+            'filters_applied': json.loads(job.get('filters', '[]')),
+            'wall_time': round(wall_time, 3),
+            'total_processing_time': round(busy_time, 3),
+            # >1 means subtasks ran in parallel across workers
+            'parallelism': round(busy_time / wall_time, 2) if wall_time > 0 else None,
+            'throughput_images_per_s': round(len(results) / wall_time, 2) if wall_time > 0 else None,
+            'workers_used': per_worker,
+            'results': results,
+        }
+        status = 'failed' if len(failed) == len(results) else 'partial' if failed else 'completed'
+        self.redis_client.hset(job_key, mapping={
+            'status': status,
+            'completed_at': completed_at,
+            'result': json.dumps(aggregate),
+        })
+        publish_task_event(self.redis_client, job_id, status, done=len(results), total=len(results),
+                           images_failed=len(failed))
+        return aggregate
+
+    def get_job_status(self, job_id: str, include_results: bool = False) -> Optional[Dict]:
+        """
+        Current status and progress of a job.
+
+        Args:
+            job_id: Job identifier
+            include_results: Include subtask results recorded so far
+
+        Returns:
+            Status dictionary or None if the job does not exist
+        """
+        job_key, tasks_key, results_key = self._keys(job_id)
+        job = self.redis_client.hgetall(job_key)
+        if not job:
+            return None
+
+        total, done = int(job['total']), int(job.get('done', 0))
+        created_at = float(job['created_at'])
+        completed_at = float(job['completed_at']) if job.get('completed_at') else None
+        elapsed = (completed_at or time.time()) - created_at
+        status: Dict[str, Any] = {
+            'job_id': job_id,
+            'status': job.get('status', 'unknown'),
+            'progress': {
+                'total': total,
+                'completed': int(job.get('completed', 0)),
+                'failed': int(job.get('failed', 0)),
+                'pending': total - done,
+                'percent': round(done / total * 100, 1) if total else 100.0,
+            },
+            'filters': json.loads(job.get('filters', '[]')),
+            'created_at': created_at,
+            'started_at': float(job['started_at']) if job.get('started_at') else None,
+            'completed_at': completed_at,
+            'elapsed': round(elapsed, 3),
+            # Linear estimate from the completion rate so far
+            'eta_seconds': round(elapsed / done * (total - done), 1) if 0 < done < total else None,
+            'subtasks': self.redis_client.lrange(tasks_key, 0, -1),
+        }
+        if job.get('result'):
+            status['result'] = json.loads(job['result'])
+        elif include_results:
+            raw_results = self.redis_client.hgetall(results_key)
+            status['partial_results'] = [json.loads(raw_results[i]) for i in sorted(raw_results, key=int)]
+        return status
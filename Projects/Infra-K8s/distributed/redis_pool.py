@@ -0,0 +1,129 @@
+"""
+🔌 Shared Redis connection pools
+
+Every DistributedTaskQueue / WorkerRegistry used to build its own redis.Redis
+client, i.e. its own pool and a new TCP connection per request. This module
+keeps ONE pool per (address, db) per process and hands out clients bound to it.
+
+Configuration (environment):
+    REDIS_HOST / REDIS_PORT / REDIS_DB   TCP address (defaults localhost:6379/0)
+    REDIS_SOCKET_PATH                    Unix socket; overrides host/port when set
+    REDIS_MAX_CONNECTIONS                Pool size per process (default 50)
+    REDIS_POOL_TIMEOUT                   Seconds to wait for a free connection
+    REDIS_SOCKET_TIMEOUT                 Read/write timeout; must exceed BRPOP timeouts
+    REDIS_CONNECT_TIMEOUT                TCP connect timeout
+    REDIS_HEALTH_CHECK_INTERVAL          PING idle connections older than this (seconds)
+"""
+
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+import redis
+
+REDIS_HOST = os.getenv('REDIS_HOST', 'localhost')
+REDIS_PORT = int(os.getenv('REDIS_PORT', 6379))
+REDIS_DB = int(os.getenv('REDIS_DB', 0))
+REDIS_SOCKET_PATH = os.getenv('REDIS_SOCKET_PATH', '')
+REDIS_MAX_CONNECTIONS = int(os.getenv('REDIS_MAX_CONNECTIONS', 50))
+REDIS_POOL_TIMEOUT = float(os.getenv('REDIS_POOL_TIMEOUT', 5.0))
+REDIS_SOCKET_TIMEOUT = float(os.getenv('REDIS_SOCKET_TIMEOUT', 10.0))
+REDIS_CONNECT_TIMEOUT = float(os.getenv('REDIS_CONNECT_TIMEOUT', 2.0))
+REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv('REDIS_HEALTH_CHECK_INTERVAL', 30))
+
+
+class TrackedConnectionPool(redis.BlockingConnectionPool):
+    """
+    Blocking pool that counts connection churn.
+
+    Waits up to REDIS_POOL_TIMEOUT for a free connection instead of failing
+    with "Too many connections" when a burst of requests exceeds the pool.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.connections_created = 0
+        self.checkouts = 0
+        super().__init__(*args, **kwargs)
+
+    def make_connection(self):
+        self.connections_created += 1
+        return super().make_connection()
+
+    def get_connection(self, *args, **kwargs):
+        self.checkouts += 1
+        return super().get_connection(*args, **kwargs)
+
+    def get_stats(self) -> Dict:
+        in_use = len(self._connections) - sum(1 for c in list(self.pool.queue) if c is not None)
+        return {
+            'address': self.connection_kwargs.get('path') or
+                       f"{self.connection_kwargs.get('host')}:{self.connection_kwargs.get('port')}",
+            'db': self.connection_kwargs.get('db', 0),
+            'max_connections': self.max_connections,
+            'connections_created': self.connections_created,
+            'connections_open': len(self._connections),
+            'connections_in_use': in_use,
+            'checkouts': self.checkouts,
+            # ~0 in steady state; 1.0 means a new TCP connection per command
+            'churn_ratio': round(self.connections_created / self.checkouts, 4) if self.checkouts else 0.0,
+        }
+
+
+_pools: Dict[Tuple, TrackedConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_redis_pool(host: Optional[str] = None, port: Optional[int] = None, db: Optional[int] = None,
+                   socket_path: Optional[str] = None) -> TrackedConnectionPool:
+    """
+    Return the process-wide pool for an address, creating it on first use.
+
+    Args:
+        host, port, db: TCP address (defaults from REDIS_HOST/REDIS_PORT/REDIS_DB)
+        socket_path: Unix socket path (defaults to REDIS_SOCKET_PATH)
+    """
+    socket_path = socket_path if socket_path is not None else REDIS_SOCKET_PATH
+    host = host or REDIS_HOST
+    port = int(port or REDIS_PORT)
+    db = REDIS_DB if db is None else db
+    key = (socket_path,) if socket_path else (host, port)
+    key += (db,)
+
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            common = dict(
+                db=db,
+                decode_responses=True,
+                max_connections=REDIS_MAX_CONNECTIONS,
+                timeout=REDIS_POOL_TIMEOUT,
+                socket_timeout=REDIS_SOCKET_TIMEOUT,
+                health_check_interval=REDIS_HEALTH_CHECK_INTERVAL,
+            )
+            if socket_path:
+                pool = TrackedConnectionPool(connection_class=redis.UnixDomainSocketConnection,
+                                             path=socket_path, **common)
+            else:
+                pool = TrackedConnectionPool(host=host, port=port,
+                                             socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
+                                             socket_keepalive=True, **common)
+            _pools[key] = pool
+        return pool
+
+
+def get_redis_client(host: Optional[str] = None, port: Optional[int] = None, db: Optional[int] = None,
+                     socket_path: Optional[str] = None) -> redis.Redis:
+    """
+    Return a client bound to the shared pool (clients are cheap; the pool is not).
+
+    Usage:
+        queue = DistributedTaskQueue(redis_client=get_redis_client())
+    """
+    return redis.Redis(connection_pool=get_redis_pool(host, port, db, socket_path))
+
+
+def get_pool_stats() -> Dict[str, Dict]:
+    """Churn and usage counters for every pool created in this process."""
+    with _pools_lock:
+        pools = list(_pools.items())
+    return {':'.join(str(part) for part in key): pool.get_stats() for key, pool in pools}
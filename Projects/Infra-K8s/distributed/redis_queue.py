@@ -1,22 +1,20 @@
-import redis
 import json
 import uuid
 import time
 from typing import Dict, List, Optional
 
+from .redis_pool import get_redis_client
+from .task_events import publish_task_event
+
 class DistributedTaskQueue:
     """
     Redis-based distributed task queue for image processing tasks.
     Handles task enqueueing, dequeueing, and status tracking.
     """
     
-    def __init__(self, redis_host='localhost', redis_port=6379, redis_db=0):
-        self.redis_client = redis.Redis(
-            host=redis_host, 
-            port=redis_port, 
-            db=redis_db, 
-            decode_responses=True
-        )
+    def __init__(self, redis_host=None, redis_port=None, redis_db=0, redis_client=None):
+        # Shared per-process pool unless the caller passes its own client
+        self.redis_client = redis_client or get_redis_client(redis_host, redis_port, redis_db)
         self.task_queue = 'image_tasks'
         self.result_queue = 'image_results'
         
@@ -50,6 +48,39 @@ class DistributedTaskQueue:
         
         return task_id
     
+    def enqueue_tasks(self, tasks_data: List[Dict]) -> List[str]:
+        """
+        Enqueue many tasks in a single round trip (pipelined).
+        
+        Metadata is written before the push, so a worker that pops a task
+        immediately always finds its task:<id> hash.
+        
+        Args:
+            tasks_data: List of task data dictionaries
+            
+        Returns:
+            List of task ids, in the same order
+        """
+        task_ids = []
+        pipe = self.redis_client.pipeline(transaction=False)
+        for task_data in tasks_data:
+            task_id = str(uuid.uuid4())
+            task = {
+                'id': task_id,
+                'data': task_data,
+                'status': 'pending',
+                'created_at': time.time(),
+                'worker_id': None,
+                'started_at': None,
+                'completed_at': None
+            }
+            task_str = {k: json.dumps(v) if isinstance(v, (dict, list)) else str(v) for k, v in task.items()}
+            pipe.hset(f'task:{task_id}', mapping=task_str)
+            pipe.lpush(self.task_queue, json.dumps(task))
+            task_ids.append(task_id)
+        pipe.execute()
+        return task_ids
+    
     def get_task(self, worker_id: str, timeout: int = 5) -> Optional[Dict]:
         """
         Get next available task from queue (blocking operation).
@@ -76,6 +107,7 @@ class DistributedTaskQueue:
         # Update task metadata (convert all values to strings)
         task_str = {k: json.dumps(v) if isinstance(v, (dict, list)) else str(v) for k, v in task.items()}
         self.redis_client.hset(f'task:{task_id}', mapping=task_str)
+        publish_task_event(self.redis_client, task_id, 'processing', worker_id=worker_id)
         
         return task
     
@@ -106,6 +138,9 @@ class DistributedTaskQueue:
                 'completed_at': time.time()
             }
             self.redis_client.lpush(self.result_queue, json.dumps(result_data))
+            
+            # Wake up long-polls / SSE streams waiting on this task
+            publish_task_event(self.redis_client, task_id, 'completed')
     
     def fail_task(self, task_id: str, error: str):
         """
@@ -122,6 +157,7 @@ class DistributedTaskQueue:
             'error': error
         }
         self.redis_client.hset(task_key, mapping=updates)
+        publish_task_event(self.redis_client, task_id, 'failed', error=error)
     
     def get_task_status(self, task_id: str) -> Optional[Dict]:
         """
@@ -0,0 +1,182 @@
+"""
+📣 Task state notifications over Redis pub/sub
+
+DistributedTaskQueue and JobManager publish every state transition on
+task_events:<task or job id>. Instead of polling task:<id> with HGETALL,
+API processes wait for those events:
+
+- TaskEventHub keeps ONE pattern subscription (task_events:*) per process on
+  a background thread and fans events out to in-process listeners, so N
+  long-polls / SSE streams cost one Redis connection, not N.
+- Listeners register before reading the current state, so a transition that
+  happens in between is never lost; a periodic state re-check covers events
+  missed while the subscription reconnects.
+"""
+
+import os
+import json
+import time
+import queue
+import threading
+import contextlib
+from typing import Any, Dict, Iterator, Optional
+
+from .redis_pool import get_redis_client
+
+TASK_EVENTS_PREFIX = 'task_events:'
+TERMINAL_STATES = {'completed', 'failed', 'partial'}
+# Seconds between fallback state checks while waiting (missed events)
+TASK_EVENTS_RECHECK = float(os.getenv('TASK_EVENTS_RECHECK', 5.0))
+
+
+def task_channel(task_id: str) -> str:
+    return f'{TASK_EVENTS_PREFIX}{task_id}'
+
+
+def publish_task_event(redis_client, task_id: str, status: str, **extra) -> Dict[str, Any]:
+    """
+    Publish a state transition for a task or job.
+
+    Args:
+        redis_client: Client to publish with
+        task_id: Task or job identifier
+        status: New state (pending, processing, running, completed, failed, partial)
+        **extra: Additional JSON-serializable fields (progress, error...)
+    """
+    event = dict(extra, task_id=task_id, status=status, at=time.time())
+    redis_client.publish(task_channel(task_id), json.dumps(event))
+    return event
+
+
+def current_state(redis_client, task_id: str) -> Optional[str]:
+    """Stored state of a task or a job (None if neither exists)."""
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.hget(f'task:{task_id}', 'status')
+    pipe.hget(f'job:{task_id}', 'status')
+    task_status, job_status = pipe.execute()
+    return task_status or job_status
+
+
+class TaskEventHub:
+    """
+    Process-wide pub/sub listener that dispatches events to waiters.
+
+    Usage:
+        hub = get_task_event_hub()
+        status = hub.wait_for_terminal(task_id, timeout=30)   # long-poll
+        with hub.listen(task_id) as events:                    # SSE
+            event = events.get(timeout=15)
+    """
+
+    def __init__(self, redis_client=None):
+        self.redis_client = redis_client or get_redis_client()
+        self._listeners: Dict[str, list] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._subscribed = threading.Event()
+        self.stats = {'events_received': 0, 'events_dispatched': 0, 'reconnects': 0, 'waits': 0,
+                      'waits_notified': 0, 'waits_timed_out': 0}
+
+    def start(self, timeout: float = 2.0):
+        """Start the subscriber thread (idempotent) and wait until it is subscribed."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='task-event-hub', daemon=True)
+                self._thread.start()
+        self._subscribed.wait(timeout)
+
+    def _run(self):
+        backoff = 0.5
+        while True:
+            pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.psubscribe(f'{TASK_EVENTS_PREFIX}*')
+                while True:
+                    # Consumes the psubscribe confirmation first, then the events
+                    message = pubsub.get_message(timeout=1.0)
+                    self._subscribed.set()
+                    backoff = 0.5
+                    if message and message.get('type') == 'pmessage':
+                        self._dispatch(message['data'])
+            except Exception:
+                self._subscribed.clear()
+                self.stats['reconnects'] += 1
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 10.0)
+            finally:
+                with contextlib.suppress(Exception):
+                    pubsub.close()
+
+    def _dispatch(self, data: str):
+        try:
+            event = json.loads(data)
+        except (TypeError, ValueError):
+            return
+        self.stats['events_received'] += 1
+        with self._lock:
+            listeners = list(self._listeners.get(event.get('task_id'), ()))
+        for listener in listeners:
+            listener.put(event)
+            self.stats['events_dispatched'] += 1
+
+    @contextlib.contextmanager
+    def listen(self, task_id: str) -> Iterator[queue.Queue]:
+        """Receive events for task_id on a queue while inside the block."""
+        self.start()
+        listener: queue.Queue = queue.Queue()
+        with self._lock:
+            self._listeners.setdefault(task_id, []).append(listener)
+        try:
+            yield listener
+        finally:
+            with self._lock:
+                listeners = self._listeners.get(task_id, [])
+                if listener in listeners:
+                    listeners.remove(listener)
+                if not listeners:
+                    self._listeners.pop(task_id, None)
+
+    def wait_for_terminal(self, task_id: str, timeout: float) -> Optional[str]:
+        """
+        Block until the task/job reaches a terminal state or timeout expires.
+
+        Returns:
+            The last known state (None if the task does not exist)
+        """
+        self.stats['waits'] += 1
+        deadline = time.monotonic() + timeout
+        with self.listen(task_id) as events:
+            state = current_state(self.redis_client, task_id)
+            next_check = time.monotonic() + TASK_EVENTS_RECHECK
+            while state is not None and state not in TERMINAL_STATES:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.stats['waits_timed_out'] += 1
+                    return state
+                try:
+                    event = events.get(timeout=min(remaining, max(0.0, next_check - time.monotonic())))
+                    state = event.get('status', state)
+                    if state in TERMINAL_STATES:
+                        self.stats['waits_notified'] += 1
+                except queue.Empty:
+                    state = current_state(self.redis_client, task_id)
+                    next_check = time.monotonic() + TASK_EVENTS_RECHECK
+            return state
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            listeners = sum(len(v) for v in self._listeners.values())
+        return dict(self.stats, subscribed=self._subscribed.is_set(), listeners=listeners)
+
+
+_hub = None
+_hub_lock = threading.Lock()
+
+
+def get_task_event_hub() -> TaskEventHub:
+    """Shared hub of the process (started lazily on first listen)."""
+    global _hub
+    with _hub_lock:
+        if _hub is None:
+            _hub = TaskEventHub()
+        return _hub
@@ -1,22 +1,19 @@
-import redis
 import json
 import time
 import threading
 from typing import Dict, List, Optional
 
+from .redis_pool import get_redis_client
+
 class WorkerRegistry:
     """
     Redis-based service discovery and health monitoring for distributed workers.
     Handles worker registration, heartbeats, and failure detection.
     """
     
-    def __init__(self, redis_host='localhost', redis_port=6379, redis_db=0):
-        self.redis_client = redis.Redis(
-            host=redis_host, 
-            port=redis_port, 
-            db=redis_db, 
-            decode_responses=True
-        )
+    def __init__(self, redis_host=None, redis_port=None, redis_db=0, redis_client=None):
+        # Shared per-process pool unless the caller passes its own client
+        self.redis_client = redis_client or get_redis_client(redis_host, redis_port, redis_db)
         self.workers_key = 'workers'
         self.heartbeat_interval = 30  # seconds
         self.worker_timeout = 90  # seconds (3 missed heartbeats)
@@ -85,9 +85,11 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # 🖼️ CONFIGURACIÓN ESPECÍFICA PARA IMÁGENES
 # ============================================
 
-# Tamaño máximo de archivo (100MB para imágenes 4K)
-DATA_UPLOAD_MAX_MEMORY_SIZE = 100 * 1024 * 1024  # 100MB
-FILE_UPLOAD_MAX_MEMORY_SIZE = 100 * 1024 * 1024  # 100MB
+# DÍA 4: las imágenes se suben por streaming a /api/uploads/ (UPLOAD_MAX_MB,
+# image_api/uploads.py); estos límites solo cubren bodies JSON/form y
+# multipart fuera de ese endpoint, que ya no se bufferizan enteros en RAM
+DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
+FILE_UPLOAD_MAX_MEMORY_SIZE = int(2.5 * 1024 * 1024)  # 2.5MB, luego a disco
 
 # Logging configuration
 LOGGING = {
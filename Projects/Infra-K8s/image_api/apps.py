@@ -1,6 +1,24 @@
+import os
+import sys
+import threading
+
 from django.apps import AppConfig
 
 
 class ImageApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'image_api' 
\ No newline at end of file
+    name = 'image_api'
+
+    def ready(self):
+        """🔥 DÍA 4: pre-calentar el pool de procesos y arrancar el sampler de stats"""
+        from .pool import POOL_PREWARM, get_process_pool
+        from .sampler import STATS_SAMPLER_ENABLED, get_stats_sampler
+
+        # El proceso vigilante del autoreloader de runserver no sirve requests
+        if 'runserver' in sys.argv and os.environ.get('RUN_MAIN') != 'true':
+            return
+        if POOL_PREWARM:
+            threading.Thread(target=get_process_pool().warm_up, name='process-pool-prewarm',
+                             daemon=True).start()
+        if STATS_SAMPLER_ENABLED:
+            get_stats_sampler().start()
@@ -0,0 +1,279 @@
+"""
+📦 Batch Tensor Filters - DÍA 4: Cadenas vectorizadas sobre lotes
+
+Cuando un lote trae muchas imágenes del mismo tamaño (el stress test cicla sobre
+las mismas fuentes) la cadena se ejecuta sobre un tensor 4-D N×H×W×C en lugar
+de una vez por imagen:
+- Las imágenes se agrupan por shape decodificado y cada fuente se decodifica
+  una sola vez aunque el lote la repita
+- brightness, grayscale y el trabajo extra de sharpen son por píxel: una sola
+  llamada sobre el tensor aplanado (N·H)×W×C
+- resize, blur, sharpen y Canny necesitan vecindad dentro de cada imagen: se
+  aplican sobre las vistas contiguas tensor[i] sin copias, escribiendo en un
+  tensor de salida preasignado o in-place
+- resize, blur y brightness reproducen exactamente ImageFilters (remuestreo y
+  blur de PIL por imagen, LUT de brillo): el lote calcula la misma imagen
+- Los grupos de una sola imagen vuelven al FusedChainExecutor (mismas operaciones)
+
+Se probó también el layout H×W×(N·C) para que OpenCV filtrase todo el lote en
+una llamada multicanal, pero apilar y desapilar con stride costaba más que lo
+que ahorraba OpenCV (que ya vectoriza por imagen).
+"""
+
+import os
+import time
+import logging
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List
+
+try:
+    import cv2
+    import numpy as np
+    OPENCV_AVAILABLE = True
+except ImportError:
+    OPENCV_AVAILABLE = False
+    print("⚠️ OpenCV not installed. Run: pip install opencv-python")
+
+from .filters import FilterFactory, ImageFilters
+from .decoding import DecodePlanner
+from .fused import FusedChainExecutor, SHARPEN_KERNEL, MORPH_KERNEL, blur_op, brightness_lut, resize_op
+
+logger = logging.getLogger(__name__)
+
+# Límite de memoria del tensor de un chunk
+BATCH_MAX_BYTES = int(os.getenv('BATCH_MAX_MB', 256)) * 1024 * 1024
+
+# =====================================================================
+# 🔧 OPERACIONES SOBRE EL TENSOR N×H×W×C
+# =====================================================================
+
+def _pixels(tensor):
+    """Vista (N·H)×W×C: todo el lote como una sola imagen alta"""
+    n, height, width, c = tensor.shape
+    return tensor.reshape(n * height, width, c)
+
+
+def _frames(tensor):
+    """Vistas contiguas H×W(×C) de cada imagen del lote"""
+    return [frame[:, :, 0] if frame.shape[2] == 1 else frame for frame in tensor]
+
+
+def batch_resize_op(tensor, size=(800, 600)):
+    """📏 Resize LANCZOS (PIL, con antialias como resize_filter) de cada imagen al tensor de salida"""
+    n, _, _, c = tensor.shape
+    width, height = int(size[0]), int(size[1])
+    resized = np.empty((n, height, width, c), dtype=tensor.dtype)
+    for src, dst in zip(_frames(tensor), _frames(resized)):
+        dst[...] = resize_op(src, (width, height))
+    return resized
+
+
+def batch_blur_op(tensor, radius=2.0):
+    """🌫️ Gaussian blur de PIL imagen a imagen (el kernel no cruza fronteras)"""
+    for frame in _frames(tensor):
+        frame[...] = blur_op(frame, radius)
+    return tensor
+
+
+def batch_brightness_op(tensor, factor=1.2):
+    """☀️ Brillo in-place: una llamada para todo el lote"""
+    pixels = _pixels(tensor)
+    cv2.LUT(pixels, brightness_lut(float(factor)), dst=pixels)
+    return tensor
+
+
+def batch_grayscale_op(tensor):
+    """🌑 BGR -> gris: una llamada para todo el lote"""
+    n, height, width, c = tensor.shape
+    if c == 1:
+        return tensor
+    gray = cv2.cvtColor(_pixels(tensor), cv2.COLOR_BGR2GRAY)
+    return gray.reshape(n, height, width, 1)
+
+
+def batch_sharpen_op(tensor, intensity=3):
+    """⚡ Sharpen in-place; el trabajo extra se calcula una vez sobre todo el lote"""
+    frames = _frames(tensor)
+    pixels = _pixels(tensor)
+    for _ in range(int(intensity)):
+        for frame in frames:
+            cv2.filter2D(frame, -1, SHARPEN_KERNEL, dst=frame)
+        _ = cv2.norm(pixels, cv2.NORM_L2SQR)  # Mismo trabajo extra que sharpen_op
+    return tensor
+
+
+def batch_edges_op(tensor, threshold1=100, threshold2=200):
+    """
+    🔍 Gris vectorizado; Gaussian 5x5, Canny y morfología por imagen
+
+    Canny solo acepta un canal y su histéresis no es local, así que esa parte
+    se recorre imagen a imagen.
+    """
+    gray = batch_grayscale_op(tensor)
+    if gray is tensor:
+        gray = tensor.copy()  # Las ops de bordes no deben tocar el tensor de entrada
+    edges = np.empty_like(gray)
+    for src, dst in zip(_frames(gray), _frames(edges)):
+        cv2.GaussianBlur(src, (5, 5), 0, dst=src)
+        cv2.Canny(src, threshold1, threshold2, edges=dst)
+        cv2.morphologyEx(dst, cv2.MORPH_CLOSE, MORPH_KERNEL, dst=dst)
+        cv2.morphologyEx(dst, cv2.MORPH_OPEN, MORPH_KERNEL, dst=dst)
+        for _ in range(5):
+            _ = np.fft.fft2(dst)  # Mismo trabajo extra que edges_op
+    return edges
+
+
+BATCH_OPS = {
+    'resize': batch_resize_op,
+    'blur': batch_blur_op,
+    'brightness': batch_brightness_op,
+    'grayscale': batch_grayscale_op,
+    'sharpen': batch_sharpen_op,
+    'edges': batch_edges_op,
+}
+
+# =====================================================================
+# 🏭 EJECUTOR POR LOTES
+# =====================================================================
+
+class BatchTensorExecutor:
+    """
+    📦 Ejecuta una cadena de filtros sobre lotes de imágenes del mismo tamaño
+
+    Uso:
+        executor = BatchTensorExecutor(['resize', 'brightness', 'sharpen', 'grayscale'])
+        batch = executor.run(['static/images/sample_4k.jpg'] * 32)
+    """
+
+    def __init__(self, filter_names: List[str], filter_params: dict = None):
+        filter_params = filter_params or {}
+        self.filter_names = list(filter_names)
+        self.filter_params = filter_params
+        self.plan = []
+        for filter_name in self.filter_names:
+            FilterFactory.get_filter(filter_name)  # Valida el nombre igual que la cadena clásica
+            params = FilterFactory._normalize_params(filter_name, filter_params.get(filter_name, {}))
+            self.plan.append((filter_name, BATCH_OPS[filter_name], params))
+        self.fallback = FusedChainExecutor(self.filter_names, self.filter_params)
+
+    def _decode_unique(self, image_paths: List[str], stats: Dict[str, Any]) -> Dict[str, Any]:
+        """📖 Decodificar cada fuente distinta UNA vez (el lote suele repetir archivos)"""
+        decoded = {}
+        for image_path in OrderedDict.fromkeys(image_paths):
+            try:
+                decode_plan = DecodePlanner.plan_for_chain(image_path, self.filter_names, self.filter_params)
+                decoded[image_path] = DecodePlanner.decode_bgr(image_path, decode_plan)
+                stats['decode_count'] += 1
+            except Exception as e:
+                decoded[image_path] = e
+        return decoded
+
+    @staticmethod
+    def _chunk_size(shape) -> int:
+        """Imágenes por tensor según BATCH_MAX_BYTES"""
+        height, width, channels = shape
+        return max(1, BATCH_MAX_BYTES // (height * width * channels))
+
+    def _run_tensor(self, tensor) -> Any:
+        """🚀 Aplicar el plan completo al tensor N×H×W×C"""
+        for filter_name, op, params in self.plan:
+            tensor = op(tensor, **params)
+        return tensor
+
+    def run(self, image_paths: List[str], save: bool = True, return_images: bool = False) -> Dict[str, Any]:
+        """
+        🚀 Procesar un lote de paths
+
+        Args:
+            image_paths: Paths de imagen (pueden repetirse)
+            save: Codificar cada resultado en static/processed/
+            return_images: Incluir el ndarray final (BGR/gris) en cada resultado;
+                es una vista del tensor del chunk, que sigue vivo mientras se use
+        Returns:
+            Dict con un resultado por imagen (en el orden de entrada) y estadísticas
+        """
+        if not OPENCV_AVAILABLE:
+            raise RuntimeError("Batch tensor executor requires OpenCV + NumPy")
+
+        start_time = time.time()
+        stats = {'images': len(image_paths), 'groups': 0, 'chunks': 0, 'batched_images': 0,
+                 'fallback_images': 0, 'decode_count': 0, 'encode_count': 0, 'tensor_shapes': []}
+        results: List[Dict[str, Any]] = [None] * len(image_paths)
+        decoded = self._decode_unique(image_paths, stats)
+
+        # 🧮 Agrupar posiciones del lote por shape decodificado
+        groups: Dict[tuple, List[int]] = OrderedDict()
+        for index, image_path in enumerate(image_paths):
+            arr = decoded[image_path]
+            if isinstance(arr, Exception):
+                results[index] = {'original_path': image_path, 'output_path': None,
+                                  'filters_applied': self.filter_names, 'error': str(arr)}
+                continue
+            groups.setdefault(arr.shape, []).append(index)
+        stats['groups'] = len(groups)
+
+        for shape, indices in groups.items():
+            if len(indices) == 1:
+                # 🔙 Nada que vectorizar: misma cadena por el camino fusionado
+                index = indices[0]
+                group_start = time.time()
+                fused = self.fallback.run(decoded[image_paths[index]], save=save, source_path=image_paths[index])
+                stats['fallback_images'] += 1
+                stats['encode_count'] += fused['stats']['encode_count']
+                results[index] = self._image_result(image_paths[index], fused['final_image'],
+                                                    fused['output_path'], 1, time.time() - group_start,
+                                                    return_images)
+                continue
+
+            chunk = self._chunk_size(shape)
+            for offset in range(0, len(indices), chunk):
+                chunk_indices = indices[offset:offset + chunk]
+                chunk_start = time.time()
+
+                height, width, channels = shape
+                tensor = np.empty((len(chunk_indices), height, width, channels), dtype=np.uint8)
+                for slot, index in enumerate(chunk_indices):
+                    tensor[slot] = decoded[image_paths[index]]
+
+                tensor = self._run_tensor(tensor)
+                stats['chunks'] += 1
+                stats['batched_images'] += len(chunk_indices)
+                stats['tensor_shapes'].append(list(tensor.shape))
+                logger.info(f"📦 Batched {len(chunk_indices)} images {shape} -> {list(tensor.shape)}")
+
+                per_image = (time.time() - chunk_start) / len(chunk_indices)
+                for image, index in zip(_frames(tensor), chunk_indices):
+                    output_path = None
+                    if save:
+                        output_path = ImageFilters._get_output_path(
+                            image_paths[index], "batch", f"_{'-'.join(self.filter_names)}")
+                        cv2.imwrite(output_path, image, [cv2.IMWRITE_JPEG_QUALITY, 95])
+                        stats['encode_count'] += 1
+                    results[index] = self._image_result(image_paths[index], image, output_path,
+                                                        len(chunk_indices), per_image, return_images)
+                del tensor
+
+        return {
+            "results": results,
+            "filters_applied": self.filter_names,
+            "mode": "batch_tensor",
+            "duration": time.time() - start_time,
+            "stats": stats
+        }
+
+    def _image_result(self, image_path: str, image, output_path: str, batch_size: int,
+                      duration: float, return_images: bool) -> Dict[str, Any]:
+        """📋 Resultado individual con el mismo formato para lote y fallback"""
+        result = {
+            'original_path': image_path,
+            'output_path': output_path,
+            'filters_applied': self.filter_names,
+            'batch_size': batch_size,
+            'batched': batch_size > 1,
+            'shape': list(image.shape),
+            'duration': duration
+        }
+        if return_images:
+            result['final_image'] = image
+        return result
@@ -0,0 +1,394 @@
+"""
+🗃️ Result Cache - DÍA 4: Cache content-addressed para cadenas de filtros
+
+La clave de cache es un hash de:
+- contenido de la imagen fuente (sha256, memoizado por path + mtime + tamaño)
+- cadena de filtros normalizada (parámetros completos, con defaults)
+- configuración del encoder (formato + calidad)
+
+Dos niveles:
+- Disco: static/processed/cache/<key>.jpg + <key>.json (metadata), compartido
+  entre procesos y con presupuesto de bytes + evicción LRU
+- Memoria: índice OrderedDict por proceso (orden LRU)
+
+Además, PrefixCache guarda imágenes intermedias en memoria por prefijo de
+cadena, para que ['resize', 'blur', X] reutilice el trabajo de ['resize', 'blur'].
+"""
+
+import io
+import os
+import json
+import time
+import hashlib
+import inspect
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import logging
+
+from .timings import timed
+
+logger = logging.getLogger(__name__)
+
+RESULT_CACHE_ENABLED = os.getenv('RESULT_CACHE_ENABLED', '1').lower() not in ('0', 'false', 'no')
+RESULT_CACHE_DIR = os.getenv('RESULT_CACHE_DIR', 'static/processed/cache')
+RESULT_CACHE_MAX_MB = int(os.getenv('RESULT_CACHE_MAX_MB', 512))
+
+PREFIX_CACHE_ENABLED = os.getenv('PREFIX_CACHE_ENABLED', '1').lower() not in ('0', 'false', 'no')
+PREFIX_CACHE_MAX_MB = int(os.getenv('PREFIX_CACHE_MAX_MB', 64))
+
+ENCODER_SETTINGS = {'format': 'JPEG', 'quality': 95}
+
+# Entradas del memo de hashes de fuentes (LRU)
+SOURCE_HASH_MEMO_MAX = int(os.getenv('SOURCE_HASH_MEMO_MAX', 4096))
+
+# =====================================================================
+# 🔑 CLAVES
+# =====================================================================
+
+# path -> (mtime_ns, tamaño, sha256), orden LRU: una reescritura reemplaza la
+# entrada del path y las fuentes que ya no se usan (uploads, derivados) salen
+_hash_memo: "OrderedDict[str, Tuple[int, int, str]]" = OrderedDict()
+_hash_lock = threading.Lock()
+
+
+def source_hash(image_path: str, read: Callable[[], Any] = None) -> str:
+    """
+    🔑 sha256 del contenido, recalculado solo si cambia mtime o tamaño
+
+    `read` devuelve el contenido ya leído (p.ej. SourceFile.read) para no abrir
+    el archivo una segunda vez; solo se llama si el memo no tiene el hash.
+    """
+    stat = os.stat(image_path)
+    path = str(image_path)
+    with _hash_lock:
+        cached = _hash_memo.get(path)
+        if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            _hash_memo.move_to_end(path)
+            return cached[2]
+
+    digest = hashlib.sha256()
+    if read is not None:
+        digest.update(read())
+    else:
+        with open(image_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+    value = digest.hexdigest()
+
+    with _hash_lock:
+        _hash_memo[path] = (stat.st_mtime_ns, stat.st_size, value)
+        _hash_memo.move_to_end(path)
+        while len(_hash_memo) > SOURCE_HASH_MEMO_MAX:
+            _hash_memo.popitem(last=False)
+    return value
+
+
+def normalize_chain(filter_names: List[str], filter_params: dict = None) -> List[list]:
+    """
+    🔑 Cadena canónica: [[filtro, {param: valor}], ...] con los defaults del filtro
+
+    Así {'blur': {}} y {'blur': {'radius': 2.0}} producen la misma clave.
+    """
+    from .filters import FilterFactory
+
+    filter_params = filter_params or {}
+    chain = []
+    for filter_name in filter_names:
+        filter_func = FilterFactory.get_filter(filter_name)
+        params = FilterFactory._normalize_params(filter_name, filter_params.get(filter_name, {}))
+        resolved = {
+            name: param.default
+            for name, param in inspect.signature(filter_func).parameters.items()
+            if param.default is not inspect.Parameter.empty
+        }
+        for name, value in params.items():
+            default = resolved.get(name)
+            # 2 y 2.0 (o "2") deben dar la misma clave
+            if isinstance(default, (int, float)) and not isinstance(default, bool):
+                value = type(default)(value)
+            resolved[name] = value
+        chain.append([filter_name, {k: list(v) if isinstance(v, tuple) else v
+                                    for k, v in sorted(resolved.items())}])
+    return chain
+
+
+def make_prefix_key(src_hash: str, filter_names: List[str], filter_params: dict = None) -> str:
+    """🔑 Clave de un prefijo de cadena (sin encoder: la imagen vive en memoria)"""
+    payload = {'source': src_hash, 'chain': normalize_chain(filter_names, filter_params)}
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def make_key(src_hash: str, filter_names: List[str], filter_params: dict = None,
+             encoder: dict = None) -> str:
+    """🔑 Clave final de cache (sha256 del JSON canónico)"""
+    payload = {
+        'source': src_hash,
+        'chain': normalize_chain(filter_names, filter_params),
+        'encoder': encoder or ENCODER_SETTINGS,
+    }
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+# =====================================================================
+# 🗃️ CACHE
+# =====================================================================
+
+class ResultCache:
+    """
+    🗃️ Cache de resultados finales con nivel en disco + índice LRU en memoria
+    """
+
+    def __init__(self, cache_dir: str = None, max_bytes: int = None, encoder: dict = None):
+        self.cache_dir = Path(cache_dir or RESULT_CACHE_DIR)
+        self.max_bytes = max_bytes if max_bytes is not None else RESULT_CACHE_MAX_MB * 1024 * 1024
+        self.encoder = encoder or ENCODER_SETTINGS
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self._index: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'puts': 0, 'evictions': 0}
+
+        self._load_index()
+
+    def _paths(self, key: str):
+        return self.cache_dir / f"{key}.jpg", self.cache_dir / f"{key}.json"
+
+    def _read_entry(self, key: str) -> Optional[Dict[str, Any]]:
+        """Leer una entrada del disco (escrita por este u otro proceso)"""
+        image_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path) as f:
+                metadata = json.load(f)
+            size = image_path.stat().st_size
+        except (OSError, ValueError):
+            return None
+        return {'key': key, 'path': str(image_path), 'size': size, 'metadata': metadata}
+
+    def _load_index(self):
+        """Reconstruir el índice desde disco, más antiguos primero"""
+        meta_files = sorted(self.cache_dir.glob('*.json'), key=lambda p: p.stat().st_mtime)
+        for meta_path in meta_files:
+            entry = self._read_entry(meta_path.stem)
+            if entry:
+                self._index[entry['key']] = entry
+                self._total_bytes += entry['size']
+        self._evict()
+        logger.info(f"🗃️ Result cache: {len(self._index)} entries, {self._total_bytes / 1e6:.1f}MB")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """⚡ Buscar un resultado; None si no existe"""
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                entry = self._read_entry(key)
+                if entry:
+                    self._index[key] = entry
+                    self._total_bytes += entry['size']
+            elif not Path(entry['path']).exists():
+                self._drop(key)
+                entry = None
+
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+
+            self._index.move_to_end(key)
+            self.stats['hits'] += 1
+            return dict(entry)
+
+    def put(self, key: str, image: Any, metadata: Dict[str, Any], encoder: dict = None) -> Dict[str, Any]:
+        """💾 Codificar la imagen en el nivel de disco y registrar la entrada (encoder: por defecto el del cache)"""
+        encoder = encoder or self.encoder
+        image_path, meta_path = self._paths(key)
+        tmp_suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+
+        tmp_image = image_path.with_name(image_path.name + tmp_suffix)
+        buffer = io.BytesIO()
+        with timed('encode'):
+            image.save(buffer, format=encoder['format'], quality=encoder['quality'])
+        with timed('write'):
+            with open(tmp_image, 'wb') as f:
+                f.write(buffer.getbuffer())
+            os.replace(tmp_image, image_path)
+
+        metadata = dict(metadata, created_at=time.time(), encoder=encoder)
+        tmp_meta = meta_path.with_name(meta_path.name + tmp_suffix)
+        with open(tmp_meta, 'w') as f:
+            json.dump(metadata, f, default=str)
+        os.replace(tmp_meta, meta_path)
+
+        entry = {'key': key, 'path': str(image_path), 'size': image_path.stat().st_size, 'metadata': metadata}
+        with self._lock:
+            if key in self._index:
+                self._total_bytes -= self._index[key]['size']
+            self._index[key] = entry
+            self._total_bytes += entry['size']
+            self.stats['puts'] += 1
+            self._evict()
+        return dict(entry)
+
+    def _drop(self, key: str):
+        entry = self._index.pop(key, None)
+        if entry:
+            self._total_bytes -= entry['size']
+        for path in self._paths(key):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def _evict(self):
+        """🧹 LRU: borrar las entradas menos usadas hasta caber en el presupuesto"""
+        while self._total_bytes > self.max_bytes and len(self._index) > 1:
+            key = next(iter(self._index))
+            self._drop(key)
+            self.stats['evictions'] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """📊 Estadísticas del cache"""
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return {
+                **self.stats,
+                'entries': len(self._index),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'hit_rate': round(self.stats['hits'] / lookups, 3) if lookups else 0.0,
+                'cache_dir': str(self.cache_dir),
+            }
+
+
+class PrefixCache:
+    """
+    🧩 Cache en memoria de imágenes intermedias por prefijo de cadena
+
+    - Presupuesto en BYTES de imagen (no en número de entradas)
+    - Evicción GreedyDual-Size: prioridad = L + coste / bytes, donde coste es el
+      tiempo acumulado para recalcular el prefijo. Los prefijos caros y pequeños
+      (p.ej. con heavy_sharpen) sobreviven a los baratos y grandes.
+    """
+
+    def __init__(self, max_bytes: int = None):
+        self.max_bytes = max_bytes if max_bytes is not None else PREFIX_CACHE_MAX_MB * 1024 * 1024
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._inflation = 0.0  # L de GreedyDual
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'inserts': 0, 'evictions': 0,
+                      'rejected': 0, 'seconds_saved': 0.0}
+
+    @staticmethod
+    def image_bytes(image: Any) -> int:
+        """Bytes del buffer de una imagen PIL"""
+        return image.width * image.height * len(image.getbands())
+
+    def _priority(self, cost: float, size: int) -> float:
+        return self._inflation + cost / max(size, 1)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """⚡ Buscar un prefijo; un hit renueva su prioridad"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            entry['priority'] = self._priority(entry['cost'], entry['bytes'])
+            self.stats['hits'] += 1
+            self.stats['seconds_saved'] += entry['cost']
+            return entry
+
+    def longest(self, keys: List[str]) -> Tuple[int, Optional[Dict[str, Any]]]:
+        """
+        🔎 Buscar el prefijo cacheado más largo
+
+        Args:
+            keys: claves de los prefijos ordenadas de corto a largo
+        Returns:
+            (longitud del prefijo, entrada) o (0, None); cuenta un solo hit/miss
+        """
+        with self._lock:
+            for length in range(len(keys), 0, -1):
+                entry = self._entries.get(keys[length - 1])
+                if entry is not None:
+                    entry['priority'] = self._priority(entry['cost'], entry['bytes'])
+                    self.stats['hits'] += 1
+                    self.stats['seconds_saved'] += entry['cost']
+                    return length, entry
+            self.stats['misses'] += 1
+            return 0, None
+
+    def put(self, key: str, image: Any, cost: float, filter_results: list) -> bool:
+        """💾 Guardar una imagen intermedia (referencia, sin copia)"""
+        size = self.image_bytes(image)
+        with self._lock:
+            if size > self.max_bytes:
+                self.stats['rejected'] += 1
+                return False
+            old = self._entries.pop(key, None)
+            if old:
+                self._total_bytes -= old['bytes']
+            self._entries[key] = {
+                'image': image,
+                'bytes': size,
+                'cost': cost,
+                'filter_results': filter_results,
+                'priority': self._priority(cost, size),
+            }
+            self._total_bytes += size
+            self.stats['inserts'] += 1
+            self._evict()
+            return key in self._entries
+
+    def _evict(self):
+        """🧹 Sacar la entrada de menor prioridad hasta caber en el presupuesto"""
+        while self._total_bytes > self.max_bytes and self._entries:
+            victim_key = min(self._entries, key=lambda k: self._entries[k]['priority'])
+            victim = self._entries.pop(victim_key)
+            self._inflation = victim['priority']
+            self._total_bytes -= victim['bytes']
+            self.stats['evictions'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """📊 Hits, misses y bytes en uso"""
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return {
+                **self.stats,
+                'seconds_saved': round(self.stats['seconds_saved'], 3),
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'hit_rate': round(self.stats['hits'] / lookups, 3) if lookups else 0.0,
+            }
+
+
+_result_cache = None
+_prefix_cache = None
+_result_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> ResultCache:
+    """🗃️ Cache compartido por proceso (lazy)"""
+    global _result_cache
+    with _result_cache_lock:
+        if _result_cache is None:
+            _result_cache = ResultCache()
+        return _result_cache
+
+
+def get_prefix_cache() -> PrefixCache:
+    """🧩 Cache de prefijos compartido por proceso (lazy)"""
+    global _prefix_cache
+    with _result_cache_lock:
+        if _prefix_cache is None:
+            _prefix_cache = PrefixCache()
+        return _prefix_cache
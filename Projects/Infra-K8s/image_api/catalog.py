@@ -0,0 +1,234 @@
+"""
+🗂️ Image Catalog - DÍA 4: Índice en memoria de static/images
+
+get_available_images(), stress_test y los endpoints de multiprocessing
+hacían glob() del directorio en cada request (y process_batch_distributed y
+el worker usaban una lista fija de dos nombres); ninguno conocía las
+dimensiones. Aquí:
+- Se indexa static/images UNA vez: tamaño, mtime, dimensiones, formato y
+  sha256 del contenido (cabecera PIL, sin decodificar píxeles)
+- Refresco incremental: si cambia el mtime del directorio (altas, bajas,
+  renombrados) o cada CATALOG_RESCAN_INTERVAL (reescrituras en sitio) se
+  hace stat de los archivos y solo se re-indexan los que cambiaron
+- Búsquedas y listados filtrados se sirven desde memoria
+"""
+
+import os
+import time
+import threading
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+import logging
+
+from PIL import Image
+
+from .cache import source_hash
+
+logger = logging.getLogger(__name__)
+
+CATALOG_DIR = os.getenv('IMAGE_CATALOG_DIR', 'static/images')
+# Segundos entre comprobaciones del mtime del directorio (coste: un stat)
+CATALOG_CHECK_INTERVAL = float(os.getenv('CATALOG_CHECK_INTERVAL', 1.0))
+# Segundos entre re-stat de todos los archivos (detecta reescrituras en sitio)
+CATALOG_RESCAN_INTERVAL = float(os.getenv('CATALOG_RESCAN_INTERVAL', 30.0))
+# Paginación de /api/images/
+CATALOG_PAGE_SIZE = int(os.getenv('CATALOG_PAGE_SIZE', 50))
+CATALOG_MAX_PAGE_SIZE = 500
+
+CATALOG_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp'}
+SORT_KEYS = {
+    'name': lambda e: e.name,
+    'size': lambda e: e.size_bytes,
+    'pixels': lambda e: e.width * e.height,
+    'mtime': lambda e: e.mtime_ns,
+}
+
+
+@dataclass(frozen=True)
+class CatalogEntry:
+    """🖼️ Una imagen indexada"""
+    name: str
+    path: str
+    size_bytes: int
+    mtime_ns: int
+    width: int
+    height: int
+    format: str
+    mode: str
+    content_hash: str
+
+    @property
+    def megapixels(self) -> float:
+        return self.width * self.height / 1e6
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data['megapixels'] = round(self.megapixels, 2)
+        data['size_mb'] = round(self.size_bytes / (1024 * 1024), 2)
+        return data
+
+
+class ImageCatalog:
+    """
+    🗂️ Catálogo de imágenes con refresco incremental
+
+    Uso:
+        catalog = get_image_catalog()
+        catalog.get('sample_4k.jpg')                          # CatalogEntry o None
+        catalog.paths(formats={'JPEG'}, min_bytes=100_000)   # paths para procesar
+    """
+
+    def __init__(self, root: str = None):
+        self.root = Path(root or CATALOG_DIR)
+        self._entries: Dict[str, CatalogEntry] = {}
+        self._refresh_lock = threading.Lock()
+        self._dir_mtime_ns: Optional[int] = None
+        self._checked_at = 0.0
+        self._scanned_at = 0.0
+        self.stats = {'scans': 0, 'indexed': 0, 'removed': 0, 'errors': 0, 'last_scan_ms': 0.0}
+
+    # -----------------------------------------------------------------
+    # 🔄 Refresco
+    # -----------------------------------------------------------------
+
+    def _maybe_refresh(self):
+        now = time.monotonic()
+        if self._dir_mtime_ns is not None and now - self._checked_at < CATALOG_CHECK_INTERVAL:
+            return
+        # El primer índice se espera; después, si otro thread ya refresca, se sirve el actual
+        if not self._refresh_lock.acquire(blocking=self._dir_mtime_ns is None):
+            return
+        try:
+            self._checked_at = now
+            try:
+                dir_mtime_ns = os.stat(self.root).st_mtime_ns
+            except FileNotFoundError:
+                dir_mtime_ns = -1
+            if dir_mtime_ns != self._dir_mtime_ns or now - self._scanned_at >= CATALOG_RESCAN_INTERVAL:
+                self._scan(dir_mtime_ns)
+        finally:
+            self._refresh_lock.release()
+
+    def refresh(self, force: bool = False) -> Dict[str, Any]:
+        """🔄 Re-escanear ya (force=True re-indexa también los archivos sin cambios)"""
+        with self._refresh_lock:
+            if force:
+                self._entries = {}
+            try:
+                dir_mtime_ns = os.stat(self.root).st_mtime_ns
+            except FileNotFoundError:
+                dir_mtime_ns = -1
+            self._scan(dir_mtime_ns)
+        return self.get_stats()
+
+    def _scan(self, dir_mtime_ns: int):
+        """stat de cada archivo; solo se abren los nuevos o modificados"""
+        start = time.perf_counter()
+        current = self._entries
+        entries: Dict[str, CatalogEntry] = {}
+        indexed = 0
+        if dir_mtime_ns != -1:
+            with os.scandir(self.root) as it:
+                for dirent in it:
+                    if dirent.name.startswith('.') or Path(dirent.name).suffix.lower() not in CATALOG_EXTENSIONS:
+                        continue
+                    try:
+                        if not dirent.is_file():
+                            continue
+                        stat = dirent.stat()
+                    except FileNotFoundError:
+                        continue
+                    previous = current.get(dirent.name)
+                    if previous and previous.mtime_ns == stat.st_mtime_ns and previous.size_bytes == stat.st_size:
+                        entries[dirent.name] = previous
+                        continue
+                    entry = self._index(dirent.name, stat)
+                    if entry is not None:
+                        entries[dirent.name] = entry
+                        indexed += 1
+
+        removed = len(set(current) - set(entries))
+        self._entries = entries  # Reemplazo atómico: los lectores nunca ven un índice a medias
+        self._dir_mtime_ns = dir_mtime_ns
+        self._scanned_at = time.monotonic()
+        self.stats['scans'] += 1
+        self.stats['indexed'] += indexed
+        self.stats['removed'] += removed
+        self.stats['last_scan_ms'] = round((time.perf_counter() - start) * 1000, 3)
+        if indexed or removed:
+            logger.info(f"🗂️ Catalog {self.root}: {len(entries)} images "
+                        f"(+{indexed} indexed, -{removed} removed, {self.stats['last_scan_ms']}ms)")
+
+    def _index(self, name: str, stat: os.stat_result) -> Optional[CatalogEntry]:
+        path = str(self.root / name)
+        try:
+            with Image.open(path) as image:  # Solo cabecera
+                width, height = image.size
+                image_format, mode = image.format, image.mode
+            return CatalogEntry(
+                name=name,
+                path=path,
+                size_bytes=stat.st_size,
+                mtime_ns=stat.st_mtime_ns,
+                width=width,
+                height=height,
+                format=image_format,
+                mode=mode,
+                content_hash=source_hash(path),
+            )
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.warning(f"⚠️ Catalog skipped {path}: {e}")
+            return None
+
+    # -----------------------------------------------------------------
+    # 🔍 Consultas
+    # -----------------------------------------------------------------
+
+    def get(self, name: str) -> Optional[CatalogEntry]:
+        self._maybe_refresh()
+        return self._entries.get(name)
+
+    def list(self, formats: Iterable[str] = None, min_bytes: int = 0, min_width: int = 0,
+             min_height: int = 0, sort: str = 'name') -> List[CatalogEntry]:
+        """
+        🔍 Imágenes filtradas y ordenadas
+
+        formats: formatos PIL ('JPEG', 'PNG', 'WEBP'); sort: name|size|pixels|mtime,
+        con prefijo '-' para orden descendente. ValueError si sort no es válido.
+        """
+        descending = sort.startswith('-')
+        key = SORT_KEYS.get(sort.lstrip('-'))
+        if key is None:
+            raise ValueError(f"sort must be one of {sorted(SORT_KEYS)} (prefix '-' for descending)")
+        self._maybe_refresh()
+        formats = {f.upper() for f in formats} if formats else None
+        entries = [
+            entry for entry in self._entries.values()
+            if (formats is None or entry.format in formats)
+            and entry.size_bytes >= min_bytes and entry.width >= min_width and entry.height >= min_height
+        ]
+        return sorted(entries, key=key, reverse=descending)
+
+    def paths(self, **filters) -> List[str]:
+        """📂 Paths de list(**filters), listos para los processors"""
+        return [entry.path for entry in self.list(**filters)]
+
+    def get_stats(self) -> Dict[str, Any]:
+        entries = self._entries
+        return dict(self.stats, root=str(self.root), images=len(entries),
+                    total_bytes=sum(e.size_bytes for e in entries.values()))
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_image_catalog() -> ImageCatalog:
+    """🗂️ Catálogo compartido del proceso"""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = ImageCatalog()
+        return _catalog
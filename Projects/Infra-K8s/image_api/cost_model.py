@@ -0,0 +1,370 @@
+"""
+🧮 Filter Cost Model - DÍA 4: Costes aprendidos de ejecuciones reales
+
+_get_recommendation decidía threads vs procesos con una lista fija de filtros
+"pesados", y solo como texto después de ejecutar. Este módulo:
+- Mide cada filtro en la cadena in-memory: tiempo de pared y de CPU por
+  megapíxel y, en una muestra de llamadas, qué fracción del tiempo deja libre
+  el GIL (un thread sonda cuenta cuánto avanza mientras el filtro corre)
+- Acumula medias móviles (EWMA) por filtro y las persiste en JSON entre
+  reinicios (COST_MODEL_PATH)
+- ExecutorDispatcher usa esas estimaciones para elegir inline / threads /
+  procesos y el número de workers de cada lote
+"""
+
+import os
+import json
+import math
+import time
+import atexit
+import threading
+import multiprocessing as mp
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+COST_MODEL_PATH = os.getenv('COST_MODEL_PATH', 'static/processed/cost_model.json')
+COST_MODEL_ALPHA = float(os.getenv('COST_MODEL_ALPHA', 0.2))
+# 1 de cada N llamadas por filtro se mide con la sonda del GIL (0 = nunca)
+COST_MODEL_GIL_SAMPLE_EVERY = int(os.getenv('COST_MODEL_GIL_SAMPLE_EVERY', 10))
+COST_MODEL_SAVE_EVERY = int(os.getenv('COST_MODEL_SAVE_EVERY', 50))
+# Muestras mínimas antes de fiarse de lo aprendido
+COST_MODEL_MIN_SAMPLES = 3
+
+# Fracción sin GIL a partir de la cual los threads escalan como procesos
+GIL_RELEASE_THREADS = float(os.getenv('DISPATCH_GIL_RELEASE_THREADS', 0.7))
+# Lotes por debajo de esto (s estimados) no compensan ningún pool
+DISPATCH_INLINE_SECONDS = float(os.getenv('DISPATCH_INLINE_SECONDS', 0.05))
+# Coste aproximado de IPC + arranque de tarea por imagen en el pool de procesos
+DISPATCH_PROCESS_OVERHEAD_S = float(os.getenv('DISPATCH_PROCESS_OVERHEAD_S', 0.01))
+
+# Antes de tener datos: la lista que usaba _get_recommendation
+DEFAULT_CPU_BOUND = {"sharpen", "heavy_sharpen", "edges", "edge_detection"}
+
+# =====================================================================
+# 🔬 MEDICIÓN
+# =====================================================================
+
+class _GilProbe(threading.Thread):
+    """
+    🔬 Thread Python puro que cuenta iteraciones
+
+    Si el filtro suelta el GIL (código C con Py_BEGIN_ALLOW_THREADS: OpenCV,
+    Pillow, NumPy) la sonda avanza a su ritmo normal; si lo retiene, se para.
+    """
+
+    _idle_rate: Optional[float] = None
+    _calibration_lock = threading.Lock()
+
+    def __init__(self):
+        super().__init__(daemon=True, name='gil-probe')
+        self.count = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        is_set = self._stop_event.is_set
+        while not is_set():
+            self.count += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    @classmethod
+    def idle_rate(cls) -> float:
+        """Iteraciones/s de la sonda sin competencia (se calibra una vez)"""
+        with cls._calibration_lock:
+            if cls._idle_rate is None:
+                probe = cls()
+                start = time.perf_counter()
+                probe.start()
+                time.sleep(0.02)
+                probe.stop()
+                cls._idle_rate = probe.count / (time.perf_counter() - start)
+            return cls._idle_rate
+
+
+class FilterTiming:
+    """
+    ⏱️ Context manager alrededor de una llamada a un filtro
+
+    Uso:
+        with FilterTiming('blur', pixels, probe=True) as timing:
+            result = blur_filter(image)
+        timing.to_dict()  # {'filter', 'pixels', 'wall', 'cpu', 'gil_free'}
+    """
+
+    def __init__(self, filter_name: str, pixels: int, probe: bool = False):
+        self.filter_name = filter_name
+        self.pixels = pixels
+        self.probe = probe
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.gil_free: Optional[float] = None
+        self._probe: Optional[_GilProbe] = None
+
+    def __enter__(self):
+        if self.probe:
+            _GilProbe.idle_rate()
+            self._probe = _GilProbe()
+            self._probe.start()
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.thread_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cpu = time.thread_time() - self._cpu_start
+        self.wall = time.perf_counter() - self._wall_start
+        if self._probe is not None:
+            self._probe.stop()
+            idle = _GilProbe.idle_rate()
+            if self.wall > 0 and idle > 0:
+                self.gil_free = max(0.0, min(1.0, self._probe.count / self.wall / idle))
+            # El filtro compitió con la sonda: su CPU es fiable, su pared no tanto
+        return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'filter': self.filter_name,
+            'pixels': self.pixels,
+            'wall': round(self.wall, 6),
+            'cpu': round(self.cpu, 6),
+            'gil_free': None if self.gil_free is None else round(self.gil_free, 3),
+            'probed': self.probe,
+        }
+
+# =====================================================================
+# 🧮 MODELO
+# =====================================================================
+
+class FilterCostModel:
+    """
+    🧮 EWMA por filtro de ms/MP (pared y CPU) y fracción sin GIL
+
+    Thread-safe; se persiste a JSON cada COST_MODEL_SAVE_EVERY muestras y al salir.
+    """
+
+    def __init__(self, path: str = None, alpha: float = None):
+        self.path = Path(path or COST_MODEL_PATH)
+        self.alpha = COST_MODEL_ALPHA if alpha is None else alpha
+        self.filters: Dict[str, Dict[str, Any]] = {}
+        self._calls: Dict[str, int] = {}
+        self._dirty = 0
+        self._lock = threading.Lock()
+        self.load()
+
+    # 📥 Muestras -----------------------------------------------------
+
+    def should_probe(self, filter_name: str) -> bool:
+        """¿Medir el GIL en esta llamada? (1 de cada N, y siempre las primeras)"""
+        if COST_MODEL_GIL_SAMPLE_EVERY <= 0:
+            return False
+        with self._lock:
+            calls = self._calls.get(filter_name, 0)
+            self._calls[filter_name] = calls + 1
+        stats = self.filters.get(filter_name, {})
+        return (stats.get('gil_samples', 0) < COST_MODEL_MIN_SAMPLES
+                or (calls + 1) % COST_MODEL_GIL_SAMPLE_EVERY == 0)
+
+    def _ewma(self, stats: Dict[str, Any], key: str, value: float, samples: int):
+        # Media simple mientras hay pocas muestras, EWMA después (se adapta a cambios)
+        weight = max(self.alpha, 1.0 / samples)
+        previous = stats.get(key)
+        stats[key] = value if previous is None else previous + weight * (value - previous)
+
+    def record(self, timing: Dict[str, Any]):
+        """📥 Añadir una medición (dict de FilterTiming.to_dict())"""
+        filter_name, pixels = timing.get('filter'), timing.get('pixels') or 0
+        if not filter_name or pixels <= 0 or timing.get('wall') is None:
+            return
+        megapixels = pixels / 1e6
+        with self._lock:
+            stats = self.filters.setdefault(filter_name, {'samples': 0, 'gil_samples': 0})
+            if not timing.get('probed'):
+                # Con la sonda activa la pared está inflada: solo cuenta para el GIL
+                stats['samples'] += 1
+                self._ewma(stats, 'wall_ms_per_mp', timing['wall'] * 1000 / megapixels, stats['samples'])
+                self._ewma(stats, 'cpu_ms_per_mp', timing['cpu'] * 1000 / megapixels, stats['samples'])
+            if timing.get('gil_free') is not None:
+                stats['gil_samples'] += 1
+                self._ewma(stats, 'gil_release', timing['gil_free'], stats['gil_samples'])
+            stats['last_megapixels'] = round(megapixels, 3)
+            stats['updated_at'] = time.time()
+            self._dirty += 1
+            save = self._dirty >= COST_MODEL_SAVE_EVERY
+        if save:
+            self.save()
+
+    def record_many(self, timings: List[Dict[str, Any]]):
+        for timing in timings or []:
+            self.record(timing)
+
+    # 📤 Estimaciones -------------------------------------------------
+
+    def known(self, filter_name: str) -> bool:
+        return self.filters.get(filter_name, {}).get('samples', 0) >= COST_MODEL_MIN_SAMPLES
+
+    def wall_ns_per_px(self, filter_name: str) -> Optional[float]:
+        """ns/píxel aprendidos (= ms/MP), o None si aún no hay datos suficientes"""
+        if not self.known(filter_name):
+            return None
+        return self.filters[filter_name]['wall_ms_per_mp']
+
+    def gil_release(self, filter_name: str) -> Optional[float]:
+        stats = self.filters.get(filter_name, {})
+        if stats.get('gil_samples', 0) < COST_MODEL_MIN_SAMPLES:
+            return None
+        return stats['gil_release']
+
+    def chain_gil_release(self, filter_names: List[str]) -> Optional[float]:
+        """Fracción sin GIL de la cadena, ponderada por el coste de cada filtro"""
+        total = weighted = 0.0
+        for name in filter_names:
+            cost, release = self.wall_ns_per_px(name), self.gil_release(name)
+            if cost is None or release is None:
+                return None
+            total += cost
+            weighted += cost * release
+        return weighted / total if total > 0 else None
+
+    def is_cpu_bound(self, filter_names: List[str]) -> bool:
+        """¿La cadena retiene el GIL lo bastante como para preferir procesos?"""
+        release = self.chain_gil_release(filter_names)
+        if release is None:
+            return any(name in DEFAULT_CPU_BOUND for name in filter_names)
+        return release < GIL_RELEASE_THREADS
+
+    def snapshot(self) -> Dict[str, Any]:
+        """📊 Estimaciones actuales (para la API): aprendidas o, sin datos, las estáticas"""
+        from .scheduler import FILTER_COST_NS
+
+        estimates = {}
+        for name in sorted(set(FILTER_COST_NS) | set(self.filters)):
+            learned = self.wall_ns_per_px(name)
+            estimates[name] = {
+                'wall_ms_per_mp': round(learned if learned is not None else FILTER_COST_NS.get(name, 0.0), 3),
+                'gil_release': None if self.gil_release(name) is None else round(self.gil_release(name), 3),
+                'source': 'learned' if learned is not None else 'prior',
+                'cpu_bound': self.is_cpu_bound([name]),
+            }
+        with self._lock:
+            filters = {}
+            for name, stats in self.filters.items():
+                filters[name] = {
+                    key: round(value, 4) if isinstance(value, float) else value
+                    for key, value in stats.items()
+                }
+                filters[name]['known'] = stats.get('samples', 0) >= COST_MODEL_MIN_SAMPLES
+        return {
+            'path': str(self.path),
+            'alpha': self.alpha,
+            'min_samples': COST_MODEL_MIN_SAMPLES,
+            'gil_sample_every': COST_MODEL_GIL_SAMPLE_EVERY,
+            'estimates': estimates,
+            'filters': filters,
+        }
+
+    # 💾 Persistencia -------------------------------------------------
+
+    def load(self):
+        if not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text())
+            self.filters = data.get('filters', {})
+            logger.info(f"🧮 Cost model loaded: {len(self.filters)} filters from {self.path}")
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Cost model {self.path} unreadable ({e}), starting empty")
+
+    def save(self):
+        """💾 Escritura atómica (tmp + rename): un lector nunca ve un JSON a medias"""
+        with self._lock:
+            data = {'saved_at': time.time(), 'filters': self.filters}
+            self._dirty = 0
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(f'.{os.getpid()}.tmp')
+            tmp.write_text(json.dumps(data, indent=2))
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning(f"⚠️ Cost model save failed: {e}")
+
+# =====================================================================
+# 🚦 DISPATCHER
+# =====================================================================
+
+class ExecutorDispatcher:
+    """
+    🚦 Elegir inline / threads / procesos y workers para cada lote
+
+    Uso:
+        decision = ExecutorDispatcher(max_threads=4, process_workers=pool.max_workers)
+            .choose(image_paths, ['resize', 'sharpen'])
+        decision['executor']  # 'inline' | 'threads' | 'processes'
+    """
+
+    def __init__(self, max_threads: int, process_workers: int, model: FilterCostModel = None):
+        from .scheduler import available_cpus
+
+        self.max_threads = max(1, max_threads)
+        self.process_workers = max(1, process_workers)
+        self.cpus = available_cpus()
+        self.model = model or get_filter_cost_model()
+
+    def choose(self, image_paths: List[str], filter_names: List[str]) -> Dict[str, Any]:
+        from .filters import FilterFactory
+        from .scheduler import LPTScheduler
+
+        count = len(image_paths)
+        decision = {'images': count, 'cpus': self.cpus}
+
+        if any(name not in FilterFactory.AVAILABLE_FILTERS for name in filter_names):
+            # La cadena se simula con sleep: espera pura, los threads la solapan
+            decision.update(executor='threads', workers=min(count, self.max_threads) or 1,
+                            reason='simulated chain (sleep releases the GIL)')
+            return decision
+
+        plan = LPTScheduler(self.process_workers).plan(image_paths, filter_names)
+        total = plan.total_cost
+        release = self.model.chain_gil_release(filter_names)
+        decision.update(estimated_cost=round(total, 4),
+                        gil_release=None if release is None else round(release, 3),
+                        learned=all(self.model.known(name) for name in filter_names))
+
+        if count <= 1 or total < DISPATCH_INLINE_SECONDS:
+            decision.update(executor='inline', workers=1, reason='batch too small to pay for a pool')
+        elif self.cpus == 1:
+            decision.update(executor='inline', workers=1, reason='single CPU: a pool only adds overhead')
+        elif not self.model.is_cpu_bound(filter_names):
+            # Amdahl sobre el GIL: con una fracción r sin GIL los threads escalan hasta ~1/(1-r)
+            limit = self.cpus if release is None or release >= 1.0 else math.ceil(1.0 / (1.0 - release))
+            decision.update(executor='threads', workers=max(1, min(count, self.max_threads, self.cpus, limit)),
+                            reason='chain releases the GIL: threads scale without IPC')
+        elif total / count < DISPATCH_PROCESS_OVERHEAD_S * 2:
+            decision.update(executor='inline', workers=1,
+                            reason='CPU-bound but too cheap per image to amortize process IPC')
+        else:
+            decision.update(executor='processes', workers=min(count, self.process_workers, self.cpus),
+                            reason='chain holds the GIL: processes bypass it')
+        return decision
+
+# =====================================================================
+# 🌍 INSTANCIA COMPARTIDA
+# =====================================================================
+
+_cost_model = None
+_cost_model_lock = threading.Lock()
+
+
+def get_filter_cost_model() -> FilterCostModel:
+    """🧮 Modelo compartido del proceso (se guarda al salir)"""
+    global _cost_model
+    with _cost_model_lock:
+        if _cost_model is None:
+            _cost_model = FilterCostModel()
+            # Solo el proceso principal persiste: los workers devuelven sus mediciones
+            if mp.current_process().name == 'MainProcess':
+                atexit.register(_cost_model.save)
+        return _cost_model
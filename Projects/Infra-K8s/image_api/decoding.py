@@ -0,0 +1,154 @@
+"""
+🔬 Decode Planner - DÍA 4: Decodificación JPEG a escala reducida
+
+Cuando una cadena empieza con un resize hacia abajo no hace falta decodificar
+todos los píxeles: JPEG permite decodificar en el dominio DCT a 1/2, 1/4 o 1/8
+de la resolución. El planner elige la mayor reducción que todavía deja margen
+(`reducing_gap`, igual que Image.thumbnail de Pillow) para terminar con un
+resample LANCZOS de alta calidad.
+"""
+
+import os
+import time
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+try:
+    import cv2
+    import numpy as np
+    OPENCV_AVAILABLE = True
+except ImportError:
+    OPENCV_AVAILABLE = False
+
+JPEG_SCALES = (8, 4, 2)
+
+if OPENCV_AVAILABLE:
+    CV2_REDUCED_FLAGS = {
+        1: cv2.IMREAD_COLOR,
+        2: cv2.IMREAD_REDUCED_COLOR_2,
+        4: cv2.IMREAD_REDUCED_COLOR_4,
+        8: cv2.IMREAD_REDUCED_COLOR_8,
+    }
+
+
+@dataclass
+class DecodePlan:
+    """📋 Cómo decodificar una imagen para una cadena concreta"""
+    scale: int  # Denominador: 1 = resolución completa, 8 = 1/8
+    source_size: Tuple[int, int]
+    target_size: Optional[Tuple[int, int]]
+    format: str
+    decoded_size: Optional[Tuple[int, int]] = None
+    decode_time: Optional[float] = None
+
+    @property
+    def decoded_bytes(self) -> int:
+        """Bytes del buffer RGB decodificado (proxy del pico de memoria)"""
+        width, height = self.decoded_size or self.source_size
+        return width * height * 3
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convertir a diccionario para la metadata del filtro"""
+        data = asdict(self)
+        data['scale_label'] = f"1/{self.scale}"
+        data['decoded_bytes'] = self.decoded_bytes
+        return data
+
+
+def open_source(source: Any) -> Any:
+    """
+    📂 Image.open para un path o un file object en memoria
+
+    Acepta también objetos con stream() (SourceFile): cada apertura recibe un
+    stream nuevo posicionado al inicio, sin volver a leer del disco.
+    """
+    if hasattr(source, 'stream'):
+        source = source.stream()
+    elif hasattr(source, 'seek'):
+        source.seek(0)
+    return Image.open(source)
+
+
+def is_encoded_source(source: Any) -> bool:
+    """¿Es un path o un buffer codificado (en lugar de una imagen ya decodificada)?"""
+    return isinstance(source, (str, Path)) or hasattr(source, 'stream') or hasattr(source, 'getbuffer')
+
+
+class DecodePlanner:
+    """
+    🔬 Elige la escala de decodificación JPEG para un tamaño objetivo
+
+    Regla (la misma que usa Image.draft): la reducción s ∈ {1, 2, 4, 8} más grande
+    tal que el tamaño decodificado siga siendo >= objetivo * reducing_gap.
+    """
+
+    reducing_gap = float(os.getenv('DECODE_REDUCING_GAP', 2.0))
+
+    @classmethod
+    def _min_size(cls, target_size: Tuple[int, int]) -> Tuple[int, int]:
+        return (max(1, int(target_size[0] * cls.reducing_gap)),
+                max(1, int(target_size[1] * cls.reducing_gap)))
+
+    @classmethod
+    def plan(cls, image_path: Any, target_size: Optional[Tuple[int, int]] = None) -> DecodePlan:
+        """📋 Leer solo el header y decidir la escala (path o fuente en memoria)"""
+        with open_source(image_path) as img:
+            source_size = img.size
+            image_format = img.format or ''
+
+        scale = 1
+        if target_size and image_format == 'JPEG':
+            min_w, min_h = cls._min_size(target_size)
+            max_scale = min(source_size[0] // min_w, source_size[1] // min_h)
+            scale = next((s for s in JPEG_SCALES if s <= max_scale), 1)
+
+        return DecodePlan(scale=scale, source_size=source_size,
+                          target_size=tuple(target_size) if target_size else None,
+                          format=image_format)
+
+    @classmethod
+    def plan_for_chain(cls, image_path: Any, filter_names: list, filter_params: dict = None) -> DecodePlan:
+        """📋 Solo se reduce si la cadena EMPIEZA con un resize"""
+        from .filters import FilterFactory
+
+        target_size = None
+        if filter_names and filter_names[0] == 'resize':
+            params = FilterFactory._normalize_params('resize', (filter_params or {}).get('resize', {}))
+            target_size = tuple(params.get('size', (800, 600)))
+        return cls.plan(image_path, target_size)
+
+    @classmethod
+    def decode(cls, image_path: Any, plan: DecodePlan) -> Any:
+        """📖 Decodificar con PIL aplicando draft() según el plan"""
+        start_time = time.time()
+        with open_source(image_path) as img:
+            if plan.scale > 1:
+                img.draft(img.mode, cls._min_size(plan.target_size))
+            img.load()
+        plan.decoded_size = img.size
+        plan.decode_time = time.time() - start_time
+        return img
+
+    @classmethod
+    def decode_bgr(cls, image_path: Any, plan: DecodePlan) -> Any:
+        """📖 Decodificar con OpenCV usando IMREAD_REDUCED_COLOR_* (imread o imdecode)"""
+        start_time = time.time()
+        if isinstance(image_path, (str, Path)):
+            arr = cv2.imread(str(Path(image_path)), CV2_REDUCED_FLAGS[plan.scale])
+        else:
+            stream = image_path.stream() if hasattr(image_path, 'stream') else image_path
+            encoded = np.frombuffer(stream.getbuffer(), dtype=np.uint8)
+            arr = cv2.imdecode(encoded, CV2_REDUCED_FLAGS[plan.scale])
+            del encoded
+        if arr is None:
+            raise ValueError(f"Could not load image: {image_path}")
+        plan.decoded_size = (arr.shape[1], arr.shape[0])
+        plan.decode_time = time.time() - start_time
+        return arr
@@ -0,0 +1,254 @@
+"""
+🖼️ Image Derivatives - DÍA 4: Miniaturas síncronas con cache en disco
+
+Para una miniatura había que encolar una tarea distribuida y hacer polling de
+task_status. /api/image/<name>/?w=&h=&fit=&fmt=&q= la genera en la request:
+- Decode reducido (DecodePlanner) + ImageFilters.resize_filter + recorte
+  opcional (fit=cover)
+- DerivativeCache: ResultCache propio y acotado (LRU en disco), clave
+  content-addressed (hash de la fuente, parámetros normalizados, encoder)
+- Coalescing: N misses simultáneos del mismo derivado lo calculan UNA vez;
+  el resto espera al primero y sirve el mismo archivo
+"""
+
+import os
+import json
+import math
+import hashlib
+import threading
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+import logging
+
+from .cache import ResultCache, source_hash
+from .decoding import DecodePlanner
+from .source import SourceFile
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVE_CACHE_DIR = os.getenv('DERIVATIVE_CACHE_DIR', 'static/processed/derivatives')
+DERIVATIVE_CACHE_MAX_MB = int(os.getenv('DERIVATIVE_CACHE_MAX_MB', 256))
+DERIVATIVE_MAX_DIMENSION = int(os.getenv('DERIVATIVE_MAX_DIMENSION', 4096))
+DERIVATIVE_DEFAULT_QUALITY = int(os.getenv('DERIVATIVE_DEFAULT_QUALITY', 85))
+# Cache-Control para URLs por nombre (la fuente puede cambiar) y versionadas (?v=<hash>)
+DERIVATIVE_MAX_AGE = int(os.getenv('DERIVATIVE_MAX_AGE', 86400))
+DERIVATIVE_IMMUTABLE_MAX_AGE = 31536000
+
+FITS = ('contain', 'cover', 'fill')
+FORMATS = {
+    'jpeg': ('JPEG', '.jpg'),
+    'jpg': ('JPEG', '.jpg'),
+    'png': ('PNG', '.png'),
+    'webp': ('WEBP', '.webp'),
+}
+QUERY_PARAMS = ('w', 'h', 'fit', 'fmt', 'q')
+
+
+@dataclass(frozen=True)
+class DerivativeSpec:
+    """📐 Parámetros normalizados de un derivado"""
+    width: Optional[int]
+    height: Optional[int]
+    fit: str
+    fmt: str  # Clave de FORMATS ya canónica (jpg → jpeg)
+    quality: int
+
+    @classmethod
+    def from_query(cls, query) -> "DerivativeSpec":
+        """📐 Validar ?w=&h=&fit=&fmt=&q= (ValueError con un mensaje para el 400)"""
+        def dimension(name: str) -> Optional[int]:
+            value = query.get(name)
+            if value in (None, ''):
+                return None
+            if not str(value).isdigit() or not 1 <= int(value) <= DERIVATIVE_MAX_DIMENSION:
+                raise ValueError(f"{name} must be an integer between 1 and {DERIVATIVE_MAX_DIMENSION}")
+            return int(value)
+
+        fit = (query.get('fit') or 'contain').lower()
+        if fit not in FITS:
+            raise ValueError(f"fit must be one of {list(FITS)}")
+        fmt = (query.get('fmt') or 'jpeg').lower()
+        if fmt not in FORMATS:
+            raise ValueError(f"fmt must be one of {sorted(FORMATS)}")
+        quality = query.get('q') or DERIVATIVE_DEFAULT_QUALITY
+        if not str(quality).isdigit() or not 1 <= int(quality) <= 100:
+            raise ValueError("q must be an integer between 1 and 100")
+        fmt = 'jpeg' if fmt == 'jpg' else fmt
+        return cls(dimension('w'), dimension('h'), fit, fmt, int(quality))
+
+    @property
+    def encoder(self) -> Dict[str, Any]:
+        return {'format': FORMATS[self.fmt][0], 'quality': self.quality}
+
+    @property
+    def extension(self) -> str:
+        return FORMATS[self.fmt][1]
+
+    def geometry(self, source_size: Tuple[int, int]) -> Tuple[Tuple[int, int], Optional[Tuple[int, int, int, int]]]:
+        """
+        📐 (tamaño del resize, caja de recorte o None)
+
+        contain: cabe en w×h; cover: llena w×h y recorta centrado; fill:
+        exactamente w×h. Con una sola dimensión se conserva la proporción.
+        contain y cover nunca amplían la fuente.
+        """
+        source_w, source_h = source_size
+        if self.width is None and self.height is None:
+            return (source_w, source_h), None
+        if self.width is None or self.height is None:
+            scale = (self.width / source_w) if self.width else (self.height / source_h)
+            scale = min(scale, 1.0)
+            return (max(1, round(source_w * scale)), max(1, round(source_h * scale))), None
+        if self.fit == 'fill':
+            return (self.width, self.height), None
+
+        scale_w, scale_h = self.width / source_w, self.height / source_h
+        if self.fit == 'contain':
+            scale = min(scale_w, scale_h, 1.0)
+            return (max(1, round(source_w * scale)), max(1, round(source_h * scale))), None
+
+        scale = min(max(scale_w, scale_h), 1.0)
+        resized = (max(1, math.ceil(source_w * scale)), max(1, math.ceil(source_h * scale)))
+        crop_w, crop_h = min(self.width, resized[0]), min(self.height, resized[1])
+        left, top = (resized[0] - crop_w) // 2, (resized[1] - crop_h) // 2
+        return resized, (left, top, left + crop_w, top + crop_h)
+
+
+def make_derivative_key(src_hash: str, spec: DerivativeSpec) -> str:
+    """🔑 sha256 del JSON canónico + extensión (el archivo del cache la conserva)"""
+    payload = {'source': src_hash, 'derivative': asdict(spec), 'encoder': spec.encoder}
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode()).hexdigest() + spec.extension
+
+
+class DerivativeCache(ResultCache):
+    """🗃️ ResultCache cuyas claves ya llevan la extensión del formato (abc….webp)"""
+
+    def __init__(self, cache_dir: str = None, max_bytes: int = None):
+        super().__init__(cache_dir or DERIVATIVE_CACHE_DIR,
+                         max_bytes if max_bytes is not None else DERIVATIVE_CACHE_MAX_MB * 1024 * 1024)
+
+    def _paths(self, key: str):
+        return self.cache_dir / key, self.cache_dir / f"{key}.json"
+
+
+class SingleFlight:
+    """
+    🛬 Coalescing: una sola ejecución en vuelo por clave
+
+    Uso:
+        value, leader = flight.do(key, compute)  # leader=False: esperó al cálculo de otro thread
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.stats = {'leaders': 0, 'coalesced': 0}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = {'done': threading.Event(), 'value': None, 'error': None}
+                leader = True
+                self.stats['leaders'] += 1
+            else:
+                leader = False
+                self.stats['coalesced'] += 1
+
+        if not leader:
+            call['done'].wait()
+            if call['error'] is not None:
+                raise call['error']
+            return call['value'], False
+
+        try:
+            call['value'] = fn()
+            return call['value'], True
+        except Exception as e:
+            call['error'] = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call['done'].set()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+class DerivativeService:
+    """
+    🖼️ Derivado servido desde el cache o generado (una vez) en la request
+
+    Uso:
+        entry, status = get_derivative_service().get(path, DerivativeSpec.from_query(request.GET))
+        # status: 'hit' | 'miss' | 'coalesced'
+    """
+
+    def __init__(self, cache: DerivativeCache = None):
+        self.cache = cache or DerivativeCache()
+        self.flight = SingleFlight()
+
+    def get(self, source_path: Path, spec: DerivativeSpec) -> Tuple[Dict[str, Any], str]:
+        src_hash = source_hash(str(source_path))
+        key = make_derivative_key(src_hash, spec)
+        entry = self.cache.get(key)
+        if entry:
+            return entry, 'hit'
+        entry, leader = self.flight.do(key, lambda: self._render(source_path, src_hash, key, spec))
+        return entry, 'miss' if leader else 'coalesced'
+
+    def _render(self, source_path: Path, src_hash: str, key: str, spec: DerivativeSpec) -> Dict[str, Any]:
+        """🎨 Decode reducido → resize_filter → recorte → encode al cache"""
+        from .filters import ImageFilters
+
+        # Otro proceso pudo generarlo mientras esperábamos el lock
+        entry = self.cache._read_entry(key)
+        if entry:
+            return self.cache.get(key) or entry
+
+        with SourceFile(str(source_path)) as source:
+            header = DecodePlanner.plan(source)
+            size, crop = spec.geometry(header.source_size)
+            plan = DecodePlanner.plan(source, size)
+            image = DecodePlanner.decode(source, plan)
+
+        if image.size != size:
+            result = ImageFilters.resize_filter(image, size=size)
+            if 'error' in result:
+                raise RuntimeError(f"resize failed: {result['error']}")
+            image = result['image']
+        if crop:
+            image = image.crop(crop)
+        if spec.encoder['format'] == 'JPEG' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+
+        entry = self.cache.put(key, image, {
+            'source_path': str(source_path),
+            'source_hash': src_hash,
+            'spec': asdict(spec),
+            'size': list(image.size),
+            'decode': plan.to_dict(),
+        }, encoder=spec.encoder)
+        logger.info(f"🖼️ Derivative {source_path.name} {image.size[0]}x{image.size[1]} "
+                    f"{spec.fmt} (decode 1/{plan.scale})")
+        return entry
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {'cache': self.cache.get_stats(), 'coalescing': dict(self.flight.stats, in_flight=self.flight.in_flight())}
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_derivative_service() -> DerivativeService:
+    """🖼️ Servicio compartido del proceso (cache + coalescing)"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = DerivativeService()
+        return _service
@@ -4,6 +4,7 @@
 Implementación de filtros de imagen que evoluciona durante la semana.
 """
 
+import io
 import time
 import threading
 import multiprocessing as mp
@@ -28,6 +29,19 @@ except ImportError:
     OPENCV_AVAILABLE = False
     print("⚠️ OpenCV not installed. Run: pip install opencv-python")
 
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# DÍA 4: Tiling en paralelo para imágenes gigantes + decode a escala reducida
+from .tiling import TiledFilterRunner
+from .cost_model import FilterTiming, get_filter_cost_model
+from .timings import image_timings, timed
+from .decoding import DecodePlanner, open_source, is_encoded_source
+from .cache import (get_result_cache, get_prefix_cache, make_key, make_prefix_key,
+                    source_hash, PREFIX_CACHE_ENABLED)
+
 class ImageFilters:
     
     @staticmethod
@@ -47,6 +61,45 @@ class ImageFilters:
         output_path.parent.mkdir(parents=True, exist_ok=True)
         
         return str(output_path)
+
+    @staticmethod
+    def decode_image(image_path: Any, plan: Any = None) -> Any:
+        """
+        📖 Decodificar una imagen UNA sola vez a un buffer RGB en memoria
+
+        Args:
+            image_path: Path de la imagen original o fuente ya leída (SourceFile / file object)
+            plan: DecodePlan opcional para decodificar JPEG a escala reducida
+        Returns:
+            PIL Image ya cargada (sin file handle abierto)
+        """
+        if plan is not None:
+            img = DecodePlanner.decode(image_path, plan)
+        else:
+            with open_source(image_path) as img:
+                img.load()
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        return img
+
+    @staticmethod
+    def save_image(image: Any, original_path: str, filter_name: str, suffix: str = "") -> str:
+        """
+        💾 Codificar y guardar una imagen PIL en static/processed/
+
+        Returns:
+            Ruta del archivo guardado
+        """
+        output_path = ImageFilters._get_output_path(str(original_path), filter_name, suffix)
+        # DÍA 4: codificar a memoria y escribir aparte para medir cada etapa por separado
+        buffer = io.BytesIO()
+        with timed('encode'):
+            image.save(buffer, format=Image.registered_extensions().get(Path(output_path).suffix.lower(), 'JPEG'),
+                       quality=95)
+        with timed('write'):
+            with open(output_path, 'wb') as f:
+                f.write(buffer.getbuffer())
+        return output_path
     """
     🎨 Colección de filtros para procesamiento de imágenes
     
@@ -75,21 +128,25 @@ class ImageFilters:
                 output_path = None
                 # Si es un path, cargar imagen
                 if isinstance(image_data, (str, Path)):
-                    with Image.open(image_data) as img:
-                        resized = img.resize(size, Image.Resampling.LANCZOS)
-                        # 💾 Guardar imagen procesada
-                        output_path = ImageFilters._get_output_path(str(image_data), "resize", f"_{size[0]}x{size[1]}")
-                        resized.save(output_path, quality=95)
-                        processing_time = time.time() - start_time
-                        print(f"✅ Resize completed in {processing_time:.3f}s")
-                        print(f"💾 Saved to: {output_path}")
-                        return {
-                            "image": resized,
-                            "output_path": output_path,
-                            "filter": "resize",
-                            "duration": processing_time,
-                            "size": size
-                        }
+                    # 🔬 DÍA 4: decodificar a 1/2, 1/4 o 1/8 si el destino es mucho más pequeño
+                    plan = DecodePlanner.plan(image_data, size)
+                    img = DecodePlanner.decode(image_data, plan)
+                    resized = img.resize(size, Image.Resampling.LANCZOS)
+                    # 💾 Guardar imagen procesada
+                    output_path = ImageFilters._get_output_path(str(image_data), "resize", f"_{size[0]}x{size[1]}")
+                    resized.save(output_path, quality=95)
+                    processing_time = time.time() - start_time
+                    print(f"✅ Resize completed in {processing_time:.3f}s (decode 1/{plan.scale})")
+                    print(f"💾 Saved to: {output_path}")
+                    return {
+                        "image": resized,
+                        "output_path": output_path,
+                        "filter": "resize",
+                        "duration": processing_time,
+                        "size": size,
+                        "decode_scale": plan.scale,
+                        "decode": plan.to_dict()
+                    }
                 # Si ya es una imagen PIL
                 elif hasattr(image_data, 'resize'):
                     resized = image_data.resize(size, Image.Resampling.LANCZOS)
@@ -127,6 +184,14 @@ class ImageFilters:
                 "error": str(e)
             }
     
+    @staticmethod
+    def _gaussian_blur(image: Any, radius: float) -> Any:
+        """GaussianBlur de PIL, por tiles en paralelo si la imagen es muy grande"""
+        if OPENCV_AVAILABLE and image.mode in ("RGB", "L") and \
+                TiledFilterRunner.should_tile(image.height, image.width):
+            return TiledFilterRunner.blur(image, radius)
+        return image.filter(ImageFilter.GaussianBlur(radius=radius))
+
     @staticmethod
     def blur_filter(image_data: Any, radius: float = 2.0) -> dict:
         """
@@ -148,7 +213,7 @@ class ImageFilters:
                 # Si es un path, cargar imagen
                 if isinstance(image_data, (str, Path)):
                     with Image.open(image_data) as img:
-                        blurred = img.filter(ImageFilter.GaussianBlur(radius=radius))
+                        blurred = ImageFilters._gaussian_blur(img, radius)
                         # 💾 Guardar imagen procesada
                         output_path = ImageFilters._get_output_path(str(image_data), "blur", f"_r{radius}")
                         blurred.save(output_path, quality=95)
@@ -164,7 +229,7 @@ class ImageFilters:
                         }
                 # Si ya es una imagen PIL
                 elif hasattr(image_data, 'filter'):
-                    blurred = image_data.filter(ImageFilter.GaussianBlur(radius=radius))
+                    blurred = ImageFilters._gaussian_blur(image_data, radius)
                     processing_time = time.time() - start_time
                     print(f"✅ Blur completed in {processing_time:.3f}s")
                     return {
@@ -273,8 +338,74 @@ class ImageFilters:
                 "error": str(e)
             }
 
+    @staticmethod
+    def grayscale_filter(image_data: Any) -> dict:
+        """
+        🌑 Convertir a escala de grises
+
+        DÍA 4: Luminancia ITU-R 601 (convert("L")) devuelta como RGB de 3 canales
+        iguales para que los filtros OpenCV posteriores sigan recibiendo color.
+        Args:
+            image_data: PIL Image object o path de imagen
+        Returns:
+            Dict con imagen procesada y metadata
+        """
+        print(f"🧵 Thread {threading.get_ident()}: Aplicando grayscale filter")
+        start_time = time.time()
+
+        try:
+            if PIL_AVAILABLE:
+                # Si es un path, cargar imagen
+                if isinstance(image_data, (str, Path)):
+                    with Image.open(image_data) as img:
+                        gray = img.convert("L").convert("RGB")
+                        # 💾 Guardar imagen procesada
+                        output_path = ImageFilters._get_output_path(str(image_data), "grayscale")
+                        gray.save(output_path, quality=95)
+                        processing_time = time.time() - start_time
+                        print(f"✅ Grayscale completed in {processing_time:.3f}s")
+                        print(f"💾 Saved to: {output_path}")
+                        return {
+                            "image": gray,
+                            "output_path": output_path,
+                            "filter": "grayscale",
+                            "duration": processing_time
+                        }
+                # Si ya es una imagen PIL
+                elif hasattr(image_data, 'mode'):  # PIL Image check
+                    gray = image_data.convert("L").convert("RGB")
+                    processing_time = time.time() - start_time
+                    print(f"✅ Grayscale completed in {processing_time:.3f}s")
+                    return {
+                        "image": gray,
+                        "output_path": None,
+                        "filter": "grayscale",
+                        "duration": processing_time
+                    }
+
+            # Fallback: simular procesamiento
+            time.sleep(0.1)
+            processing_time = time.time() - start_time
+            print(f"⚠️ Grayscale simulated in {processing_time:.3f}s (PIL not available)")
+            return {
+                "image": image_data,
+                "output_path": None,
+                "filter": "grayscale",
+                "duration": processing_time
+            }
+
+        except Exception as e:
+            print(f"❌ Grayscale error: {e}")
+            return {
+                "image": image_data,
+                "output_path": None,
+                "filter": "grayscale",
+                "duration": time.time() - start_time,
+                "error": str(e)
+            }
+
     # =====================================================================
-    # 🔥 DÍA 2: FILTROS PESADOS PARA MULTIPROCESSING  
+    # 🔥 DÍA 2: FILTROS PESADOS PARA MULTIPROCESSING
     # =====================================================================
     
     @staticmethod
@@ -313,11 +444,17 @@ class ImageFilters:
                                  [-1,  9, -1], 
                                  [-1, -1, -1]], dtype=np.float32)
                 
-                sharpened = img_cv.copy()
-                for i in range(intensity):
-                    sharpened = cv2.filter2D(sharpened, -1, kernel)
-                    # Añadir trabajo extra CPU-intensivo
-                    _ = np.sum(sharpened ** 2)  # Operación costosa
+                if TiledFilterRunner.should_tile(*img_cv.shape[:2]):
+                    # 🧩 Imagen gigante: tiles con halo en paralelo
+                    sharpened = TiledFilterRunner.sharpen(img_cv, intensity)
+                    tiled = True
+                else:
+                    sharpened = img_cv.copy()
+                    for i in range(intensity):
+                        sharpened = cv2.filter2D(sharpened, -1, kernel)
+                        # Añadir trabajo extra CPU-intensivo
+                        _ = np.sum(sharpened ** 2)  # Operación costosa
+                    tiled = False
                 
                 # Convertir de vuelta a PIL
                 sharpened_pil = Image.fromarray(cv2.cvtColor(sharpened, cv2.COLOR_BGR2RGB))
@@ -338,7 +475,8 @@ class ImageFilters:
                     "filter": "heavy_sharpen",
                     "duration": processing_time,
                     "intensity": intensity,
-                    "process_id": process_id
+                    "process_id": process_id,
+                    "tiled": tiled
                 }
             
             # Fallback: simular procesamiento pesado
@@ -397,24 +535,30 @@ class ImageFilters:
                 else:
                     raise ValueError("Unsupported image format")
                 
-                # Convertir a escala de grises
-                gray = cv2.cvtColor(img_cv, cv2.COLOR_BGR2GRAY)
-                
-                # Aplicar filtro Gaussiano (suavizado)
-                blurred = cv2.GaussianBlur(gray, (5, 5), 0)
-                
-                # Detección de bordes Canny (CPU intensivo)
-                edges = cv2.Canny(blurred, threshold1, threshold2)
-                
-                # Operaciones adicionales CPU-intensivas
-                # Morphological operations para limpiar bordes
-                kernel = np.ones((3, 3), np.uint8)
-                edges = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, kernel)
-                edges = cv2.morphologyEx(edges, cv2.MORPH_OPEN, kernel)
-                
-                # Añadir trabajo extra CPU-intensivo
-                for i in range(5):
-                    _ = np.fft.fft2(edges)  # Transformada de Fourier costosa
+                if TiledFilterRunner.should_tile(*img_cv.shape[:2]):
+                    # 🧩 Imagen gigante: Canny local por tiles + histéresis global
+                    edges = TiledFilterRunner.edges(img_cv, threshold1, threshold2)
+                    tiled = True
+                else:
+                    # Convertir a escala de grises
+                    gray = cv2.cvtColor(img_cv, cv2.COLOR_BGR2GRAY)
+                    
+                    # Aplicar filtro Gaussiano (suavizado)
+                    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+                    
+                    # Detección de bordes Canny (CPU intensivo)
+                    edges = cv2.Canny(blurred, threshold1, threshold2)
+                    
+                    # Operaciones adicionales CPU-intensivas
+                    # Morphological operations para limpiar bordes
+                    kernel = np.ones((3, 3), np.uint8)
+                    edges = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, kernel)
+                    edges = cv2.morphologyEx(edges, cv2.MORPH_OPEN, kernel)
+                    
+                    # Añadir trabajo extra CPU-intensivo
+                    for i in range(5):
+                        _ = np.fft.fft2(edges)  # Transformada de Fourier costosa
+                    tiled = False
                 
                 # Convertir edges a imagen RGB para compatibilidad
                 edges_rgb = cv2.cvtColor(edges, cv2.COLOR_GRAY2RGB)
@@ -437,7 +581,8 @@ class ImageFilters:
                     "duration": processing_time,
                     "threshold1": threshold1,
                     "threshold2": threshold2,
-                    "process_id": process_id
+                    "process_id": process_id,
+                    "tiled": tiled
                 }
             
             # Fallback: simular procesamiento pesado
@@ -468,6 +613,77 @@ class ImageFilters:
                 "error": str(e)
             }
 
+# =====================================================================
+# 🧮 CONTABILIDAD DE MEMORIA POR CADENA
+# =====================================================================
+
+def _image_nbytes(image: Any) -> int:
+    """Bytes del buffer de una imagen PIL (0 si no es una imagen)"""
+    if hasattr(image, 'getbands'):
+        return image.width * image.height * len(image.getbands())
+    return 0
+
+
+def _image_pixels(image: Any) -> int:
+    """Píxeles de una imagen PIL (0 si no es una imagen)"""
+    if hasattr(image, 'getbands'):
+        return image.width * image.height
+    return 0
+
+
+class _ChainMemoryTracker:
+    """
+    🧮 Pico y estado estable de buffers de imagen en una cadena
+
+    Durante una etapa están vivos su entrada, su salida y (modo normal) todas
+    las salidas previas retenidas en filter_results. En modo lean solo entrada
+    y salida. Si psutil está disponible se muestrea también el RSS por etapa.
+    Las imágenes que el PrefixCache se queda siguen vivas tras la cadena y
+    cuentan en el estado estable (prefix_cache_bytes).
+    """
+
+    def __init__(self, lean: bool):
+        self.lean = lean
+        self.retained = 0
+        self.input_retained = False
+        self.peak = 0
+        self.cached = 0
+        self.stages = []
+        self._process = psutil.Process() if psutil else None
+        self.rss_start = self._rss()
+        self.rss_peak = self.rss_start
+
+    def _rss(self) -> int:
+        return self._process.memory_info().rss if self._process else 0
+
+    def stage(self, filter_name: str, input_bytes: int, output_bytes: int):
+        live = self.retained + (0 if self.input_retained else input_bytes) + output_bytes
+        self.peak = max(self.peak, live)
+        if not self.lean:
+            self.retained += output_bytes
+            self.input_retained = True
+        rss = self._rss()
+        self.rss_peak = max(self.rss_peak, rss)
+        self.stages.append({'filter': filter_name, 'live_image_bytes': live, 'rss': rss})
+
+    def cache(self, nbytes: int):
+        """Una salida de etapa quedó retenida en el PrefixCache"""
+        self.cached += nbytes
+
+    def report(self, final_bytes: int) -> dict:
+        steady = final_bytes if self.lean else max(self.retained, final_bytes)
+        return {
+            'peak_image_bytes': max(self.peak, final_bytes),
+            # Lo cacheado son las mismas imágenes que final_image (lean) o que
+            # filter_results (normal), así que la unión es el máximo
+            'steady_image_bytes': max(steady, self.cached),
+            'prefix_cache_bytes': self.cached,
+            'rss_start': self.rss_start,
+            'rss_peak_sampled': self.rss_peak,
+            'rss_end': self._rss(),
+            'stages': self.stages
+        }
+
 # =====================================================================
 # 🎯 FACTORY PATTERN PARA FILTROS
 # =====================================================================
@@ -480,7 +696,8 @@ class FilterFactory:
         'resize': ImageFilters.resize_filter,
         'blur': ImageFilters.blur_filter,
         'brightness': ImageFilters.brightness_filter,
-        
+        'grayscale': ImageFilters.grayscale_filter,
+
         # DÍA 2: Filtros pesados (multiprocessing)
         'sharpen': ImageFilters.heavy_sharpen_filter,
         'edges': ImageFilters.edge_detection_filter,
@@ -495,14 +712,67 @@ class FilterFactory:
         
         return cls.AVAILABLE_FILTERS[filter_name]
     
+    @staticmethod
+    def _normalize_params(filter_name: str, params: dict) -> dict:
+        """Convertir parámetros de la API al formato de cada filtro"""
+        if filter_name == 'resize' and params:
+            # Convertir {width: 800, height: 600} a size=(800, 600)
+            if 'width' in params and 'height' in params:
+                params = {'size': (int(params['width']), int(params['height']))}
+        return params
+
     @classmethod
-    def apply_filter_chain(cls, image_data: Any, filter_names: list, filter_params: dict = None) -> Any:
+    def apply_filter_chain(cls, image_data: Any, filter_names: list, filter_params: dict = None,
+                           in_memory: bool = False, save_intermediate: bool = False,
+                           source_path: str = None, use_cache: bool = False,
+                           lean: bool = False) -> Any:
         """
         🔗 Aplicar cadena de filtros secuencialmente
         
         DÍA 2: Actualizado para manejar dict return format con guardado de imágenes
         DÍA 3: Añadido soporte para filter_params
+        DÍA 4: Modo in_memory - decodificar una vez, codificar una vez
+
+        Args:
+            image_data: Path de imagen, PIL Image ya decodificada o (in_memory)
+                fuente ya leída en memoria (SourceFile / file object) junto a source_path
+            filter_names: Lista de filtros a aplicar en orden
+            filter_params: Parámetros por filtro {filter_name: {...}}
+            in_memory: Si True, la fuente se decodifica una sola vez, el mismo
+                buffer pasa por todos los filtros y solo se guarda el resultado final
+            save_intermediate: (solo in_memory) guardar también cada etapa intermedia
+            source_path: Path original para nombrar salidas cuando image_data ya es una imagen
+            use_cache: Buscar/guardar el resultado final en el ResultCache
+                (content-addressed). Un hit no decodifica nada y devuelve
+                final_image=None junto al output_path cacheado.
+            lean: (implica in_memory) filter_results guarda solo metadata y cada
+                imagen intermedia se libera en cuanto la siguiente etapa la consume.
+                El resultado incluye "memory" con el pico y el estado estable.
+
+        DÍA 4: el resultado incluye "timings" con los ns monotónicos de cada
+        etapa (read, decode, filter.<nombre>, encode, write).
         """
+        with image_timings() as timings:
+            result = cls._run_filter_chain(image_data, filter_names, filter_params, in_memory,
+                                           save_intermediate, source_path, use_cache, lean)
+        if isinstance(result, dict):
+            result['timings'] = timings.to_dict()
+        return result
+
+    @classmethod
+    def _run_filter_chain(cls, image_data: Any, filter_names: list, filter_params: dict,
+                          in_memory: bool, save_intermediate: bool, source_path: str,
+                          use_cache: bool, lean: bool) -> Any:
+        """🔗 Cuerpo de apply_filter_chain (cada etapa se mide en la ImageTimings activa)"""
+        if use_cache and PIL_AVAILABLE and (isinstance(image_data, (str, Path))
+                                            or (source_path and is_encoded_source(image_data))):
+            return cls._apply_filter_chain_cached(image_data, filter_names, filter_params, source_path)
+
+        if in_memory or lean:
+            return cls._apply_filter_chain_in_memory(
+                image_data, filter_names, filter_params, save_intermediate, source_path, lean=lean
+            )
+
         result = image_data
         all_results = []
         filter_params = filter_params or {}
@@ -511,19 +781,14 @@ class FilterFactory:
             filter_func = cls.get_filter(filter_name)
             
             # Obtener parámetros específicos para este filtro
-            params = filter_params.get(filter_name, {})
-            
-            # Convertir parámetros según el filtro
-            if filter_name == 'resize' and params:
-                # Convertir {width: 800, height: 600} a size=(800, 600)
-                if 'width' in params and 'height' in params:
-                    params = {'size': (int(params['width']), int(params['height']))}
+            params = cls._normalize_params(filter_name, filter_params.get(filter_name, {}))
             
             # Aplicar filtro con parámetros
-            if params:
-                filter_result = filter_func(result, **params)
-            else:
-                filter_result = filter_func(result)
+            with timed(f'filter.{filter_name}'):
+                if params:
+                    filter_result = filter_func(result, **params)
+                else:
+                    filter_result = filter_func(result)
             
             # Los filtros ahora devuelven dict con metadata
             if isinstance(filter_result, dict) and 'image' in filter_result:
@@ -544,6 +809,182 @@ class FilterFactory:
             "filters_applied": filter_names
         }
 
+    @staticmethod
+    def _strip_images(filter_results: list) -> list:
+        """Metadata de cada filtro sin el objeto imagen (serializable)"""
+        return [{k: v for k, v in r.items() if k != 'image'} for r in filter_results]
+
+    @classmethod
+    def _apply_filter_chain_cached(cls, image_data: Any, filter_names: list, filter_params: dict = None,
+                                   source_path: str = None) -> dict:
+        """
+        🗃️ Cadena con cache content-addressed
+
+        Hit: se devuelve el archivo cacheado sin tocar el decoder.
+        Miss: se ejecuta la cadena in-memory y el resultado final se codifica en el cache.
+        image_data puede ser el path o la fuente ya leída (con source_path).
+        """
+        image_path = source_path or image_data
+        cache = get_result_cache()
+        key = make_key(source_hash(image_path), filter_names, filter_params, cache.encoder)
+
+        entry = cache.get(key)
+        if entry:
+            print(f"⚡ Cache hit: {entry['path']}")
+            return {
+                "final_image": None,
+                "filter_results": entry['metadata'].get('filter_results', []),
+                "filters_applied": filter_names,
+                "output_path": entry['path'],
+                "mode": "cached",
+                "cache_hit": True,
+                "cache_key": key,
+                "decode_count": 0,
+                "encode_count": 0
+            }
+
+        result = cls._apply_filter_chain_in_memory(image_data, filter_names, filter_params,
+                                                   source_path=str(image_path), save_final=False, lean=True)
+        if hasattr(result['final_image'], 'save'):
+            entry = cache.put(key, result['final_image'], {
+                'source_path': str(image_path),
+                'filters_applied': filter_names,
+                'filter_results': result['filter_results'],
+            })
+            result['output_path'] = entry['path']
+            result['encode_count'] += 1
+            print(f"💾 Cached: {entry['path']}")
+
+        result.update(mode="cached", cache_hit=False, cache_key=key)
+        return result
+
+    @classmethod
+    def _apply_filter_chain_in_memory(cls, image_data: Any, filter_names: list, filter_params: dict = None,
+                                      save_intermediate: bool = False, source_path: str = None,
+                                      save_final: bool = True, use_prefix_cache: bool = None,
+                                      lean: bool = False) -> dict:
+        """
+        🧠 Cadena decode-once / encode-once
+
+        La fuente se decodifica una vez, cada filtro recibe la imagen PIL de la etapa
+        anterior (rama sin I/O de los filtros) y solo la imagen final se codifica a disco.
+        DÍA 4: si un prefijo de la cadena ya está en el PrefixCache se reanuda desde
+        ahí (sin decodificar) y cada etapa nueva se ofrece al cache.
+        DÍA 4: en modo lean solo se conserva la metadata de cada etapa y las
+        imágenes intermedias se sueltan en cuanto la siguiente etapa las consume;
+        al PrefixCache solo entra la cadena completa (la imagen final).
+        DÍA 4: cada filtro se mide (pared, CPU, GIL) para el FilterCostModel;
+        las mediciones vuelven en filter_timings.
+        """
+        filter_params = filter_params or {}
+        decode_count = 0
+        encode_count = 0
+        if use_prefix_cache is None:
+            use_prefix_cache = PREFIX_CACHE_ENABLED
+
+        if isinstance(image_data, (str, Path)):
+            source_path = source_path or str(image_data)
+
+        result = image_data
+        all_results = []
+
+        # 🧩 Reanudar desde el prefijo cacheado más largo
+        prefix_cache = None
+        prefix_keys = []
+        resumed_from = 0
+        cost = 0.0
+        memory = _ChainMemoryTracker(lean)
+        cost_model = get_filter_cost_model()
+        timings = []
+
+        if use_prefix_cache and PIL_AVAILABLE and source_path and Path(source_path).exists():
+            prefix_cache = get_prefix_cache()
+            src_hash = source_hash(source_path)
+            prefix_keys = [make_prefix_key(src_hash, filter_names[:length], filter_params)
+                           for length in range(1, len(filter_names) + 1)]
+            resumed_from, entry = prefix_cache.longest(prefix_keys)
+            if entry:
+                result = entry['image']
+                cost = entry['cost']
+                all_results = [dict(r, from_prefix_cache=True) for r in entry['filter_results']]
+                print(f"🧩 Prefix cache hit: {filter_names[:resumed_from]}")
+
+        decode_plan = None
+        if is_encoded_source(result) and PIL_AVAILABLE:
+            # 🔬 Si la cadena empieza con un downscale, decodificar ya reducido
+            with timed('decode'):
+                decode_plan = DecodePlanner.plan_for_chain(result, filter_names, filter_params)
+                result = ImageFilters.decode_image(result, decode_plan)
+            decode_count += 1
+            cost += decode_plan.decode_time or 0.0
+        if lean:
+            image_data = None  # La única referencia al buffer actual es `result`
+
+        for step, filter_name in enumerate(filter_names, start=1):
+            if step <= resumed_from:
+                continue
+            filter_func = cls.get_filter(filter_name)
+            params = cls._normalize_params(filter_name, filter_params.get(filter_name, {}))
+
+            input_bytes = _image_nbytes(result)
+            pixels = _image_pixels(result)
+            with timed(f'filter.{filter_name}'), \
+                    FilterTiming(filter_name, pixels, probe=bool(pixels) and cost_model.should_probe(filter_name)) as timing:
+                filter_result = filter_func(result, **params)
+            if pixels:
+                timings.append(timing.to_dict())
+
+            if isinstance(filter_result, dict) and 'image' in filter_result:
+                result = filter_result['image']
+                memory.stage(filter_name, input_bytes, _image_nbytes(result))
+                # 💾 Guardado intermedio solo si se pide explícitamente
+                if save_intermediate and source_path and hasattr(result, 'save'):
+                    filter_result['output_path'] = ImageFilters.save_image(
+                        result, source_path, filter_name, f"_step{step}"
+                    )
+                    encode_count += 1
+                if step == 1 and decode_plan is not None and filter_name == 'resize':
+                    filter_result['decode_scale'] = decode_plan.scale
+                    filter_result['decode'] = decode_plan.to_dict()
+                all_results.append(filter_result)
+
+                cost += filter_result.get('duration', 0.0)
+                if 'error' in filter_result:
+                    prefix_cache = None  # No cachear prefijos con errores
+                elif (prefix_cache is not None and hasattr(result, 'getbands')
+                      and (not lean or step == len(filter_names))):
+                    # En lean solo se cachea el prefijo completo (la imagen final, que
+                    # ya está viva): cachear cada etapa mantendría vivos los intermedios
+                    if prefix_cache.put(prefix_keys[step - 1], result, cost, cls._strip_images(all_results)):
+                        memory.cache(_image_nbytes(result))
+                if lean:
+                    del filter_result['image']  # Liberar el buffer de esta etapa al avanzar
+            else:
+                result = filter_result
+            print(f"✅ Applied {filter_name} (in-memory)")
+
+        # 💾 Codificar y persistir solo el resultado final
+        output_path = None
+        if save_final and source_path and hasattr(result, 'save'):
+            output_path = ImageFilters.save_image(result, source_path, "chain", f"_{'-'.join(filter_names)}")
+            encode_count += 1
+            print(f"💾 Saved: {output_path}")
+
+        return {
+            "final_image": result,
+            "filter_results": all_results,
+            "filters_applied": filter_names,
+            "output_path": output_path,
+            "mode": "in_memory",
+            "decode_plan": decode_plan.to_dict() if decode_plan else None,
+            "prefix_cache_resumed": resumed_from,
+            "decode_count": decode_count,
+            "encode_count": encode_count,
+            "lean": lean,
+            "memory": memory.report(_image_nbytes(result)),
+            "filter_timings": timings
+        }
+
 # =====================================================================
 # 📋 EJEMPLO DE USO PARA ESTUDIANTES
 # =====================================================================
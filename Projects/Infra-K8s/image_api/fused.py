@@ -0,0 +1,242 @@
+"""
+⚡ Fused Filter Chain - DÍA 4: Ejecutor ndarray nativo
+
+Baja una cadena de FilterFactory a un plan de operaciones NumPy/OpenCV que
+trabaja sobre UN solo layout de color (BGR uint8 contiguo):
+- Decodificar una vez (cv2.imread) y codificar una vez (cv2.imwrite)
+- Sin conversiones PIL <-> cv2 entre filtros
+- Operaciones in-place cuando OpenCV lo permite (blur, brightness, sharpen)
+"""
+
+import time
+import functools
+from pathlib import Path
+from typing import Any, Dict, List
+
+try:
+    from PIL import Image, ImageEnhance, ImageFilter
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+    print("⚠️ PIL not installed. Run: pip install Pillow")
+
+try:
+    import cv2
+    import numpy as np
+    OPENCV_AVAILABLE = True
+except ImportError:
+    OPENCV_AVAILABLE = False
+    print("⚠️ OpenCV not installed. Run: pip install opencv-python")
+
+from .filters import FilterFactory, ImageFilters
+from .decoding import DecodePlanner
+
+if OPENCV_AVAILABLE:
+    SHARPEN_KERNEL = np.array([[-1, -1, -1],
+                               [-1,  9, -1],
+                               [-1, -1, -1]], dtype=np.float32)
+    MORPH_KERNEL = np.ones((3, 3), np.uint8)
+
+# =====================================================================
+# 🔧 OPERACIONES NDARRAY (equivalentes a ImageFilters, sin PIL)
+# =====================================================================
+
+def _pil_op(arr, apply):
+    """
+    🔁 Ejecutar una operación PIL por canal sobre un ndarray uint8
+
+    El orden de canales (BGR) no importa: resize y blur tratan cada canal por
+    separado, así que el resultado es idéntico al de ImageFilters.
+    """
+    return np.array(apply(Image.fromarray(arr)))
+
+
+def resize_op(arr, size=(800, 600)):
+    """
+    📏 Resize LANCZOS de PIL - siempre produce un buffer nuevo
+
+    cv2.INTER_LANCZOS4 no filtra antialias al reducir (hasta 74 niveles de
+    diferencia con resize_filter, que sharpen luego amplifica): se usa el
+    remuestreo de PIL para calcular exactamente la misma imagen.
+    """
+    return _pil_op(arr, lambda img: img.resize(tuple(size), Image.Resampling.LANCZOS))
+
+
+def blur_op(arr, radius=2.0):
+    """🌫️ GaussianBlur de PIL (el de cv2 difiere en redondeo y sharpen lo amplifica)"""
+    return _pil_op(arr, lambda img: img.filter(ImageFilter.GaussianBlur(radius=float(radius))))
+
+
+@functools.lru_cache(maxsize=32)
+def brightness_lut(factor: float):
+    """
+    🎚️ Tabla uint8 -> uint8 de ImageEnhance.Brightness para ese factor
+
+    Se obtiene pasando 0..255 por PIL, así el redondeo es exactamente el de
+    brightness_filter (convertScaleAbs redondea distinto y Canny lo amplifica).
+    """
+    ramp = Image.fromarray(np.arange(256, dtype=np.uint8).reshape(1, 256))
+    return np.asarray(ImageEnhance.Brightness(ramp).enhance(factor)).reshape(256)
+
+
+def brightness_op(arr, factor=1.2):
+    """☀️ Brillo in-place con una LUT (mismos valores que brightness_filter)"""
+    cv2.LUT(arr, brightness_lut(float(factor)), dst=arr)
+    return arr
+
+
+def grayscale_op(arr):
+    """🌑 Luminancia en un solo canal (las ops siguientes aceptan gris)"""
+    return cv2.cvtColor(arr, cv2.COLOR_BGR2GRAY) if arr.ndim == 3 else arr
+
+
+def sharpen_op(arr, intensity=3):
+    """⚡ Sharpen in-place, mismo kernel y repeticiones que heavy_sharpen_filter"""
+    for _ in range(int(intensity)):
+        cv2.filter2D(arr, -1, SHARPEN_KERNEL, dst=arr)
+        # Trabajo extra CPU-intensivo equivalente a np.sum(x ** 2) sin buffer temporal
+        _ = cv2.norm(arr, cv2.NORM_L2SQR)
+    return arr
+
+
+def edges_op(arr, threshold1=100, threshold2=200):
+    """🔍 Canny + morfología; el resultado queda en un solo canal"""
+    gray = cv2.cvtColor(arr, cv2.COLOR_BGR2GRAY) if arr.ndim == 3 else arr
+    cv2.GaussianBlur(gray, (5, 5), 0, dst=gray)
+    edges = cv2.Canny(gray, threshold1, threshold2)
+    cv2.morphologyEx(edges, cv2.MORPH_CLOSE, MORPH_KERNEL, dst=edges)
+    cv2.morphologyEx(edges, cv2.MORPH_OPEN, MORPH_KERNEL, dst=edges)
+    for _ in range(5):
+        _ = np.fft.fft2(edges)  # Mismo trabajo extra que edge_detection_filter
+    return edges
+
+
+# Buffers temporales que una operación crea además de su salida (gris intermedio de
+# Canny, imagen PIL de entrada en resize/blur)
+SCRATCH_BYTES = {
+    'resize': lambda arr: arr.nbytes,
+    'blur': lambda arr: 2 * arr.nbytes,  # Entrada y salida PIL antes de volver a ndarray
+    'edges': lambda arr: arr.shape[0] * arr.shape[1] if arr.ndim == 3 else 0,
+}
+
+FUSED_OPS = {
+    'resize': resize_op,
+    'blur': blur_op,
+    'brightness': brightness_op,
+    'grayscale': grayscale_op,
+    'sharpen': sharpen_op,
+    'edges': edges_op,
+}
+
+# =====================================================================
+# 🏭 EJECUTOR FUSIONADO
+# =====================================================================
+
+class FusedChainExecutor:
+    """
+    ⚡ Ejecuta una cadena de filtros como un plan ndarray-nativo
+
+    Uso:
+        executor = FusedChainExecutor(['resize', 'sharpen', 'brightness', 'edges'])
+        result = executor.run('static/images/sample_4k.jpg')
+    """
+
+    def __init__(self, filter_names: List[str], filter_params: dict = None):
+        filter_params = filter_params or {}
+        self.filter_names = list(filter_names)
+        self.filter_params = filter_params
+        self.plan = []
+        for filter_name in self.filter_names:
+            FilterFactory.get_filter(filter_name)  # Valida el nombre igual que la cadena clásica
+            params = FilterFactory._normalize_params(filter_name, filter_params.get(filter_name, {}))
+            self.plan.append((filter_name, FUSED_OPS[filter_name], params))
+
+    def _to_bgr(self, image_data: Any, stats: Dict[str, int]):
+        """🚪 Frontera de entrada: path, PIL o ndarray -> BGR uint8 contiguo"""
+        if isinstance(image_data, (str, Path)):
+            # 🔬 IMREAD_REDUCED_COLOR_* si la cadena empieza con un downscale
+            decode_plan = DecodePlanner.plan_for_chain(image_data, self.filter_names, self.filter_params)
+            arr = DecodePlanner.decode_bgr(image_data, decode_plan)
+            stats['decode_count'] += 1
+            stats['decode_scale'] = decode_plan.scale
+        elif hasattr(image_data, 'mode'):  # PIL Image
+            rgb = np.asarray(image_data.convert("RGB") if image_data.mode != "RGB" else image_data)
+            arr = cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+            stats['conversions'] += 1
+        elif isinstance(image_data, np.ndarray):
+            # Copia propia: las operaciones in-place no deben tocar el array del caller
+            arr = np.array(image_data, dtype=np.uint8, order='C', copy=True)
+        else:
+            raise ValueError("Unsupported image format")
+
+        stats['bytes_copied'] += arr.nbytes
+        stats['buffers_allocated'] += 1
+        return arr
+
+    def run(self, image_data: Any, save: bool = True, source_path: str = None) -> Dict[str, Any]:
+        """
+        🚀 Ejecutar el plan completo
+
+        Args:
+            image_data: Path de imagen, PIL Image o ndarray BGR
+            save: Codificar y guardar el resultado final en static/processed/
+            source_path: Path original para nombrar la salida si image_data no es un path
+        Returns:
+            Dict con imagen final (ndarray), metadata por filtro y contadores de copias
+        """
+        if not OPENCV_AVAILABLE:
+            raise RuntimeError("Fused executor requires OpenCV + NumPy")
+
+        start_time = time.time()
+        if isinstance(image_data, (str, Path)):
+            source_path = source_path or str(image_data)
+
+        stats = {'bytes_copied': 0, 'buffers_allocated': 0, 'conversions': 0,
+                 'decode_count': 0, 'encode_count': 0}
+        arr = self._to_bgr(image_data, stats)
+
+        filter_results = []
+        for filter_name, op, params in self.plan:
+            op_start = time.time()
+            scratch = SCRATCH_BYTES.get(filter_name, lambda a: 0)(arr)
+            if scratch:
+                stats['bytes_copied'] += scratch
+                stats['buffers_allocated'] += 1
+            out = op(arr, **params)
+            in_place = out is arr
+            if not in_place:
+                stats['bytes_copied'] += out.nbytes
+                stats['buffers_allocated'] += 1
+            arr = out
+            filter_results.append({
+                "filter": filter_name,
+                "duration": time.time() - op_start,
+                "in_place": in_place,
+                "shape": list(arr.shape),
+                **params
+            })
+            print(f"✅ Applied {filter_name} (fused)")
+
+        output_path = None
+        if save and source_path:
+            output_path = ImageFilters._get_output_path(source_path, "fused", f"_{'-'.join(self.filter_names)}")
+            cv2.imwrite(output_path, arr, [cv2.IMWRITE_JPEG_QUALITY, 95])
+            stats['encode_count'] += 1
+            print(f"💾 Saved: {output_path}")
+
+        return {
+            "final_image": arr,
+            "filter_results": filter_results,
+            "filters_applied": self.filter_names,
+            "output_path": output_path,
+            "mode": "fused",
+            "duration": time.time() - start_time,
+            "stats": stats
+        }
+
+    @staticmethod
+    def to_pil(arr) -> Any:
+        """🚪 Frontera de salida: ndarray BGR/gris -> PIL Image"""
+        if arr.ndim == 2:
+            return Image.fromarray(arr)
+        return Image.fromarray(cv2.cvtColor(arr, cv2.COLOR_BGR2RGB))
@@ -0,0 +1,300 @@
+"""
+🏭 Pipelined Executor - DÍA 4: I/O en threads, filtros en procesos, solapados
+
+process_batch_threading y process_batch_multiprocessing meten TODO el lote en
+threads o en procesos, y cada imagen hace lectura → filtros → JPEG de seguido.
+Aquí cada etapa corre en el ejecutor que le conviene y las tres se solapan:
+
+    read/decode (threads) ─▶ [cola acotada] ─▶ filtros (pool de procesos)
+        ─▶ [cola acotada] ─▶ encode/write (threads)
+
+- Los frames viven en un anillo de shared memory (shm.py): el decode escribe
+  en un slot, el worker aplica la cadena fusionada en el mismo slot y el
+  encoder codifica directamente desde él. Por los pipes solo van descriptores
+- Backpressure: si no hay slot libre o la cola siguiente está llena, la
+  etapa anterior espera; el lote nunca tiene más frames vivos que slots
+- cv2.imdecode/imencode liberan el GIL, así que los threads de I/O avanzan
+  mientras los workers filtran
+"""
+
+import os
+import time
+import queue
+import threading
+from collections import Counter
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List
+import logging
+
+try:
+    import cv2
+    OPENCV_AVAILABLE = True
+except ImportError:
+    OPENCV_AVAILABLE = False
+    print("⚠️ OpenCV not installed. Run: pip install opencv-python")
+
+from .filters import FilterFactory, ImageFilters
+from .shm import SHM_CANCEL_GRACE, SHM_MAX_BYTES, SharedFrameRing, cleanup_orphans, load_slot, plan_slots, shm_filter_task
+
+logger = logging.getLogger(__name__)
+
+PIPELINE_READ_WORKERS = int(os.getenv('PIPELINE_READ_WORKERS', 2))
+PIPELINE_ENCODE_WORKERS = int(os.getenv('PIPELINE_ENCODE_WORKERS', 2))
+PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', 4))
+
+_DONE = object()
+
+
+class _StageTimer:
+    """⏱️ Tiempo ocupado acumulado de una etapa (varios threads)"""
+
+    def __init__(self):
+        self.busy = 0.0
+        self.items = 0
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self._lock:
+            self.busy += seconds
+            self.items += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'busy_time': round(self.busy, 4), 'items': self.items}
+
+
+class PipelinedExecutor:
+    """
+    🏭 Lote en tres etapas solapadas con colas acotadas
+
+    Uso:
+        executor = PipelinedExecutor(['resize', 'sharpen'], pool=get_process_pool())
+        for result in executor.iter_run(paths):  # orden de finalización
+            ...
+    """
+
+    def __init__(self, filter_names: List[str], filter_params: dict = None, pool=None,
+                 read_workers: int = None, encode_workers: int = None,
+                 queue_size: int = None, max_bytes: int = None):
+        for filter_name in filter_names:
+            FilterFactory.get_filter(filter_name)  # Validar antes de arrancar nada
+        if pool is None:
+            from .pool import get_process_pool
+            pool = get_process_pool()
+        self.filter_names = filter_names
+        self.filter_params = filter_params or {}
+        self.pool = pool
+        self.read_workers = read_workers or PIPELINE_READ_WORKERS
+        self.encode_workers = encode_workers or PIPELINE_ENCODE_WORKERS
+        self.queue_size = queue_size or PIPELINE_QUEUE_SIZE
+        self.max_bytes = max_bytes or SHM_MAX_BYTES
+        self.stats: Dict[str, Any] = {}
+
+    def run(self, image_paths: List[str], save: bool = True, timeout: float = 60.0) -> Dict[str, Any]:
+        """🚀 Procesar el lote completo (resultados en orden de finalización)"""
+        start_time = time.time()
+        results = list(self.iter_run(image_paths, save=save, timeout=timeout))
+        return {
+            'results': results,
+            'filters_applied': self.filter_names,
+            'mode': 'pipelined',
+            'duration': time.time() - start_time,
+            'stats': self.stats,
+        }
+
+    def iter_run(self, image_paths: List[str], save: bool = True,
+                 timeout: float = 60.0) -> Iterator[Dict[str, Any]]:
+        """
+        🌊 Generador: cada imagen se entrega en cuanto su etapa de encode termina
+
+        timeout: segundos sin que se entregue ninguna imagen (p.ej. una tarea del
+        pool colgada); al vencer, las no entregadas salen como registros de error
+        y stats['timed_out'] queda a True.
+        """
+        if not OPENCV_AVAILABLE:
+            raise RuntimeError("Pipelined executor requires OpenCV + NumPy")
+        cleanup_orphans()
+
+        start_time = time.time()
+        plans, slot_bytes = plan_slots(image_paths, self.filter_names, self.filter_params)
+        slots = min(len(image_paths), max(1, self.max_bytes // slot_bytes)) if slot_bytes else 1
+
+        timers = {'read': _StageTimer(), 'filter': _StageTimer(), 'encode': _StageTimer()}
+        stats = {'images': len(image_paths), 'slots': slots, 'slot_bytes': slot_bytes,
+                 'queue_size': self.queue_size, 'read_workers': self.read_workers,
+                 'encode_workers': self.encode_workers, 'process_workers': self.pool.max_workers,
+                 'read_waits_for_slot': 0, 'max_filter_queue': 0, 'max_encode_queue': 0,
+                 'timed_out': False}
+        self.stats = stats
+        stats_lock = threading.Lock()  # Los contadores se actualizan desde varios threads
+
+        def count(key: str):
+            with stats_lock:
+                stats[key] += 1
+
+        def track_max(key: str, value: int):
+            with stats_lock:
+                stats[key] = max(stats[key], value)
+
+        with SharedFrameRing(max(slot_bytes, 1), slots) as ring:
+            free_slots: "queue.Queue[int]" = queue.Queue()
+            for _ in range(ring.slots):
+                free_slots.put(ring.acquire())
+            filter_queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+            encode_queue: queue.Queue = queue.Queue(maxsize=max(self.queue_size, ring.slots))
+            results: queue.Queue = queue.Queue()
+            stop = threading.Event()
+            submitted = []  # Futures de este lote en el pool compartido
+
+            def put(q: queue.Queue, item) -> bool:
+                """Encolar con backpressure; abandonar si el consumidor cerró el generador"""
+                while not stop.is_set():
+                    try:
+                        q.put(item, timeout=0.1)
+                        return True
+                    except queue.Full:
+                        continue
+                return False
+
+            # 📖 ETAPA 1: leer + decodificar en un slot (threads)
+            def read_stage(image_path: str):
+                plan = plans.get(image_path)
+                if isinstance(plan, Exception) or plan is None:
+                    results.put({'original_path': image_path, 'error': str(plan)})
+                    return
+                if free_slots.empty():
+                    count('read_waits_for_slot')
+                slot = None
+                while slot is None and not stop.is_set():
+                    try:
+                        slot = free_slots.get(timeout=0.1)
+                    except queue.Empty:
+                        continue
+                if slot is None:
+                    return
+                stage_start = time.perf_counter()
+                try:
+                    decode_plan, in_shape, out_shape = plan
+                    frame_in, frame_out = load_slot(ring, slot, image_path, decode_plan, in_shape,
+                                                    out_shape, self.filter_names, self.filter_params)
+                except Exception as e:
+                    free_slots.put(slot)
+                    results.put({'original_path': image_path, 'error': str(e)})
+                    return
+                timers['read'].add(time.perf_counter() - stage_start)
+                if not put(filter_queue, (slot, image_path, frame_in, frame_out)):
+                    free_slots.put(slot)
+                track_max('max_filter_queue', filter_queue.qsize())
+
+            # 🔥 ETAPA 2: cadena fusionada en el pool de procesos (un thread despachador)
+            def filter_stage():
+                while True:
+                    item = filter_queue.get()
+                    if item is _DONE:
+                        break
+                    slot, image_path, frame_in, frame_out = item
+                    try:
+                        future = self.pool.submit(shm_filter_task, image_path, frame_in, frame_out,
+                                                  self.filter_names, self.filter_params, False)
+                    except Exception as e:
+                        free_slots.put(slot)
+                        results.put({'original_path': image_path, 'error': str(e)})
+                        continue
+                    submitted.append(future)
+                    future.add_done_callback(
+                        lambda f, slot=slot, image_path=image_path: encode_queue.put((slot, image_path, f))
+                    )
+
+            # 💾 ETAPA 3: codificar JPEG directamente desde el slot y escribir (threads)
+            def encode_stage():
+                while True:
+                    item = encode_queue.get()
+                    if item is _DONE:
+                        break
+                    slot, image_path, future = item
+                    try:
+                        result = future.result()
+                        timers['filter'].add(result.get('duration', 0.0))
+                        stage_start = time.perf_counter()
+                        frame_out = result.pop('output')
+                        if save:
+                            frame = frame_out.view(ring.shm)
+                            output_path = ImageFilters._get_output_path(
+                                image_path, "pipelined", f"_{'-'.join(self.filter_names)}")
+                            ok = cv2.imwrite(output_path, frame, [cv2.IMWRITE_JPEG_QUALITY, 95])
+                            del frame
+                            if not ok:
+                                raise IOError(f"cv2.imwrite failed for {output_path}")
+                            result['output_path'] = output_path
+                        result['output_shape'] = list(frame_out.shape)
+                        timers['encode'].add(time.perf_counter() - stage_start)
+                        results.put(result)
+                    except CancelledError:
+                        results.put({'original_path': image_path, 'error': 'cancelled'})
+                    except Exception as e:
+                        logger.error(f"❌ Pipeline error {image_path}: {e}")
+                        results.put({'original_path': image_path, 'error': str(e)})
+                    finally:
+                        free_slots.put(slot)
+
+            readers = ThreadPoolExecutor(max_workers=self.read_workers, thread_name_prefix='pipeline-read')
+            dispatcher = threading.Thread(target=filter_stage, name='pipeline-filter', daemon=True)
+            encoders = [threading.Thread(target=encode_stage, name=f'pipeline-encode-{i}', daemon=True)
+                        for i in range(self.encode_workers)]
+            dispatcher.start()
+            for encoder in encoders:
+                encoder.start()
+            read_futures = [readers.submit(read_stage, image_path) for image_path in image_paths]
+
+            delivered = 0
+            delivered_paths = []
+            try:
+                while delivered < len(image_paths):
+                    try:
+                        result = results.get(timeout=timeout)
+                    except queue.Empty:
+                        stats['timed_out'] = True
+                        logger.error(f"❌ Pipeline: no image finished in {timeout}s, "
+                                     f"abandoning {len(image_paths) - delivered}")
+                        stop.set()
+                        for image_path in (Counter(image_paths) - Counter(delivered_paths)).elements():
+                            delivered += 1
+                            yield {'original_path': image_path,
+                                   'error': f"timed out: no pipeline stage finished in {timeout}s"}
+                        break
+                    delivered += 1
+                    delivered_paths.append(result.get('original_path'))
+                    track_max('max_encode_queue', encode_queue.qsize())
+                    yield result
+            finally:
+                # Cierre ordenado: sin más lecturas, cancelar lo que siga en cola del
+                # pool (solo futures propios), drenar lo que corre y luego los encoders
+                stop.set()
+                for future in submitted:
+                    future.cancel()
+                readers.shutdown(wait=True, cancel_futures=True)
+                for future in read_futures:
+                    if not future.cancelled() and future.exception():
+                        logger.error(f"❌ Pipeline read stage error: {future.exception()}")
+                filter_queue.put(_DONE)
+                dispatcher.join()
+                drain_deadline = time.monotonic() + SHM_CANCEL_GRACE
+                while free_slots.qsize() < ring.slots and any(e.is_alive() for e in encoders):
+                    if time.monotonic() > drain_deadline:
+                        # Una tarea colgada conserva su mapeo aunque el anillo se borre
+                        logger.warning(f"⚠️ Pipeline: {ring.slots - free_slots.qsize()} slots "
+                                       f"still in use after {SHM_CANCEL_GRACE}s, unlinking ring")
+                        break
+                    time.sleep(0.01)  # Tareas del pool aún en vuelo escriben en el anillo
+                for _ in encoders:
+                    encode_queue.put(_DONE)
+                for encoder in encoders:
+                    encoder.join()
+
+                wall = time.time() - start_time
+                busy = sum(timer.busy for timer in timers.values())
+                stats['stages'] = {name: timer.to_dict() for name, timer in timers.items()}
+                stats['wall_time'] = round(wall, 4)
+                # > 1.0 significa que las etapas se solaparon
+                stats['overlap'] = round(busy / wall, 2) if wall > 0 else 0.0
+                logger.info(f"🏭 Pipeline: {delivered} imágenes en {wall:.2f}s "
+                            f"(overlap {stats['overlap']}x, {ring.slots} slots)")
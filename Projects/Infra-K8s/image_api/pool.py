@@ -0,0 +1,282 @@
+"""
+🔥 Warm Process Pool - DÍA 4: Pool de procesos persistente entre requests
+
+Antes cada llamada a process_batch_multiprocessing creaba y destruía su propio
+ProcessPoolExecutor: cada request pagaba el spawn de procesos, importar cv2/PIL
+y el teardown. Ahora hay UN pool por proceso de Django, arrancado de forma lazy:
+- Los workers pre-importan OpenCV/Pillow y los módulos de filtros (kernels
+  ya construidos) en el initializer
+- Tamaño configurable (PROCESS_POOL_SIZE) y reciclado de workers cada
+  N tareas (PROCESS_POOL_MAX_TASKS) para acotar fugas de memoria
+- health_check() hace ping a los workers y reconstruye el pool solo si está
+  roto (BrokenProcessPool o workers muertos); un pool ocupado es 'busy'
+- shutdown() se registra con atexit
+"""
+
+import os
+import time
+import atexit
+import threading
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List
+import logging
+
+logger = logging.getLogger(__name__)
+
+POOL_SIZE = int(os.getenv('PROCESS_POOL_SIZE', 0)) or mp.cpu_count()
+POOL_MAX_TASKS = int(os.getenv('PROCESS_POOL_MAX_TASKS', 100))
+POOL_START_METHOD = os.getenv('PROCESS_POOL_START_METHOD', 'spawn')
+POOL_PREWARM = os.getenv('PROCESS_POOL_PREWARM', '0') == '1'
+# Límites del timeout del health check que acepta la API
+POOL_HEALTH_TIMEOUT_MIN = 0.5
+POOL_HEALTH_TIMEOUT_MAX = 30.0
+
+# =====================================================================
+# 🔧 LADO WORKER
+# =====================================================================
+
+_worker_state: Dict[str, Any] = {}
+
+
+def _warm_worker():
+    """
+    🔥 Initializer: pagar los imports y la construcción de kernels UNA vez por worker
+
+    Con spawn el worker arranca con un intérprete vacío; importar aquí evita que
+    la primera tarea de cada request cargue cv2, numpy, PIL y los filtros.
+    """
+    start_time = time.time()
+    from . import filters, fused, batch  # noqa: F401  (cv2, numpy, PIL + SHARPEN/MORPH kernels)
+    from .processors import ImageProcessor
+
+    _worker_state.update(
+        pid=os.getpid(),
+        started_at=time.time(),
+        warm_time=time.time() - start_time,
+        tasks=0,
+        processor=ImageProcessor(),
+    )
+
+
+def _ping() -> Dict[str, Any]:
+    """💓 Tarea trivial para el health check"""
+    return {
+        'pid': os.getpid(),
+        'warm': 'processor' in _worker_state,
+        'warm_time': _worker_state.get('warm_time'),
+        'tasks': _worker_state.get('tasks', 0),
+    }
+
+
+def process_image_task(image_path: str, filters: list, use_cache: bool = None,
+                       tile: bool = False, submitted_ns: int = None, lean: bool = None) -> Dict[str, Any]:
+    """
+    📸 Procesar una imagen en un worker del pool
+
+    Función de módulo (se serializa por referencia): el ImageProcessor ya vive
+    en el worker, así no hay que pickle-ar el del caller en cada submit.
+    submitted_ns es time.monotonic_ns() del padre al enviar: el reloj
+    monotónico es del sistema, así que la espera en cola es comparable.
+    """
+    if 'processor' not in _worker_state:
+        _warm_worker()  # Pool creado sin initializer (p.ej. en tests)
+    _worker_state['tasks'] += 1
+    processor = _worker_state['processor']
+    if use_cache is not None:
+        processor.use_cache = use_cache
+    if lean is not None:
+        processor.lean = lean
+    return processor.process_single_image(image_path, filters, tile=tile, submitted_ns=submitted_ns)
+
+# =====================================================================
+# 🏭 POOL
+# =====================================================================
+
+class WarmProcessPool:
+    """
+    🔥 ProcessPoolExecutor persistente, lazy y auto-reparable
+
+    Uso:
+        pool = get_process_pool()
+        future = pool.submit(process_image_task, 'static/images/sample_4k.jpg', ['resize'])
+    """
+
+    def __init__(self, max_workers: int = None, max_tasks_per_child: int = None,
+                 start_method: str = None):
+        self.max_workers = max_workers or POOL_SIZE
+        self.max_tasks_per_child = POOL_MAX_TASKS if max_tasks_per_child is None else max_tasks_per_child
+        self.start_method = start_method or POOL_START_METHOD
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+        self.stats = {
+            'starts': 0,
+            'restarts': 0,
+            'tasks_submitted': 0,
+            'started_at': None,
+            'last_start_time': None,
+            'last_health_check': None,
+        }
+
+    def __getstate__(self):
+        """Al pickle-ar (p.ej. un ImageProcessor enviado a otro proceso) solo viaja la configuración"""
+        return {'max_workers': self.max_workers, 'max_tasks_per_child': self.max_tasks_per_child,
+                'start_method': self.start_method}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    @property
+    def running(self) -> bool:
+        return self._executor is not None and self._executor_pid == os.getpid()
+
+    def start(self) -> ProcessPoolExecutor:
+        """🚀 Arrancar el pool (si no está ya arrancado en este proceso)"""
+        with self._lock:
+            if self.running:
+                return self._executor
+
+            start_time = time.time()
+            kwargs = {
+                'max_workers': self.max_workers,
+                'mp_context': mp.get_context(self.start_method),
+                'initializer': _warm_worker,
+            }
+            # max_tasks_per_child no admite el contexto fork
+            if self.max_tasks_per_child and self.start_method != 'fork':
+                kwargs['max_tasks_per_child'] = self.max_tasks_per_child
+            self._executor = ProcessPoolExecutor(**kwargs)
+            self._executor_pid = os.getpid()
+
+            self.stats['starts'] += 1
+            self.stats['started_at'] = time.time()
+            self.stats['last_start_time'] = time.time() - start_time
+            logger.info(f"🔥 Warm process pool started: {self.max_workers} workers "
+                        f"({self.start_method}, recycle every {self.max_tasks_per_child} tasks)")
+            return self._executor
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        return self._executor if self.running else self.start()
+
+    def submit(self, fn: Callable, *args, **kwargs):
+        """📤 Enviar una tarea; si el pool está roto se reconstruye y se reintenta una vez"""
+        try:
+            future = self.executor.submit(fn, *args, **kwargs)
+        except (BrokenProcessPool, RuntimeError) as e:
+            logger.warning(f"⚠️ Process pool broken ({e}), restarting")
+            self.restart()
+            future = self.executor.submit(fn, *args, **kwargs)
+        self.stats['tasks_submitted'] += 1
+        return future
+
+    def warm_up(self, timeout: float = 60.0) -> Dict[str, Any]:
+        """🔥 Forzar el arranque de todos los workers (spawn + imports) antes del primer request"""
+        return self.health_check(timeout=timeout)
+
+    def health_check(self, timeout: float = 10.0) -> Dict[str, Any]:
+        """
+        💓 Un ping por worker
+
+        Solo se reconstruye el pool si está roto de verdad (BrokenProcessPool o
+        algún worker muerto con error). Si los pings no vuelven a tiempo el pool
+        está ocupado con trabajo de otros requests: se informa 'busy' y no se
+        toca nada (los pings pendientes se cancelan; son los únicos futures propios).
+        """
+        start_time = time.time()
+        futures = [self.submit(_ping) for _ in range(self.max_workers)]
+        done, not_done = wait(futures, timeout=timeout)
+        for future in not_done:
+            future.cancel()  # Solo se cancela si aún no había empezado
+
+        workers, errors, broken = {}, [], False
+        for future in done:
+            try:
+                info = future.result()
+                workers[info['pid']] = info
+            except BrokenProcessPool as e:
+                broken = True
+                errors.append(str(e))
+            except Exception as e:
+                errors.append(str(e))
+        dead_workers = self._dead_worker_pids()
+        broken = broken or bool(dead_workers)
+
+        if broken:
+            logger.warning(f"⚠️ Process pool broken (dead workers: {dead_workers}, errors: {errors}), restarting")
+            self.restart()
+            status = 'restarted'
+        else:
+            status = 'busy' if not_done else 'healthy'
+
+        report = {
+            'healthy': not broken,
+            'status': status,
+            'responding_workers': len(workers),
+            'workers': list(workers.values()),
+            'timeouts': len(not_done),
+            'dead_workers': dead_workers,
+            'errors': errors,
+            'duration': round(time.time() - start_time, 4),
+        }
+        self.stats['last_health_check'] = {'time': time.time(), 'healthy': not broken, 'status': status}
+        return report
+
+    def _dead_worker_pids(self) -> List[int]:
+        """PIDs de workers que murieron con error (un reciclado por max_tasks_per_child sale con 0)"""
+        if not self.running:
+            return []
+        processes = dict(getattr(self._executor, '_processes', None) or {})
+        return [pid for pid, process in processes.items()
+                if not process.is_alive() and process.exitcode not in (None, 0)]
+
+    def restart(self):
+        """
+        🔄 Descartar el executor roto y arrancar uno nuevo
+
+        No se cancelan futures: pertenecen a otros requests. Si el executor
+        está roto ya fallaron con BrokenProcessPool; si no, los workers viejos
+        terminan su cola y salen.
+        """
+        with self._lock:
+            if self.running:
+                self._executor.shutdown(wait=False, cancel_futures=False)
+            self._executor = None
+            self._executor_pid = None
+        self.stats['restarts'] += 1
+        self.start()
+
+    def shutdown(self, wait: bool = True):
+        """🛑 Cerrar el pool (hook de atexit)"""
+        with self._lock:
+            if self.running:
+                self._executor.shutdown(wait=wait, cancel_futures=not wait)
+                logger.info("🛑 Warm process pool stopped")
+            self._executor = None
+            self._executor_pid = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """📊 Estado del pool"""
+        return {
+            'running': self.running,
+            'max_workers': self.max_workers,
+            'max_tasks_per_child': self.max_tasks_per_child,
+            'start_method': self.start_method,
+            **self.stats,
+        }
+
+
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+
+def get_process_pool(max_workers: int = None) -> WarmProcessPool:
+    """🔥 Pool compartido del proceso (se arranca en el primer submit)"""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = WarmProcessPool(max_workers=max_workers)
+            atexit.register(_process_pool.shutdown)
+        return _process_pool
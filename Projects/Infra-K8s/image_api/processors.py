@@ -7,10 +7,12 @@ Este archivo debe evolucionar durante la semana.
 
 import threading
 import time
+import contextlib
 import multiprocessing as mp
-from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Tuple
 import logging
 
 # DÍA 2: Librerías de procesamiento de imágenes activadas
@@ -29,6 +31,15 @@ except ImportError:
     OPENCV_AVAILABLE = False
     print("⚠️ OpenCV not installed. Run: pip install opencv-python")
 
+from .cache import (RESULT_CACHE_ENABLED, PREFIX_CACHE_ENABLED, get_result_cache,
+                    get_prefix_cache, source_hash)
+from .source import SourceFile
+from .scheduler import LPTScheduler, SCHEDULER_ENABLED
+from .cost_model import ExecutorDispatcher, get_filter_cost_model
+from .timings import ImageTimings, get_stage_histograms
+from .tiling import TiledFilterRunner
+from .pool import get_process_pool, process_image_task
+
 logger = logging.getLogger(__name__)
 
 class ImageProcessor:
@@ -41,10 +52,27 @@ class ImageProcessor:
     DÍA 4: Monitoring y CI/CD
     """
     
-    def __init__(self, max_workers: int = 4, mp_workers: int = None):
+    def __init__(self, max_workers: int = 4, mp_workers: int = None, use_cache: bool = None,
+                 process_pool=None, use_scheduler: bool = None, lean: bool = True):
         self.max_workers = max_workers
-        self.mp_workers = mp_workers or mp.cpu_count()
+        # DÍA 4: pool de procesos persistente compartido entre requests (lazy);
+        # mp_workers solo dimensiona el pool compartido si aún no existe
+        self.process_pool = process_pool or get_process_pool(mp_workers)
+        self.mp_workers = self.process_pool.max_workers
+        # DÍA 4: cache content-addressed de resultados (env RESULT_CACHE_ENABLED)
+        self.use_cache = RESULT_CACHE_ENABLED if use_cache is None else use_cache
+        # DÍA 4: orden de envío LPT (env LPT_SCHEDULER_ENABLED)
+        self.use_scheduler = SCHEDULER_ENABLED if use_scheduler is None else use_scheduler
+        # DÍA 4: cadenas lean (sin imágenes intermedias en filter_results); el
+        # PrefixCache sigue recibiendo las etapas en ambos modos
+        self.lean = lean
+        self.last_schedule = None
+        self.last_pipeline = None
+        # DÍA 4: costes por filtro aprendidos de cada ejecución (persistidos)
+        self.cost_model = get_filter_cost_model()
+        self.last_dispatch = None
         self.processed_count = 0
+        self.bytes_read_total = 0
         # Note: No usar threading.Lock aquí para compatibilidad con multiprocessing
         self._mp_safe = True
         
@@ -54,15 +82,37 @@ class ImageProcessor:
     # 🔥 DÍA 1: THREADING METHODS (COMPLETO)
     # =====================================================================
     
-    def process_single_image(self, image_path: str, filters: List[str]) -> Dict[str, Any]:
+    def process_single_image(self, image_path: str, filters: List[str], tile: bool = False,
+                             submitted_ns: int = None) -> Dict[str, Any]:
         """
         📸 Procesar una imagen individual con múltiples filtros
         
         DÍA 2: Usar imágenes reales + filtros implementados
+        DÍA 4: tile=True reparte los filtros de vecindad por tiles aunque la
+        imagen no supere el umbral (items divididos por el LPT scheduler)
+        DÍA 4: "timings" desglosa la imagen por etapa en ns monotónicos;
+        submitted_ns (time.monotonic_ns() al encolar) añade queue_wait
         """
+        timings = ImageTimings()
+        if submitted_ns is not None:
+            timings.add('queue_wait', timings.started_ns - submitted_ns)
+        with timings.activate():
+            result = self._process_single_image(image_path, filters, tile)
+        result['timings'] = timings.to_dict()
+        if mp.current_process().name == 'MainProcess':
+            get_stage_histograms().record(result['timings'])
+        return result
+
+    def _process_single_image(self, image_path: str, filters: List[str], tile: bool) -> Dict[str, Any]:
+        """📸 Cuerpo de process_single_image (las etapas se miden en la ImageTimings activa)"""
         start_time = time.time()
         thread_id = threading.get_ident()
         process_id = mp.current_process().pid
+        processed_path = None
+        cache_hit = False
+        memory = None
+        filter_timings = []
+        io_info = {'file_size': 0, 'bytes_read': 0, 'read_calls': 0, 'io_mode': None}
         
         logger.info(f"🧵 Thread {thread_id} (Process {process_id}): Procesando {image_path} con filtros {filters}")
         
@@ -74,22 +124,40 @@ class ImageProcessor:
                 # Usar imagen por defecto
                 image_path = "static/images/sample_4k.jpg"
             
-            # Simular procesamiento I/O-bound (leer archivo)
-            with open(image_path, 'rb') as f:
-                image_data = f.read()
-                file_size = len(image_data)
-            
+            # DÍA 4: abrir UNA vez; tamaño por fstat y contenido leído como mucho una vez
+            source = SourceFile(image_path)
+            file_size = source.size
+
             # DÍA 2: Aplicar filtros REALES usando FilterFactory
             try:
                 from .filters import FilterFactory
-                filter_chain_result = FilterFactory.apply_filter_chain(image_path, filters)
+                if self.use_cache or PREFIX_CACHE_ENABLED:
+                    # Hash del cache desde el mismo buffer (memo por mtime/tamaño: en un hit no se lee)
+                    source_hash(image_path, read=source.read)
+                # La cadena decodifica desde el buffer en memoria: ningún filtro reabre el archivo
+                with (TiledFilterRunner.forced() if tile else contextlib.nullcontext()):
+                    filter_chain_result = FilterFactory.apply_filter_chain(
+                        source, filters, source_path=image_path, use_cache=self.use_cache, lean=self.lean
+                    )
                 
                 # Extraer resultados del nuevo formato
                 if isinstance(filter_chain_result, dict):
                     result_image = filter_chain_result.get('final_image')
                     filter_results = filter_chain_result.get('filter_results', [])
                     saved_files = [r.get('output_path') for r in filter_results if r.get('output_path')]
-                    filter_status = f"real_filters_applied_{len(saved_files)}_saved"
+                    if filter_chain_result.get('output_path'):
+                        saved_files.append(filter_chain_result['output_path'])
+                        processed_path = filter_chain_result['output_path']
+                    cache_hit = filter_chain_result.get('cache_hit', False)
+                    memory = filter_chain_result.get('memory')
+                    filter_timings = filter_chain_result.get('filter_timings', [])
+                    if mp.current_process().name == 'MainProcess':
+                        # En workers del pool las mediciones viajan en el resultado y las registra el padre
+                        self.cost_model.record_many(filter_timings)
+                    if cache_hit:
+                        filter_status = "cached"
+                    else:
+                        filter_status = f"real_filters_applied_{len(saved_files)}_saved"
                 else:
                     # Compatibilidad con formato anterior
                     result_image = filter_chain_result
@@ -101,6 +169,10 @@ class ImageProcessor:
                 processing_delay = len(filters) * 0.3
                 time.sleep(processing_delay)
                 filter_status = "simulated_filters"
+            finally:
+                io_info = source.info()
+                source.close()
+                self.bytes_read_total += io_info['bytes_read']
             
             # Thread-safe counter update (for multiprocessing compatibility)
             self.processed_count += 1
@@ -109,56 +181,96 @@ class ImageProcessor:
             logger.error(f"❌ Error procesando {image_path}: {e}")
             file_size = 0
             filter_status = "error"
-            
+
         processing_time = time.time() - start_time
         
         return {
             'original_path': image_path,
-            'processed_path': f'static/processed/{Path(image_path).stem}_filtered.jpg',
+            'processed_path': processed_path or f'static/processed/{Path(image_path).stem}_filtered.jpg',
             'filters_applied': filters,
+            'cache_hit': cache_hit,
+            'memory': memory,
+            'filter_timings': filter_timings,
             'processing_time': processing_time,
             'file_size': file_size,
+            'bytes_read': io_info['bytes_read'],
+            'io': io_info,
             'thread_id': str(thread_id),
             'process_id': process_id,
             'filter_status': filter_status,
             'status': 'success' if Path(image_path).exists() else 'used_fallback'
         }
     
+    def schedule_batch(self, image_paths: List[str], filters: List[str], workers: int) -> List[Tuple[str, bool]]:
+        """
+        📐 Orden de envío LPT (DÍA 4): [(image_path, tile)], la imagen más cara primero
+
+        tile=True marca los items que el scheduler decidió dividir. El plan
+        (makespan previsto FIFO vs LPT) queda en self.last_schedule.
+        """
+        if not self.use_scheduler or len(image_paths) < 2:
+            self.last_schedule = None
+            return [(image_path, False) for image_path in image_paths]
+
+        try:
+            plan = LPTScheduler(workers).plan(image_paths, filters)
+        except Exception as e:
+            logger.warning(f"⚠️ LPT scheduler error: {e}, using list order")
+            self.last_schedule = None
+            return [(image_path, False) for image_path in image_paths]
+
+        self.last_schedule = plan.to_dict()
+        return [(item.image_path, item.split > 1) for item in plan.items]
+
     def process_batch_threading(self, image_paths: List[str], filters: List[str]) -> List[Dict[str, Any]]:
         """
         🚀 Procesar múltiples imágenes en paralelo con ThreadPoolExecutor
         """
         logger.info(f"🚀 Threading batch: {len(image_paths)} imágenes con {self.max_workers} workers")
-        
-        results = []
         start_time = time.time()
-        
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            # Enviar todas las tareas
+
+        results = list(self.iter_batch_threading(image_paths, filters))
+
+        total_time = time.time() - start_time
+        logger.info(f"🎯 Threading batch completado: {len(results)} resultados en {total_time:.2f}s")
+
+        return results
+
+    def iter_batch_threading(self, image_paths: List[str], filters: List[str],
+                             workers: int = None) -> Iterator[Dict[str, Any]]:
+        """
+        🌊 Igual que process_batch_threading pero entrega cada resultado al terminar (DÍA 4)
+
+        Orden de finalización: el primer resultado llega tras una imagen, no tras
+        el lote completo, y el caller no necesita acumular la lista. Si se cierra
+        el generador antes de tiempo se cancelan las tareas pendientes.
+        workers limita los threads de este lote (por defecto max_workers).
+        """
+        workers = workers or self.max_workers
+        executor = ThreadPoolExecutor(max_workers=workers)
+        try:
+            # Enviar todas las tareas (DÍA 4: la más cara primero)
             future_to_image = {
-                executor.submit(self.process_single_image, img_path, filters): img_path 
-                for img_path in image_paths
+                executor.submit(self.process_single_image, img_path, filters, tile, time.monotonic_ns()): img_path
+                for img_path, tile in self.schedule_batch(image_paths, filters, workers)
             }
-            
-            # Recopilar resultados
+
+            # Entregar resultados según terminan
             for future in as_completed(future_to_image):
                 image_path = future_to_image[future]
                 try:
                     result = future.result(timeout=30)
-                    results.append(result)
                     logger.info(f"✅ Threading completed: {image_path}")
                 except Exception as e:
                     logger.error(f"❌ Threading error {image_path}: {e}")
-                    results.append({
+                    result = {
                         'original_path': image_path,
                         'error': str(e),
                         'thread_id': str(threading.get_ident())
-                    })
-        
-        total_time = time.time() - start_time
-        logger.info(f"🎯 Threading batch completado: {len(results)} resultados en {total_time:.2f}s")
-        
-        return results
+                    }
+                yield result
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
 
     # =====================================================================
     # 🔥 DÍA 2: MULTIPROCESSING METHODS (NUEVO)
@@ -169,49 +281,294 @@ class ImageProcessor:
         🔄 Procesar múltiples imágenes con ProcessPoolExecutor (DÍA 2)
         
         NUEVO: Para filtros CPU-intensivos (sharpen, edge_detection)
+        DÍA 4: usa el pool persistente (workers ya calientes) en vez de crear uno por llamada
         """
         logger.info(f"🔄 Multiprocessing batch: {len(image_paths)} imágenes con {self.mp_workers} workers")
-        
-        results = []
         start_time = time.time()
-        
+
+        results = list(self.iter_batch_multiprocessing(image_paths, filters))
+
+        total_time = time.time() - start_time
+        logger.info(f"🎯 MP batch completado: {len(results)} resultados en {total_time:.2f}s")
+
+        return results
+
+    def iter_batch_multiprocessing(self, image_paths: List[str], filters: List[str],
+                                   workers: int = None) -> Iterator[Dict[str, Any]]:
+        """
+        🌊 Versión generador de process_batch_multiprocessing (DÍA 4)
+
+        Entrega los resultados en orden de finalización. El pool es compartido,
+        así que al cerrar el generador solo se cancelan las tareas de este lote.
+        workers (p.ej. el que elige el dispatcher) limita las tareas de este lote
+        en vuelo a la vez y dimensiona el plan LPT; sin él se envía todo el lote.
+        """
+        workers = min(workers, self.mp_workers) if workers else None
+        # Enviar (función de módulo: no se pickle-a self) la más cara primero
+        queued = deque(self.schedule_batch(image_paths, filters, workers or self.mp_workers))
+        window = workers or len(queued)
+        future_to_image = {}
+
+        def submit_next():
+            img_path, tile = queued.popleft()
+            future = self.process_pool.submit(process_image_task, img_path, filters, self.use_cache, tile,
+                                              time.monotonic_ns(), lean=self.lean)
+            future_to_image[future] = img_path
+            return future
+
         try:
-            with ProcessPoolExecutor(max_workers=self.mp_workers) as executor:
-                # Enviar todas las tareas
-                future_to_image = {
-                    executor.submit(self.process_single_image, img_path, filters): img_path 
-                    for img_path in image_paths
-                }
-                
-                # Recopilar resultados
-                for future in as_completed(future_to_image):
+            while queued and len(future_to_image) < window:
+                submit_next()
+        except Exception as e:
+            logger.error(f"❌ Process pool failed: {e}")
+            for future in future_to_image:
+                future.cancel()
+            # Fallback a threading
+            logger.info("🔄 Fallback to threading...")
+            yield from self.iter_batch_threading(image_paths, filters, workers=workers)
+            return
+
+        in_flight = set(future_to_image)
+        try:
+            # Entregar resultados según terminan y rellenar la ventana
+            while in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
                     image_path = future_to_image[future]
                     try:
-                        result = future.result(timeout=60)  # Más tiempo para MP
-                        results.append(result)
+                        result = future.result()
+                        self.cost_model.record_many(result.get('filter_timings'))
+                        get_stage_histograms().record(result.get('timings'))
                         logger.info(f"✅ MP completed: {image_path}")
                     except Exception as e:
                         logger.error(f"❌ MP error {image_path}: {e}")
-                        results.append({
+                        result = {
                             'original_path': image_path,
                             'error': str(e),
                             'process_id': mp.current_process().pid
-                        })
-        
+                        }
+                    self.processed_count += 1
+                    if queued:
+                        try:
+                            in_flight.add(submit_next())
+                        except Exception as e:
+                            logger.error(f"❌ Process pool failed: {e}")
+                            while queued:
+                                yield {'original_path': queued.popleft()[0], 'error': str(e),
+                                       'process_id': mp.current_process().pid}
+                    yield result
+        finally:
+            for future in future_to_image:
+                future.cancel()
+
+    # =====================================================================
+    # 🚦 DÍA 4: DISPATCH AUTOMÁTICO CON EL COST MODEL
+    # =====================================================================
+
+    def dispatch(self, image_paths: List[str], filters: List[str]) -> Dict[str, Any]:
+        """🚦 Decidir inline / threads / procesos y workers para este lote (queda en last_dispatch)"""
+        try:
+            decision = ExecutorDispatcher(self.max_workers, self.mp_workers, self.cost_model).choose(image_paths, filters)
         except Exception as e:
-            logger.error(f"❌ ProcessPoolExecutor failed: {e}")
-            # Fallback a threading
+            logger.warning(f"⚠️ Dispatcher error: {e}, using threading")
+            decision = {'images': len(image_paths), 'executor': 'threads',
+                        'workers': self.max_workers, 'reason': f'dispatcher error: {e}'}
+        self.last_dispatch = decision
+        logger.info(f"🚦 Dispatch: {decision['executor']} x{decision['workers']} ({decision['reason']})")
+        return decision
+
+    def process_batch_auto(self, image_paths: List[str], filters: List[str]) -> List[Dict[str, Any]]:
+        """🚦 Lote con el ejecutor que el cost model considera más rápido"""
+        return list(self.iter_batch_auto(image_paths, filters))
+
+    def iter_batch_auto(self, image_paths: List[str], filters: List[str]) -> Iterator[Dict[str, Any]]:
+        """
+        🌊 Versión generador de process_batch_auto
+
+        inline ejecuta en el thread del caller (sin pool), threads con los
+        workers elegidos y processes en el pool persistente. Al terminar se
+        persisten las mediciones del lote.
+        """
+        decision = self.dispatch(image_paths, filters)
+        try:
+            if decision['executor'] == 'inline':
+                for image_path in image_paths:
+                    yield self.process_single_image(image_path, filters)
+            elif decision['executor'] == 'processes':
+                yield from self.iter_batch_multiprocessing(image_paths, filters, workers=decision['workers'])
+            else:
+                yield from self.iter_batch_threading(image_paths, filters, workers=decision['workers'])
+        finally:
+            self.cost_model.save()
+
+    def process_batch_shared_memory(self, image_paths: List[str], filters: List[str]) -> List[Dict[str, Any]]:
+        """
+        🧠 Multiprocessing con frames en memoria compartida (DÍA 4)
+
+        El padre decodifica cada imagen en un slot de shared_memory y los workers
+        del pool reciben solo descriptores (name, shape, dtype, offset); el
+        resultado vuelve al mismo slot. Por el pipe no viaja ningún frame.
+        """
+        from .shm import SharedMemoryTransport
+
+        logger.info(f"🧠 Shared memory batch: {len(image_paths)} imágenes con {self.mp_workers} workers")
+        start_time = time.time()
+
+        resolved = []
+        for image_path in image_paths:
+            if not Path(image_path).exists():
+                logger.warning(f"⚠️ Imagen no encontrada: {image_path}")
+                image_path = "static/images/sample_4k.jpg"
+            resolved.append(image_path)
+
+        # La más cara primero; los frames ya viajan por slots, no se dividen
+        resolved = [image_path for image_path, _ in self.schedule_batch(resolved, filters, self.mp_workers)]
+
+        try:
+            batch = SharedMemoryTransport(self.process_pool).run(resolved, filters)
+        except Exception as e:
+            logger.error(f"❌ Shared memory transport failed: {e}")
+            logger.info("🔄 Fallback to multiprocessing...")
+            return self.process_batch_multiprocessing(image_paths, filters)
+
+        results = []
+        for item in batch['results']:
+            error = item.get('error')
+            results.append({
+                'original_path': item['original_path'],
+                'processed_path': item.get('output_path'),
+                'filters_applied': filters,
+                'cache_hit': False,
+                'processing_time': item.get('duration', 0.0),
+                'file_size': Path(item['original_path']).stat().st_size if not error else 0,
+                'process_id': item.get('process_id'),
+                'transport': 'shared_memory',
+                'filter_status': "error" if error else "shared_memory",
+                'status': 'error' if error else 'success',
+                **({'error': error} if error else {})
+            })
+        self.processed_count += len(results)
+
+        stats = batch['stats']
+        logger.info(f"🎯 Shared memory batch completado: {len(results)} resultados en {time.time() - start_time:.2f}s "
+                    f"({stats['frame_bytes_shared'] / 1e6:.1f} MB compartidos, {stats['ipc_bytes_pickled']} bytes pickle)")
+        return results
+
+    def process_batch_pipelined(self, image_paths: List[str], filters: List[str]) -> List[Dict[str, Any]]:
+        """
+        🏭 Pipeline híbrido (DÍA 4): lectura/decode en threads, filtros en el pool
+        de procesos y encode/escritura en threads, con colas acotadas entre etapas
+
+        Disco, CPU y JPEG se solapan entre imágenes en lugar de ir uno detrás de otro.
+        """
+        from .pipeline import PipelinedExecutor
+
+        logger.info(f"🏭 Pipelined batch: {len(image_paths)} imágenes con {self.mp_workers} workers")
+        start_time = time.time()
+        self.last_pipeline = None
+
+        resolved = []
+        for image_path in image_paths:
+            if not Path(image_path).exists():
+                logger.warning(f"⚠️ Imagen no encontrada: {image_path}")
+                image_path = "static/images/sample_4k.jpg"
+            resolved.append(image_path)
+        # La más cara primero también aquí: el pool es la etapa cuello de botella
+        resolved = [image_path for image_path, _ in self.schedule_batch(resolved, filters, self.mp_workers)]
+
+        try:
+            executor = PipelinedExecutor(filters, pool=self.process_pool)
+            batch = executor.run(resolved)
+        except Exception as e:
+            logger.error(f"❌ Pipelined executor failed: {e}")
+            logger.info("🔄 Fallback to multiprocessing...")
+            return self.process_batch_multiprocessing(image_paths, filters)
+
+        results = []
+        for item in batch['results']:
+            error = item.get('error')
+            results.append({
+                'original_path': item['original_path'],
+                'processed_path': item.get('output_path'),
+                'filters_applied': filters,
+                'cache_hit': False,
+                'processing_time': item.get('duration', 0.0),
+                'file_size': Path(item['original_path']).stat().st_size if not error else 0,
+                'process_id': item.get('process_id'),
+                'transport': 'pipelined',
+                'filter_status': "error" if error else "pipelined",
+                'status': 'error' if error else 'success',
+                **({'error': error} if error else {})
+            })
+        self.processed_count += len(results)
+        self.last_pipeline = batch['stats']
+
+        logger.info(f"🎯 Pipelined batch completado: {len(results)} resultados en {time.time() - start_time:.2f}s "
+                    f"(overlap {batch['stats'].get('overlap')}x)")
+        return results
+
+    # =====================================================================
+    # 📦 DÍA 4: BATCH TENSOR (lotes del mismo tamaño vectorizados)
+    # =====================================================================
+
+    def process_batch_tensor(self, image_paths: List[str], filters: List[str]) -> List[Dict[str, Any]]:
+        """
+        📦 Procesar el lote apilando imágenes del mismo tamaño en un tensor N×H×W×C
+
+        La cadena se aplica una vez por grupo de shape; las imágenes sin pareja
+        caen al camino fusionado por imagen. Devuelve el mismo formato que
+        process_single_image, en el orden de entrada.
+        """
+        from .batch import BatchTensorExecutor
+
+        logger.info(f"📦 Batch tensor: {len(image_paths)} imágenes con filtros {filters}")
+        start_time = time.time()
+        process_id = mp.current_process().pid
+
+        resolved = []
+        for image_path in image_paths:
+            if not Path(image_path).exists():
+                logger.warning(f"⚠️ Imagen no encontrada: {image_path}")
+                image_path = "static/images/sample_4k.jpg"
+            resolved.append(image_path)
+
+        try:
+            batch = BatchTensorExecutor(filters).run(resolved)
+        except Exception as e:
+            logger.error(f"❌ Batch tensor failed: {e}")
+            # Fallback al camino por imagen
             logger.info("🔄 Fallback to threading...")
             return self.process_batch_threading(image_paths, filters)
-        
+
+        results = []
+        for original, item in zip(image_paths, batch['results']):
+            error = item.get('error')
+            results.append({
+                'original_path': item['original_path'],
+                'processed_path': item.get('output_path'),
+                'filters_applied': filters,
+                'cache_hit': False,
+                'processing_time': item.get('duration', 0.0),
+                'file_size': Path(item['original_path']).stat().st_size if not error else 0,
+                'batch_size': item.get('batch_size', 0),
+                'thread_id': str(threading.get_ident()),
+                'process_id': process_id,
+                'filter_status': "error" if error else ("batch_tensor" if item.get('batched') else "fused_fallback"),
+                'status': 'error' if error else ('success' if Path(original).exists() else 'used_fallback'),
+                **({'error': error} if error else {})
+            })
+        self.processed_count += len(results)
+
         total_time = time.time() - start_time
-        logger.info(f"🎯 MP batch completado: {len(results)} resultados en {total_time:.2f}s")
-        
+        logger.info(f"🎯 Batch tensor completado: {len(results)} resultados en {total_time:.2f}s "
+                    f"({batch['stats']['chunks']} tensores, {batch['stats']['fallback_images']} por imagen)")
         return results
-    
+
     def compare_performance(self, image_paths: List[str], filters: List[str]) -> Dict[str, Any]:
         """
         📊 Comparar rendimiento: Sequential vs Threading vs Multiprocessing (DÍA 2)
+
+        DÍA 4: incluye el pipeline híbrido (threads I/O + procesos CPU)
         """
         logger.info(f"📊 Performance comparison: {len(image_paths)} imágenes, {len(filters)} filtros")
         
@@ -232,20 +589,28 @@ class ImageProcessor:
         mp_start = time.time()
         mp_results = self.process_batch_multiprocessing(image_paths, filters)
         mp_time = time.time() - mp_start
+
+        # 4. Pipeline híbrido (DÍA 4)
+        pipelined_start = time.time()
+        pipelined_results = self.process_batch_pipelined(image_paths, filters)
+        pipelined_time = time.time() - pipelined_start
         
         # Calcular métricas
         seq_success = sum(1 for r in sequential_results if r.get("status") == "success")
         thr_success = sum(1 for r in threading_results if r.get("status") == "success")
         mp_success = sum(1 for r in mp_results if r.get("status") == "success")
+        pipelined_success = sum(1 for r in pipelined_results if r.get("status") == "success")
         
         threading_speedup = sequential_time / threading_time if threading_time > 0 else 1.0
         mp_speedup = sequential_time / mp_time if mp_time > 0 else 1.0
+        pipelined_speedup = sequential_time / pipelined_time if pipelined_time > 0 else 1.0
         
         # Determinar ganador
         times = {
             "sequential": sequential_time,
             "threading": threading_time,
-            "multiprocessing": mp_time
+            "multiprocessing": mp_time,
+            "pipelined": pipelined_time
         }
         winner = min(times, key=times.get)
         
@@ -273,28 +638,44 @@ class ImageProcessor:
                     "success_count": mp_success,
                     "throughput": round(len(image_paths) / mp_time, 2),
                     "speedup": round(mp_speedup, 2)
+                },
+                "pipelined": {
+                    "time": round(pipelined_time, 3),
+                    "success_count": pipelined_success,
+                    "throughput": round(len(image_paths) / pipelined_time, 2),
+                    "speedup": round(pipelined_speedup, 2),
+                    "stages": self.last_pipeline
                 }
             },
             "performance": {
                 "winner": winner,
                 "threading_speedup": round(threading_speedup, 2),
                 "mp_speedup": round(mp_speedup, 2),
+                "pipelined_speedup": round(pipelined_speedup, 2),
                 "threading_improvement": round((threading_speedup - 1) * 100, 1),
                 "mp_improvement": round((mp_speedup - 1) * 100, 1),
-                "recommendation": self._get_recommendation(filters, threading_speedup, mp_speedup)
+                "recommendation": self._get_recommendation(filters, threading_speedup, mp_speedup,
+                                                           pipelined_speedup)
             }
         }
         
-        logger.info(f"📈 Performance comparison complete - Threading: {threading_speedup:.2f}x, MP: {mp_speedup:.2f}x")
+        logger.info(f"📈 Performance comparison complete - Threading: {threading_speedup:.2f}x, MP: {mp_speedup:.2f}x, "
+                    f"Pipelined: {pipelined_speedup:.2f}x")
         
         return comparison
     
-    def _get_recommendation(self, filters: List[str], threading_speedup: float, mp_speedup: float) -> str:
+    def _get_recommendation(self, filters: List[str], threading_speedup: float, mp_speedup: float,
+                            pipelined_speedup: float = None) -> str:
         """💡 Generar recomendación basada en filtros y speedups"""
+
+        # DÍA 4: el pipeline gana cuando I/O y CPU pesan parecido y se pueden solapar
+        if pipelined_speedup and pipelined_speedup > max(threading_speedup, mp_speedup) * 1.1:
+            return (f"Use Pipelined - overlapping I/O threads and CPU processes wins "
+                    f"({pipelined_speedup:.1f}x vs MP {mp_speedup:.1f}x, threading {threading_speedup:.1f}x)")
         
-        # Identificar filtros pesados (CPU-intensivos)
-        heavy_filters = {"sharpen", "heavy_sharpen", "edges", "edge_detection"}
-        has_heavy_filters = any(f in heavy_filters for f in filters)
+        # DÍA 4: CPU-intensivo = la cadena retiene el GIL según el cost model
+        # (sin mediciones aún, la lista por defecto de filtros pesados)
+        has_heavy_filters = self.cost_model.is_cpu_bound(filters)
         
         if has_heavy_filters:
             if mp_speedup > threading_speedup * 1.2:
@@ -313,11 +694,17 @@ class ImageProcessor:
         """📊 Estadísticas del procesador"""
         return {
             'total_processed': self.processed_count,
+            'bytes_read_total': self.bytes_read_total,
             'max_workers': self.max_workers,
             'mp_workers': self.mp_workers,
             'active_threads': threading.active_count(),
             'pil_available': PIL_AVAILABLE,
-            'opencv_available': OPENCV_AVAILABLE
+            'opencv_available': OPENCV_AVAILABLE,
+            'result_cache': get_result_cache().get_stats() if self.use_cache else None,
+            'prefix_cache': get_prefix_cache().get_stats(),
+            'process_pool': self.process_pool.get_stats(),
+            'last_schedule': self.last_schedule,
+            'last_dispatch': self.last_dispatch
         }
 
 # =====================================================================
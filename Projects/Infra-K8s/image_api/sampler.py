@@ -0,0 +1,226 @@
+"""
+📈 System Stats Sampler - DÍA 4: get_server_stats sin bloquear un segundo
+
+get_server_stats llamaba a psutil.cpu_percent(interval=1) en la request: cada
+consulta del dashboard retenía un thread de Django durante un segundo entero.
+Aquí:
+- Un thread daemon (arrancado en ImageApiConfig.ready) muestrea cada
+  STATS_SAMPLER_INTERVAL segundos: CPU, memoria, load average, threads del
+  proceso y procesos del sistema
+- Ring buffer compacto: un array.array tipado por métrica con capacidad fija
+  para la ventana de 15 minutos (~8 bytes por valor, sin dicts por muestra)
+- snapshot() devuelve la última muestra y agregados de 1/5/15 minutos; los
+  tiempos (edad, duración del muestreo, ventanas) van en microsegundos
+- La CPU se calcula con deltas de psutil.cpu_times() propios del sampler: no
+  toca la referencia global de psutil.cpu_percent (que usa workers/monitor.py)
+- Solo muestrea el thread; hasta la primera muestra latest es None
+"""
+
+import os
+import time
+import threading
+from array import array
+from typing import Any, Dict, Optional
+import logging
+
+try:
+    import psutil
+except ImportError:  # pragma: no cover - psutil es opcional
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+STATS_SAMPLER_ENABLED = os.getenv('STATS_SAMPLER_ENABLED', '1') == '1'
+STATS_SAMPLER_INTERVAL = float(os.getenv('STATS_SAMPLER_INTERVAL', 1.0))
+# Segundos hasta la primera muestra: el delta de CPU necesita un intervalo real
+STATS_SAMPLER_FIRST_SAMPLE = 0.5
+
+AGGREGATE_WINDOWS = {'1m': 60, '5m': 300, '15m': 900}
+
+# Métrica → typecode del array ('d' float64, 'l' entero con signo)
+METRICS = {
+    'cpu_percent': 'd',
+    'memory_percent': 'd',
+    'memory_used_bytes': 'd',
+    'load_1': 'd',
+    'threads': 'l',
+    'processes': 'l',
+}
+
+
+class StatsRing:
+    """
+    🔁 Ring buffer de muestras con capacidad fija
+
+    Una columna array.array por métrica más los timestamps monotónicos en µs;
+    escribir una muestra sobrescribe la más antigua sin reservar memoria.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = max(1, capacity)
+        self.timestamps_us = array('q', [0] * self.capacity)
+        self.columns = {name: array(code, [0] * self.capacity) for name, code in METRICS.items()}
+        self._next = 0
+        self.count = 0
+
+    def append(self, timestamp_us: int, sample: Dict[str, float]):
+        index = self._next
+        self.timestamps_us[index] = timestamp_us
+        for name, column in self.columns.items():
+            column[index] = sample[name]
+        self._next = (index + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def latest_index(self) -> Optional[int]:
+        return None if not self.count else (self._next - 1) % self.capacity
+
+    def aggregate(self, since_us: int) -> Dict[str, Any]:
+        """📊 min/avg/max por métrica de las muestras con timestamp >= since_us"""
+        indices = []
+        index = self.latest_index()
+        for _ in range(self.count):
+            if self.timestamps_us[index] < since_us:
+                break
+            indices.append(index)
+            index = (index - 1) % self.capacity
+
+        result: Dict[str, Any] = {'samples': len(indices)}
+        if not indices:
+            return result
+        result['span_us'] = self.timestamps_us[indices[0]] - self.timestamps_us[indices[-1]]
+        for name, column in self.columns.items():
+            values = [column[i] for i in indices]
+            result[name] = {
+                'min': round(min(values), 2),
+                'avg': round(sum(values) / len(values), 2),
+                'max': round(max(values), 2),
+            }
+        return result
+
+    @property
+    def nbytes(self) -> int:
+        return (self.timestamps_us.itemsize + sum(c.itemsize for c in self.columns.values())) * self.capacity
+
+
+class SystemStatsSampler:
+    """
+    📈 Thread de muestreo del sistema
+
+    Uso:
+        sampler = get_stats_sampler()
+        sampler.start()        # idempotente
+        sampler.snapshot()     # {'latest': {...}, 'aggregates': {'1m': ..., '5m': ..., '15m': ...}}
+    """
+
+    def __init__(self, interval: float = None, window_seconds: int = None):
+        self.interval = interval or STATS_SAMPLER_INTERVAL
+        window_seconds = window_seconds or max(AGGREGATE_WINDOWS.values())
+        self.ring = StatsRing(int(window_seconds / self.interval) + 1)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._process = psutil.Process() if psutil else None
+        self._cpu_times = None
+        self.last_sample_cost_us = 0
+        self.errors = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> bool:
+        """▶️ Arrancar el thread (False si psutil no está o ya corre)"""
+        if psutil is None:
+            return False
+        with self._lock:
+            if self.running:
+                return False
+            self._stop.clear()
+            self._cpu_times = psutil.cpu_times()  # Referencia del primer delta de CPU
+            self._thread = threading.Thread(target=self._run, name='stats-sampler', daemon=True)
+            self._thread.start()
+        logger.info(f"📈 Stats sampler started: every {self.interval}s, "
+                    f"{self.ring.capacity} slots ({self.ring.nbytes / 1024:.0f}KB)")
+        return True
+
+    def stop(self, timeout: float = 2.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        # Primera muestra tras un intervalo corto fijo, luego cada self.interval
+        delay = min(self.interval, STATS_SAMPLER_FIRST_SAMPLE)
+        while not self._stop.wait(delay):
+            delay = self.interval
+            try:
+                self.sample()
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"⚠️ Stats sample failed: {e}")
+
+    def _cpu_percent(self) -> float:
+        """% de CPU ocupada desde la muestra anterior (misma fórmula que psutil.cpu_percent)"""
+        times = psutil.cpu_times()
+        previous, self._cpu_times = self._cpu_times, times
+        if previous is None:
+            return 0.0
+        total = sum(times) - sum(previous)
+        idle = (times.idle + getattr(times, 'iowait', 0.0)) - (previous.idle + getattr(previous, 'iowait', 0.0))
+        return round(min(max(100.0 * (1.0 - idle / total), 0.0), 100.0), 1) if total > 0 else 0.0
+
+    def sample(self) -> Dict[str, float]:
+        """📥 Tomar una muestra (no bloquea: cpu_percent es el delta desde la anterior)"""
+        start_ns = time.monotonic_ns()
+        memory = psutil.virtual_memory()
+        sample = {
+            'cpu_percent': self._cpu_percent(),
+            'memory_percent': memory.percent,
+            'memory_used_bytes': memory.total - memory.available,
+            'load_1': os.getloadavg()[0] if hasattr(os, 'getloadavg') else 0.0,
+            'threads': self._process.num_threads(),
+            'processes': len(psutil.pids()),
+        }
+        now_ns = time.monotonic_ns()
+        with self._lock:
+            self.ring.append(now_ns // 1000, sample)
+            self.last_sample_cost_us = (now_ns - start_ns) // 1000
+        return sample
+
+    def snapshot(self) -> Dict[str, Any]:
+        """📊 Última muestra + agregados 1/5/15 min (tiempos en µs)"""
+        now_us = time.monotonic_ns() // 1000
+        with self._lock:
+            index = self.ring.latest_index()
+            latest = None
+            if index is not None:
+                latest = {name: column[index] for name, column in self.ring.columns.items()}
+                latest['age_us'] = now_us - self.ring.timestamps_us[index]
+            aggregates = {
+                label: dict(self.ring.aggregate(now_us - seconds * 1_000_000), window_us=seconds * 1_000_000)
+                for label, seconds in AGGREGATE_WINDOWS.items()
+            }
+            return {
+                'running': self.running,
+                'interval_us': int(self.interval * 1_000_000),
+                'samples': self.ring.count,
+                'capacity': self.ring.capacity,
+                'buffer_bytes': self.ring.nbytes,
+                'sample_cost_us': self.last_sample_cost_us,
+                'errors': self.errors,
+                'latest': latest,
+                'aggregates': aggregates,
+            }
+
+
+_sampler = None
+_sampler_lock = threading.Lock()
+
+
+def get_stats_sampler() -> SystemStatsSampler:
+    """📈 Sampler compartido del proceso"""
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None:
+            _sampler = SystemStatsSampler()
+        return _sampler
@@ -0,0 +1,272 @@
+"""
+📐 LPT Scheduler - DÍA 4: Las imágenes grandes primero
+
+process_batch_threading/multiprocessing enviaban las imágenes en el orden de
+la lista: si el panorama de 20 MB llega el último, todos los workers terminan
+y uno solo sigue con él (straggler) marcando el makespan. El scheduler:
+- Estima el coste de cada (imagen, cadena) con el tamaño leído del header
+  (sin decodificar) y coeficientes ns/píxel por filtro
+- Ordena largest-first (LPT): el pool toma siempre la siguiente tarea más
+  cara, así las pequeñas rellenan los huecos al final
+- Divide los items demasiado grandes (más que la carga media por worker)
+  si su cadena tiene filtros de vecindad: se procesan por tiles en paralelo
+- Predice el makespan FIFO vs LPT para reportar la mejora
+"""
+
+import os
+import heapq
+import math
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_ENABLED = os.getenv('LPT_SCHEDULER_ENABLED', '1').lower() not in ('0', 'false', 'no')
+# Un item se divide si cuesta más que SPLIT_FACTOR × (coste total / workers)
+SCHEDULER_SPLIT_FACTOR = float(os.getenv('LPT_SPLIT_FACTOR', 1.0))
+
+# Coste aproximado en ns por píxel que procesa cada etapa (medido sobre JPEG 2000x1334)
+FILTER_COST_NS = {
+    'resize': 30.0,
+    'blur': 55.0,
+    'brightness': 12.0,
+    'grayscale': 8.0,
+    'sharpen': 45.0,
+    'edges': 300.0,
+}
+DECODE_COST_NS = 8.0
+ENCODE_COST_NS = 6.0
+ITEM_OVERHEAD_S = 0.005
+# process_single_image duerme 0.3 s por filtro cuando la cadena no es válida
+SIMULATED_FILTER_S = 0.3
+
+# Filtros que TiledFilterRunner sabe repartir por tiles
+TILEABLE_FILTERS = {'sharpen', 'blur', 'edges'}
+
+
+@dataclass
+class WorkItem:
+    """📦 Una imagen del lote con su coste estimado"""
+    index: int
+    image_path: str
+    width: int
+    height: int
+    cost: float  # Segundos estimados
+    tileable_cost: float = 0.0  # Parte del coste que se puede repartir por tiles
+    max_pieces: int = 1  # Tiles de la etapa tileable más grande
+    split: int = 1  # Piezas asignadas por el scheduler (1 = sin dividir)
+
+    @property
+    def pixels(self) -> int:
+        return self.width * self.height
+
+    def piece_costs(self) -> List[float]:
+        """Costes de las piezas: la primera lleva la parte no divisible"""
+        if self.split <= 1:
+            return [self.cost]
+        share = self.tileable_cost / self.split
+        return [self.cost - self.tileable_cost + share] + [share] * (self.split - 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data['cost'] = round(self.cost, 4)
+        data['tileable_cost'] = round(self.tileable_cost, 4)
+        return data
+
+
+def available_cpus() -> int:
+    """🖥️ CPUs utilizables por este proceso (afinidad/cgroup cpuset si el SO lo expone)"""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0)) or 1
+    return os.cpu_count() or 1
+
+
+def simulate_makespan(costs: List[float], workers: int) -> float:
+    """
+    ⏱️ List scheduling: cada tarea va al worker que antes queda libre
+
+    Es lo que hace un pool al consumir las tareas en el orden de envío.
+    """
+    finish = [0.0] * max(1, workers)
+    for cost in costs:
+        heapq.heapreplace(finish, finish[0] + cost)
+    return max(finish)
+
+
+class CostModel:
+    """
+    💰 Coste estimado de una cadena sobre una imagen, solo con el header
+
+    Sigue el tamaño a lo largo de la cadena: un resize inicial reduce el decode
+    (mismo plan que DecodePlanner) y todo lo que va detrás trabaja sobre el
+    tamaño destino. Con learned=True los ns/píxel de cada filtro salen del
+    FilterCostModel en cuanto tiene muestras suficientes.
+    """
+
+    def __init__(self, filter_costs_ns: Dict[str, float] = None, header_cache_size: int = 1024,
+                 learned: bool = True):
+        self.filter_costs_ns = dict(FILTER_COST_NS, **(filter_costs_ns or {}))
+        self.learned = learned and not filter_costs_ns
+        self._headers: "OrderedDict[Tuple, Tuple]" = OrderedDict()
+        self._header_cache_size = header_cache_size
+        self._lock = threading.Lock()
+
+    def header(self, image_path: str, filter_names: List[str], filter_params: dict = None) -> Tuple[Tuple[int, int], int]:
+        """📏 (tamaño fuente, escala de decode) leyendo solo el header (memo por mtime/tamaño)"""
+        from .decoding import DecodePlanner
+
+        stat = os.stat(image_path)
+        first = filter_names[0] if filter_names else None
+        resize_params = (filter_params or {}).get('resize') if first == 'resize' else None
+        key = (image_path, stat.st_mtime_ns, stat.st_size, first, repr(resize_params))
+        with self._lock:
+            if key in self._headers:
+                self._headers.move_to_end(key)
+                return self._headers[key]
+
+        plan = DecodePlanner.plan_for_chain(image_path, filter_names, filter_params)
+        value = (plan.source_size, plan.scale)
+        with self._lock:
+            self._headers[key] = value
+            while len(self._headers) > self._header_cache_size:
+                self._headers.popitem(last=False)
+        return value
+
+    def filter_cost_ns(self, filter_name: str) -> float:
+        """ns/píxel de un filtro: aprendido si hay datos, estático si no"""
+        if self.learned:
+            from .cost_model import get_filter_cost_model
+            learned = get_filter_cost_model().wall_ns_per_px(filter_name)
+            if learned is not None:
+                return learned
+        return self.filter_costs_ns.get(filter_name, 0.0)
+
+    def estimate(self, index: int, image_path: str, filter_names: List[str],
+                 filter_params: dict = None) -> WorkItem:
+        """💰 WorkItem con coste total y parte repartible por tiles"""
+        from .filters import FilterFactory
+        from .tiling import TiledFilterRunner
+
+        try:
+            (width, height), scale = self.header(image_path, filter_names, filter_params)
+        except Exception as e:
+            logger.warning(f"⚠️ Scheduler: no header for {image_path} ({e})")
+            return WorkItem(index, image_path, 0, 0, ITEM_OVERHEAD_S)
+
+        if any(name not in FilterFactory.AVAILABLE_FILTERS for name in filter_names):
+            # La cadena falla y se simula: coste fijo independiente del tamaño
+            cost = SIMULATED_FILTER_S * len(filter_names) + ITEM_OVERHEAD_S
+            return WorkItem(index, image_path, width, height, cost)
+
+        w, h = max(1, width // scale), max(1, height // scale)
+        ns = DECODE_COST_NS * w * h
+        tileable_ns, max_pieces = 0.0, 1
+        tile = TiledFilterRunner.tile_size
+        for name in filter_names:
+            stage_ns = self.filter_cost_ns(name) * w * h
+            ns += stage_ns
+            if name in TILEABLE_FILTERS:
+                pieces = math.ceil(w / tile) * math.ceil(h / tile)
+                if pieces > 1:
+                    tileable_ns += stage_ns
+                    max_pieces = max(max_pieces, pieces)
+            if name == 'resize':
+                params = FilterFactory._normalize_params('resize', (filter_params or {}).get('resize', {}))
+                w, h = tuple(params.get('size', (800, 600)))
+        ns += ENCODE_COST_NS * w * h
+
+        return WorkItem(index, image_path, width, height,
+                        cost=ns / 1e9 + ITEM_OVERHEAD_S,
+                        tileable_cost=tileable_ns / 1e9,
+                        max_pieces=max_pieces)
+
+
+@dataclass
+class SchedulePlan:
+    """📋 Orden de envío y makespan previsto"""
+    items: List[WorkItem]  # En orden de envío (LPT)
+    workers: int
+    fifo_makespan: float
+    lpt_makespan: float
+    total_cost: float
+
+    @property
+    def order(self) -> List[int]:
+        return [item.index for item in self.items]
+
+    @property
+    def split_items(self) -> List[WorkItem]:
+        return [item for item in self.items if item.split > 1]
+
+    def to_dict(self) -> Dict[str, Any]:
+        improvement = self.fifo_makespan / self.lpt_makespan if self.lpt_makespan > 0 else 1.0
+        return {
+            'workers': self.workers,
+            'items': len(self.items),
+            'total_cost': round(self.total_cost, 4),
+            'lower_bound': round(self.total_cost / self.workers, 4),
+            'predicted_makespan': {
+                'fifo': round(self.fifo_makespan, 4),
+                'lpt': round(self.lpt_makespan, 4),
+                'improvement': f"{improvement:.2f}x",
+            },
+            'split': [{'image_path': i.image_path, 'pieces': i.split} for i in self.split_items],
+            'order': self.order,
+        }
+
+
+class LPTScheduler:
+    """
+    📐 Longest-processing-time-first para los lotes del ImageProcessor
+
+    Uso:
+        plan = LPTScheduler(workers=4).plan(image_paths, ['sharpen', 'edges'])
+        for item in plan.items:  # el más caro primero
+            submit(item.image_path, tile=item.split > 1)
+    """
+
+    def __init__(self, workers: int, cost_model: CostModel = None, split_factor: float = None):
+        # Más workers que CPUs no dan más paralelismo (CPU-bound): se reparten el tiempo
+        self.workers = max(1, min(workers, available_cpus()))
+        self.cost_model = cost_model or _default_cost_model()
+        self.split_factor = SCHEDULER_SPLIT_FACTOR if split_factor is None else split_factor
+
+    def plan(self, image_paths: List[str], filter_names: List[str], filter_params: dict = None) -> SchedulePlan:
+        """📋 Estimar, decidir divisiones y ordenar largest-first"""
+        items = [self.cost_model.estimate(i, path, filter_names, filter_params)
+                 for i, path in enumerate(image_paths)]
+        total = sum(item.cost for item in items)
+        fifo = simulate_makespan([item.cost for item in items], self.workers)
+
+        # Dividir lo que por sí solo supera la carga media de un worker
+        if self.workers > 1 and self.split_factor > 0:
+            threshold = self.split_factor * total / self.workers
+            for item in items:
+                if item.cost > threshold and item.tileable_cost > 0 and item.max_pieces > 1:
+                    item.split = min(self.workers, item.max_pieces)
+
+        items.sort(key=lambda item: item.cost, reverse=True)
+        pieces = sorted((c for item in items for c in item.piece_costs()), reverse=True)
+        lpt = simulate_makespan(pieces, self.workers)
+
+        plan = SchedulePlan(items=items, workers=self.workers, fifo_makespan=fifo,
+                            lpt_makespan=lpt, total_cost=total)
+        logger.info(f"📐 LPT plan: {len(items)} items, {self.workers} workers, predicted makespan "
+                    f"{fifo:.2f}s -> {lpt:.2f}s, {len(plan.split_items)} split")
+        return plan
+
+
+_cost_model = None
+_cost_model_lock = threading.Lock()
+
+
+def _default_cost_model() -> CostModel:
+    """💰 CostModel compartido del proceso (memo de headers entre requests)"""
+    global _cost_model
+    with _cost_model_lock:
+        if _cost_model is None:
+            _cost_model = CostModel()
+        return _cost_model
@@ -0,0 +1,299 @@
+"""
+📤 Image Serving - DÍA 4: Servir archivos sin copiarlos a Python
+
+serve_4k_image y serve_slow_image leían el JPEG entero a un bytes por
+request: con N descargas en vuelo, N copias del archivo en memoria. Aquí:
+- FileResponse sobre el archivo abierto: con gunicorn (wsgi.file_wrapper)
+  el kernel copia del page cache al socket con os.sendfile; sin sendfile
+  se envía por bloques de SERVING_BLOCK_SIZE, nunca el archivo completo
+- Range (un solo rango, 206/416), ETag + Last-Modified y 304 condicional
+- LRU de metadata de archivos calientes: tamaño, mtime, ETag y content type
+  se reutilizan durante SERVING_META_TTL sin volver a hacer stat()
+"""
+
+import os
+import io
+import time
+import mimetypes
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+import logging
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+logger = logging.getLogger(__name__)
+
+SERVING_META_CACHE_SIZE = int(os.getenv('SERVING_META_CACHE_SIZE', 256))
+# Segundos que una entrada de metadata se considera fresca sin stat()
+SERVING_META_TTL = float(os.getenv('SERVING_META_TTL', 2.0))
+SERVING_BLOCK_SIZE = int(os.getenv('SERVING_BLOCK_SIZE', 256 * 1024))
+SERVING_MAX_AGE = int(os.getenv('SERVING_MAX_AGE', 60))
+
+SERVABLE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp'}
+
+
+@dataclass
+class FileMeta:
+    """📋 Lo necesario para las cabeceras, sin tocar el archivo"""
+    path: str
+    size: int
+    mtime: float
+    inode: int
+    etag: str
+    content_type: str
+    checked_at: float  # time.monotonic() del último stat
+
+    @property
+    def last_modified(self) -> str:
+        return http_date(self.mtime)
+
+    @classmethod
+    def from_stat(cls, path: str, stat: os.stat_result) -> "FileMeta":
+        content_type, _ = mimetypes.guess_type(path)
+        return cls(
+            path=path,
+            size=stat.st_size,
+            mtime=stat.st_mtime,
+            inode=stat.st_ino,
+            # Fuerte: cambia si cambia el contenido (tamaño o mtime) o se reemplaza el archivo
+            etag=f'"{stat.st_ino:x}-{stat.st_size:x}-{stat.st_mtime_ns:x}"',
+            content_type=content_type or 'application/octet-stream',
+            checked_at=time.monotonic(),
+        )
+
+
+class FileMetaCache:
+    """
+    🗂️ LRU de FileMeta con TTL
+
+    Uso:
+        meta = get_file_meta_cache().get('static/images/sample_4k.jpg')  # stat solo si caducó
+    """
+
+    def __init__(self, max_entries: int = None, ttl: float = None):
+        self.max_entries = max_entries or SERVING_META_CACHE_SIZE
+        self.ttl = SERVING_META_TTL if ttl is None else ttl
+        self._entries: "OrderedDict[str, FileMeta]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'stats': 0, 'invalidations': 0}
+
+    def get(self, path: str) -> FileMeta:
+        """📋 Metadata fresca (FileNotFoundError si el archivo no existe)"""
+        now = time.monotonic()
+        with self._lock:
+            meta = self._entries.get(path)
+            if meta is not None and now - meta.checked_at < self.ttl:
+                self._entries.move_to_end(path)
+                self.stats['hits'] += 1
+                return meta
+            self.stats['misses'] += 1
+
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            self.invalidate(path)
+            raise
+        return self.update(path, stat)
+
+    def update(self, path: str, stat: os.stat_result) -> FileMeta:
+        """📋 Registrar un stat/fstat ya hecho (p.ej. el del descriptor abierto)"""
+        meta = FileMeta.from_stat(path, stat)
+        with self._lock:
+            self.stats['stats'] += 1
+            self._entries[path] = meta
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return meta
+
+    def invalidate(self, path: str):
+        with self._lock:
+            if self._entries.pop(path, None) is not None:
+                self.stats['invalidations'] += 1
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.stats, entries=len(self._entries), max_entries=self.max_entries)
+
+
+_meta_cache = None
+_meta_cache_lock = threading.Lock()
+
+
+def get_file_meta_cache() -> FileMetaCache:
+    """🗂️ Cache de metadata compartido del proceso"""
+    global _meta_cache
+    with _meta_cache_lock:
+        if _meta_cache is None:
+            _meta_cache = FileMetaCache()
+        return _meta_cache
+
+# =====================================================================
+# 📤 RESPUESTAS
+# =====================================================================
+
+class _RangeFile(io.RawIOBase):
+    """
+    📤 Vista acotada [start, start+length) de un archivo abierto
+
+    fileno() es el descriptor real, posicionado en start: gunicorn hace
+    sendfile desde ahí con Content-Length como límite. read() nunca pasa del
+    final del rango (fallback sin sendfile, p.ej. runserver).
+    """
+
+    def __init__(self, file, start: int, length: int):
+        super().__init__()
+        self._file = file
+        self._remaining = length
+        file.seek(start)
+
+    def readable(self) -> bool:
+        return True
+
+    def fileno(self) -> int:
+        return self._file.fileno()
+
+    def tell(self) -> int:
+        return self._file.tell()
+
+    def read(self, size: int = -1) -> bytes:
+        if self._remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._file.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+def images_root() -> Path:
+    return Path(settings.STATICFILES_DIRS[0]) / "images"
+
+
+def resolve_image(name: str) -> Optional[Path]:
+    """🔒 static/images/<name> sin salir del directorio (None si no es servible)"""
+    if not name or name != os.path.basename(name) or name.startswith('.'):
+        return None
+    path = images_root() / name
+    if path.suffix.lower() not in SERVABLE_EXTENSIONS:
+        return None
+    return path
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    📐 'bytes=a-b' → (start, end) inclusivo
+
+    None = ignorar la cabecera (sintaxis inválida o varios rangos: se sirve
+    completo, como permite RFC 9110). ValueError = rango no satisfacible.
+    """
+    if not header or not header.startswith('bytes='):
+        return None
+    spec = header[len('bytes='):].strip()
+    if ',' in spec or '-' not in spec:
+        return None
+    first, last = (part.strip() for part in spec.split('-', 1))
+    if (first and not first.isdigit()) or (last and not last.isdigit()) or not (first or last):
+        return None
+    if not first:  # Sufijo: los últimos N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError("unsatisfiable suffix range")
+        return max(0, size - length), size - 1
+    start, end = int(first), int(last) if last else size - 1
+    if start >= size:
+        raise ValueError("range start beyond end of file")
+    if start > end:
+        return None
+    return start, min(end, size - 1)
+
+
+def serve_file(request, path: Path, extra_headers: Dict[str, str] = None, etag: str = None) -> HttpResponse:
+    """
+    📤 GET/HEAD de un archivo con Range, ETag/Last-Modified y 304
+
+    etag sustituye al derivado del stat (p.ej. una clave content-addressed).
+    FileNotFoundError si el archivo no existe (el caller decide el 404).
+    """
+    cache = get_file_meta_cache()
+    path_str = str(path)
+    meta = cache.get(path_str)
+    if etag:
+        meta = replace(meta, etag=f'"{etag}"')
+
+    # 304 / 412 sin abrir el archivo
+    conditional = get_conditional_response(request, etag=meta.etag, last_modified=int(meta.mtime))
+    if conditional is not None:
+        _set_common_headers(conditional, meta, extra_headers)
+        return conditional
+
+    byte_range = None
+    range_header = request.headers.get('Range')
+    if_range = request.headers.get('If-Range')
+    if range_header and (not if_range or _if_range_matches(if_range, meta)):
+        try:
+            byte_range = parse_range(range_header, meta.size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f"bytes */{meta.size}"
+            _set_common_headers(response, meta, extra_headers)
+            return response
+
+    if request.method == 'HEAD':
+        response = HttpResponse(content_type=meta.content_type)
+        response['Content-Length'] = meta.size
+        _set_common_headers(response, meta, extra_headers)
+        return response
+
+    try:
+        file = open(path_str, 'rb')
+    except FileNotFoundError:
+        cache.invalidate(path_str)
+        raise
+    stat = os.fstat(file.fileno())
+    if stat.st_ino != meta.inode or stat.st_size != meta.size or stat.st_mtime != meta.mtime:
+        # El archivo cambió dentro del TTL: cabeceras del descriptor que vamos a enviar
+        meta = cache.update(path_str, stat)
+        if etag:
+            meta = replace(meta, etag=f'"{etag}"')
+        byte_range = None
+
+    if byte_range is not None:
+        start, end = byte_range
+        response = FileResponse(_RangeFile(file, start, end - start + 1), status=206,
+                                content_type=meta.content_type)
+        response['Content-Range'] = f"bytes {start}-{end}/{meta.size}"
+        response['Content-Length'] = end - start + 1
+    else:
+        response = FileResponse(file, content_type=meta.content_type)
+        response['Content-Length'] = meta.size
+    response.block_size = SERVING_BLOCK_SIZE
+    _set_common_headers(response, meta, extra_headers)
+    return response
+
+
+def _if_range_matches(if_range: str, meta: FileMeta) -> bool:
+    """If-Range: el rango solo vale si el validador coincide (si no, 200 completo)"""
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == meta.etag
+    since = parse_http_date_safe(if_range)
+    return since is not None and int(meta.mtime) <= since
+
+
+def _set_common_headers(response: HttpResponse, meta: FileMeta, extra_headers: Dict[str, str] = None):
+    response['ETag'] = meta.etag
+    response['Last-Modified'] = meta.last_modified
+    response['Accept-Ranges'] = 'bytes'
+    response['Cache-Control'] = f"public, max-age={SERVING_MAX_AGE}"
+    for header, value in (extra_headers or {}).items():
+        response[header] = value
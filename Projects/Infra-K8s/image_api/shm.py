@@ -0,0 +1,423 @@
+"""
+🧠 Shared Memory Transport - DÍA 4: Frames entre procesos sin serializar
+
+process_batch_multiprocessing enviaba el ImageProcessor y los resultados por el
+pipe del executor (pickle). Con este transporte los frames decodificados viven
+en un segmento de multiprocessing.shared_memory y entre el padre y los workers
+del pool solo viajan descriptores pequeños (name, shape, dtype, offset):
+
+- El segmento es un anillo de slots de tamaño fijo (entrada + salida de una
+  imagen); el padre decodifica en un slot libre, el worker lee la entrada y
+  escribe la salida en el mismo slot, y el slot se recicla al volver el resultado
+- El anillo está acotado por SHM_MAX_MB: en contenedores /dev/shm suele ser de 64MB
+- El padre es el único dueño del segmento: close()+unlink() al salir del
+  contexto, en atexit, y cleanup_orphans() limpia segmentos de procesos muertos
+"""
+
+import os
+import time
+import uuid
+import atexit
+import pickle
+import threading
+from concurrent.futures import CancelledError, wait, FIRST_COMPLETED
+from dataclasses import dataclass, asdict
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import logging
+
+try:
+    import cv2
+    import numpy as np
+    OPENCV_AVAILABLE = True
+except ImportError:
+    OPENCV_AVAILABLE = False
+    print("⚠️ OpenCV not installed. Run: pip install opencv-python")
+
+from .filters import FilterFactory
+from .decoding import DecodePlanner
+
+logger = logging.getLogger(__name__)
+
+SHM_MAX_BYTES = int(os.getenv('SHM_MAX_MB', 48)) * 1024 * 1024
+SHM_PREFIX = 'imgshm'
+# Segundos que se espera a las tareas ya en ejecución tras un timeout del lote
+SHM_CANCEL_GRACE = float(os.getenv('SHM_CANCEL_GRACE', 5.0))
+SHM_DIR = Path('/dev/shm')
+
+# =====================================================================
+# 📋 DESCRIPTORES
+# =====================================================================
+
+@dataclass(frozen=True)
+class SharedFrame:
+    """📋 Dónde vive un frame: lo único que cruza el pipe del executor"""
+    name: str
+    shape: Tuple[int, ...]
+    dtype: str
+    offset: int
+
+    @property
+    def nbytes(self) -> int:
+        return int(np.prod(self.shape)) * np.dtype(self.dtype).itemsize
+
+    def view(self, shm: shared_memory.SharedMemory):
+        """Vista ndarray sobre el buffer del segmento (sin copia)"""
+        return np.ndarray(self.shape, dtype=self.dtype, buffer=shm.buf, offset=self.offset)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data['shape'] = list(self.shape)
+        return data
+
+
+def chain_output_shape(input_shape: Tuple[int, ...], filter_names: List[str],
+                       filter_params: dict = None) -> Tuple[int, ...]:
+    """📐 Shape del resultado de la cadena fusionada (para reservar el slot de salida)"""
+    filter_params = filter_params or {}
+    shape = tuple(input_shape)
+    for filter_name in filter_names:
+        params = FilterFactory._normalize_params(filter_name, filter_params.get(filter_name, {}))
+        if filter_name == 'resize':
+            width, height = params.get('size', (800, 600))
+            shape = (int(height), int(width)) + shape[2:]
+        elif filter_name in ('grayscale', 'edges'):
+            shape = shape[:2]
+    return shape
+
+# =====================================================================
+# 🔧 LADO WORKER
+# =====================================================================
+
+def shm_filter_task(image_path: str, frame_in: SharedFrame, frame_out: SharedFrame,
+                    filter_names: List[str], filter_params: dict = None,
+                    save: bool = True) -> Dict[str, Any]:
+    """
+    🔧 Ejecutar la cadena fusionada leyendo y escribiendo en memoria compartida
+
+    El worker solo adjunta el segmento: nunca hace unlink (el dueño es el padre).
+    """
+    from .fused import FusedChainExecutor
+
+    start_time = time.time()
+    shm = shared_memory.SharedMemory(name=frame_in.name)
+    try:
+        source = frame_in.view(shm)
+        result = FusedChainExecutor(filter_names, filter_params).run(source, save=save, source_path=image_path)
+        final = result.pop('final_image')
+        if final.shape != frame_out.shape:
+            raise ValueError(f"Unexpected output shape {final.shape}, expected {frame_out.shape}")
+        target = frame_out.view(shm)
+        np.copyto(target, final)
+        del source, target, final  # Soltar las vistas antes de cerrar el segmento
+    finally:
+        shm.close()
+
+    result.update(original_path=image_path, output=frame_out, process_id=os.getpid(),
+                  duration=time.time() - start_time)
+    return result
+
+# =====================================================================
+# 🧠 ANILLO DE SLOTS
+# =====================================================================
+
+_live_segments: Dict[str, shared_memory.SharedMemory] = {}
+_live_lock = threading.Lock()
+
+
+def _release_segment(shm: shared_memory.SharedMemory):
+    """🧹 close()+unlink() idempotente"""
+    with _live_lock:
+        _live_segments.pop(shm.name, None)
+    try:
+        shm.close()
+    except BufferError:
+        logger.warning(f"⚠️ Shared segment {shm.name} still has exported views")
+    try:
+        shm.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def _release_all():
+    for shm in list(_live_segments.values()):
+        _release_segment(shm)
+
+
+atexit.register(_release_all)
+
+
+def cleanup_orphans() -> List[str]:
+    """
+    🧹 Borrar segmentos cuyo proceso dueño ya no existe (p.ej. tras un SIGKILL)
+
+    El nombre lleva el pid del dueño: imgshm_<pid>_<id>
+    """
+    removed = []
+    if not SHM_DIR.exists():
+        return removed
+    for path in SHM_DIR.glob(f'{SHM_PREFIX}_*'):
+        try:
+            pid = int(path.name.split('_')[1])
+            os.kill(pid, 0)
+        except (ValueError, IndexError):
+            continue
+        except ProcessLookupError:
+            path.unlink(missing_ok=True)
+            removed.append(path.name)
+        except PermissionError:
+            continue  # El proceso existe pero es de otro usuario
+    if removed:
+        logger.info(f"🧹 Removed {len(removed)} orphaned shared memory segments")
+    return removed
+
+
+class SharedFrameRing:
+    """
+    🧠 Segmento de memoria compartida dividido en slots reutilizables
+
+    Uso:
+        with SharedFrameRing(slot_bytes, slots) as ring:
+            slot = ring.acquire()
+            ...
+            ring.release(slot)
+    """
+
+    ALIGN = 64  # Alineación de cada slot (línea de caché)
+
+    def __init__(self, slot_bytes: int, slots: int):
+        self.slot_bytes = -(-slot_bytes // self.ALIGN) * self.ALIGN
+        self.slots = max(1, slots)
+        self.shm: Optional[shared_memory.SharedMemory] = None
+        self._free: List[int] = []
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def open(self):
+        name = f"{SHM_PREFIX}_{os.getpid()}_{uuid.uuid4().hex[:12]}"
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=self.slot_bytes * self.slots)
+        with _live_lock:
+            _live_segments[self.shm.name] = self.shm
+        self._free = list(range(self.slots))
+        logger.info(f"🧠 Shared ring {name}: {self.slots} slots x {self.slot_bytes / 1e6:.1f} MB")
+        return self
+
+    def close(self):
+        if self.shm is not None:
+            _release_segment(self.shm)
+            self.shm = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def acquire(self) -> Optional[int]:
+        return self._free.pop() if self._free else None
+
+    def release(self, slot: int):
+        self._free.append(slot)
+
+    def frame(self, slot: int, shape: Tuple[int, ...], dtype: str = 'uint8', offset: int = 0) -> SharedFrame:
+        """Descriptor de un frame dentro de un slot"""
+        return SharedFrame(self.name, tuple(shape), dtype, slot * self.slot_bytes + offset)
+
+# =====================================================================
+# 🚚 TRANSPORTE
+# =====================================================================
+
+def plan_slots(image_paths: List[str], filter_names: List[str],
+               filter_params: dict = None) -> Tuple[Dict[str, Any], int]:
+    """
+    📐 Decode plan + shapes de entrada/salida por fuente, y tamaño máximo de slot
+
+    Returns:
+        ({image_path: (decode_plan, in_shape, out_shape) | Exception}, slot_bytes)
+    """
+    plans = {}
+    slot_bytes = 0
+    for image_path in dict.fromkeys(image_paths):
+        try:
+            decode_plan = DecodePlanner.plan_for_chain(image_path, filter_names, filter_params)
+        except Exception as e:
+            plans[image_path] = e
+            continue
+        width, height = decode_plan.source_size
+        scale = decode_plan.scale
+        # IMREAD_REDUCED_* redondea hacia arriba
+        in_shape = (-(-height // scale), -(-width // scale), 3)
+        out_shape = chain_output_shape(in_shape, filter_names, filter_params)
+        in_bytes = int(np.prod(in_shape))
+        plans[image_path] = (decode_plan, in_shape, out_shape)
+        slot_bytes = max(slot_bytes, -(-in_bytes // SharedFrameRing.ALIGN) * SharedFrameRing.ALIGN
+                         + int(np.prod(out_shape)))
+    return plans, slot_bytes
+
+
+def load_slot(ring: SharedFrameRing, slot: int, image_path: str, decode_plan,
+              in_shape: Tuple[int, ...], out_shape: Tuple[int, ...],
+              filter_names: List[str], filter_params: dict) -> Tuple[SharedFrame, SharedFrame]:
+    """📖 Decodificar en el slot y devolver los descriptores de entrada y salida"""
+    arr = DecodePlanner.decode_bgr(image_path, decode_plan)
+    if arr.shape != in_shape:
+        # p.ej. orientación EXIF que cv2 aplica y el header de PIL no
+        in_shape = arr.shape
+        out_shape = chain_output_shape(in_shape, filter_names, filter_params)
+    frame_in = ring.frame(slot, in_shape)
+    out_offset = -(-frame_in.nbytes // SharedFrameRing.ALIGN) * SharedFrameRing.ALIGN
+    frame_out = ring.frame(slot, out_shape, offset=out_offset)
+    if out_offset + frame_out.nbytes > ring.slot_bytes:
+        raise ValueError(f"Frame {in_shape} -> {out_shape} does not fit a {ring.slot_bytes} byte slot")
+    target = frame_in.view(ring.shm)
+    np.copyto(target, arr)
+    del target
+    return frame_in, frame_out
+
+
+class SharedMemoryTransport:
+    """
+    🚚 Reparte un lote entre los workers del pool moviendo frames por memoria compartida
+
+    Uso:
+        transport = SharedMemoryTransport(get_process_pool())
+        batch = transport.run(paths, ['resize', 'sharpen'])
+    """
+
+    def __init__(self, pool, max_bytes: int = None):
+        self.pool = pool
+        self.max_bytes = max_bytes or SHM_MAX_BYTES
+        cleanup_orphans()
+
+    @staticmethod
+    def _abandon(in_flight: dict, pending: list, results: list, collect: Callable, timeout: float):
+        """
+        ⏱️ Timeout: cerrar el lote antes de desmapear el ring
+
+        El pool es compartido: las tareas aún en cola se cancelan (si no,
+        arrancarían contra un segmento ya borrado) y las que están corriendo
+        tienen SHM_CANCEL_GRACE segundos para terminar. Todo lo que no se
+        entrega queda como registro de error; los slots de las tareas que
+        siguen corriendo no se reciclan (su mapeo sobrevive al unlink).
+        """
+        logger.error(f"❌ No shared-memory task finished in {timeout}s, abandoning "
+                     f"{len(in_flight)} in flight and {len(pending)} pending")
+        for future in in_flight:
+            future.cancel()
+        done, _ = wait(in_flight, timeout=SHM_CANCEL_GRACE)
+        for future in done:
+            collect(future, in_flight.pop(future))
+        for slot, image_path in in_flight.values():
+            results.append({'original_path': image_path, 'error': f"timed out after {timeout}s (still running)"})
+        in_flight.clear()
+        for _, image_path in pending:
+            results.append({'original_path': image_path, 'error': f"not started: batch timed out after {timeout}s"})
+        pending.clear()
+
+    def run(self, image_paths: List[str], filter_names: List[str], filter_params: dict = None,
+            save: bool = True, consumer: Callable[[Dict[str, Any], Any], None] = None,
+            timeout: float = 60.0) -> Dict[str, Any]:
+        """
+        🚀 Procesar el lote
+
+        Args:
+            consumer: callback(result, frame) por imagen; `frame` es una vista del
+                slot válida SOLO durante la llamada (copiarla si se quiere conservar)
+            timeout: segundos sin que termine ninguna tarea; al vencer, lo no
+                entregado vuelve como registros de error y stats['timed_out']
+        Returns:
+            Dict con resultados en orden de completado y estadísticas de IPC
+        """
+        if not OPENCV_AVAILABLE:
+            raise RuntimeError("Shared memory transport requires OpenCV + NumPy")
+
+        filter_params = filter_params or {}
+        for filter_name in filter_names:
+            FilterFactory.get_filter(filter_name)  # Validar antes de reservar memoria
+
+        start_time = time.time()
+        plans, slot_bytes = plan_slots(image_paths, filter_names, filter_params)
+        stats = {'images': len(image_paths), 'slots': 0, 'slot_bytes': slot_bytes,
+                 'frame_bytes_shared': 0, 'ipc_bytes_pickled': 0, 'decode_count': 0, 'timed_out': False}
+        results = []
+        if not slot_bytes:
+            slots = 0
+        else:
+            slots = min(len(image_paths), max(1, self.max_bytes // slot_bytes))
+
+        pending = list(enumerate(image_paths))
+        in_flight = {}
+
+        def collect(future, entry):
+            slot, image_path = entry
+            try:
+                result = future.result()
+                stats['ipc_bytes_pickled'] += len(pickle.dumps(result))
+                frame_out = result['output']
+                stats['frame_bytes_shared'] += frame_out.nbytes
+                if consumer is not None:
+                    frame = frame_out.view(ring.shm)
+                    consumer(result, frame)
+                    del frame
+                result['output'] = frame_out.to_dict()
+                results.append(result)
+            except CancelledError:
+                results.append({'original_path': image_path, 'error': f"cancelled: batch timed out after {timeout}s"})
+            except Exception as e:
+                logger.error(f"❌ Shared memory task error {image_path}: {e}")
+                results.append({'original_path': image_path, 'error': str(e)})
+            finally:
+                ring.release(slot)
+
+        with SharedFrameRing(max(slot_bytes, 1), slots) as ring:
+            stats['slots'] = ring.slots
+            while pending or in_flight:
+                # 📤 Llenar todos los slots libres
+                while pending:
+                    index, image_path = pending[0]
+                    plan = plans.get(image_path)
+                    if isinstance(plan, Exception) or plan is None:
+                        pending.pop(0)
+                        results.append({'original_path': image_path, 'error': str(plan)})
+                        continue
+                    slot = ring.acquire()
+                    if slot is None:
+                        break
+                    pending.pop(0)
+                    decode_plan, in_shape, out_shape = plan
+                    try:
+                        frame_in, frame_out = load_slot(ring, slot, image_path, decode_plan, in_shape, out_shape,
+                                                        filter_names, filter_params)
+                    except Exception as e:
+                        ring.release(slot)
+                        results.append({'original_path': image_path, 'error': str(e)})
+                        continue
+                    stats['decode_count'] += 1
+                    stats['frame_bytes_shared'] += frame_in.nbytes
+                    args = (image_path, frame_in, frame_out, filter_names, filter_params, save)
+                    stats['ipc_bytes_pickled'] += len(pickle.dumps(args))
+                    future = self.pool.submit(shm_filter_task, *args)
+                    in_flight[future] = (slot, image_path)
+
+                if not in_flight:
+                    continue
+
+                # 📥 Recoger lo que termine y reciclar su slot
+                done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    self._abandon(in_flight, pending, results, collect, timeout)
+                    stats['timed_out'] = True
+                    break
+                for future in done:
+                    collect(future, in_flight.pop(future))
+
+        return {
+            'results': results,
+            'filters_applied': filter_names,
+            'transport': 'shared_memory',
+            'duration': time.time() - start_time,
+            'stats': stats,
+        }
@@ -0,0 +1,175 @@
+"""
+📥 Source Reader - DÍA 4: Una sola lectura por imagen
+
+process_single_image leía el archivo completo solo para saber su tamaño y
+después la cadena de filtros lo volvía a abrir (y cada filtro path-based otra
+vez). En un volumen de red eso multiplica las lecturas. SourceFile:
+- Abre el archivo una vez y toma el tamaño de fstat (sin leer)
+- Lee el contenido UNA vez, de forma lazy, a un bytearray reutilizable por
+  thread (SOURCE_IO_MODE=buffer) o a un mmap (SOURCE_IO_MODE=mmap)
+- Ofrece streams sin copia sobre ese buffer para PIL, cv2.imdecode y el hash
+  del cache, y cuenta los bytes realmente leídos
+"""
+
+import io
+import os
+import mmap
+import threading
+from typing import Any, Dict, Optional
+
+from .timings import timed
+
+SOURCE_IO_MODE = os.getenv('SOURCE_IO_MODE', 'buffer')
+# Buffers más grandes que esto no se conservan entre imágenes
+SOURCE_BUFFER_KEEP_MB = int(os.getenv('SOURCE_BUFFER_KEEP_MB', 64))
+
+_local = threading.local()
+
+
+def _thread_buffer(size: int) -> Optional[bytearray]:
+    """
+    ♻️ bytearray del thread, reasignado solo cuando se queda corto
+
+    Si otra SourceFile del mismo thread lo está usando se devuelve uno nuevo.
+    """
+    if getattr(_local, 'in_use', False):
+        return bytearray(size)
+    buffer = getattr(_local, 'buffer', None)
+    if buffer is None or len(buffer) < size:
+        buffer = bytearray(size)
+        if size > SOURCE_BUFFER_KEEP_MB * 1024 * 1024:
+            return buffer
+        _local.buffer = buffer
+    _local.in_use = True
+    return buffer
+
+
+class _ViewReader(io.RawIOBase):
+    """📖 File object de solo lectura sobre un memoryview (sin copiar el buffer)"""
+
+    def __init__(self, view: memoryview):
+        super().__init__()
+        self._view = view
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        n = max(0, min(len(b), len(self._view) - self._pos))
+        b[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._pos = max(0, offset)
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+    def getbuffer(self) -> memoryview:
+        """Mismo contrato que BytesIO.getbuffer (lo usa cv2.imdecode)"""
+        return self._view
+
+    def close(self):
+        self._view = None
+        super().close()
+
+
+class SourceFile:
+    """
+    📥 Imagen fuente abierta una vez y leída como mucho una vez
+
+    Uso:
+        with SourceFile('static/images/sample_4k.jpg') as source:
+            source.size          # fstat, sin leer
+            source.stream()      # file object sin copia (lee el archivo la primera vez)
+            source.bytes_read    # bytes leídos del disco
+    """
+
+    def __init__(self, path: str, mode: str = None):
+        self.path = str(path)
+        self.mode = mode or SOURCE_IO_MODE
+        self._file = open(self.path, 'rb', buffering=0)
+        stat = os.fstat(self._file.fileno())
+        self.size = stat.st_size
+        self.mtime_ns = stat.st_mtime_ns
+        self.bytes_read = 0
+        self.read_calls = 0
+        self._view: Optional[memoryview] = None
+        self._mmap: Optional[mmap.mmap] = None
+        self._streams = []
+        self._owns_thread_buffer = False
+
+    def read(self) -> memoryview:
+        """📖 Contenido completo; solo la primera llamada toca el disco"""
+        if self._view is not None:
+            return self._view
+        with timed('read'):
+            return self._read()
+
+    def _read(self) -> memoryview:
+        # mmap: el tiempo de read es solo el mapeo; los page faults caen en el decode
+        if self.mode == 'mmap' and self.size > 0:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._view = memoryview(self._mmap)
+            self.bytes_read = self.size  # Cada página se pagina una sola vez
+            self.read_calls = 1
+            return self._view
+
+        buffer = _thread_buffer(self.size)
+        self._owns_thread_buffer = buffer is getattr(_local, 'buffer', None)
+        view = memoryview(buffer)[:self.size]
+        while self.bytes_read < self.size:
+            n = self._file.readinto(view[self.bytes_read:])
+            self.read_calls += 1
+            if not n:
+                break
+            self.bytes_read += n
+        self._view = view[:self.bytes_read]
+        return self._view
+
+    def stream(self) -> _ViewReader:
+        """📖 Nuevo file object posicionado al inicio (PIL Image.open, imdecode)"""
+        reader = _ViewReader(self.read())
+        self._streams.append(reader)
+        return reader
+
+    def info(self) -> Dict[str, Any]:
+        """📊 Métricas de I/O de esta imagen"""
+        return {
+            'file_size': self.size,
+            'bytes_read': self.bytes_read,
+            'read_calls': self.read_calls,
+            'io_mode': self.mode,
+        }
+
+    def close(self):
+        """🧹 Soltar vistas, mmap y descriptor"""
+        for reader in self._streams:
+            reader.close()
+        self._streams = []
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._owns_thread_buffer:
+            _local.in_use = False
+            self._owns_thread_buffer = False
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,258 @@
+"""
+🧩 Tiled Filters - DÍA 4: Imágenes gigantes en paralelo
+
+Divide imágenes grandes en tiles con halo (solapamiento) suficiente para cada
+filtro de vecindad, procesa los tiles en un pool de procesos y vuelve a unirlos.
+El resultado es idéntico píxel a píxel al de aplicar el filtro sin tiles:
+- blur: halo = soporte real del Gaussian blur de PIL (3 pasadas de box blur)
+- sharpen: halo = 1 píxel por cada pasada del kernel 3x3
+- edges: Gaussian 5x5 + Sobel + NMS por tile; la histéresis de Canny
+  (que no es local) y la morfología se resuelven sobre la imagen unida
+"""
+
+import os
+import math
+import atexit
+import threading
+import contextlib
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, List, Tuple
+import logging
+
+try:
+    from PIL import Image, ImageFilter
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+try:
+    import cv2
+    import numpy as np
+    OPENCV_AVAILABLE = True
+except ImportError:
+    OPENCV_AVAILABLE = False
+
+from .pool import POOL_START_METHOD
+
+logger = logging.getLogger(__name__)
+
+# =====================================================================
+# 🔧 KERNELS POR TILE (se ejecutan dentro de los workers)
+# =====================================================================
+
+def _sharpen_tile(tile, intensity=3):
+    """⚡ Mismo bucle que heavy_sharpen_filter sobre un tile BGR"""
+    kernel = np.array([[-1, -1, -1],
+                       [-1,  9, -1],
+                       [-1, -1, -1]], dtype=np.float32)
+    sharpened = tile.copy()
+    for _ in range(intensity):
+        sharpened = cv2.filter2D(sharpened, -1, kernel)
+        _ = np.sum(sharpened ** 2)  # Operación costosa (igual que el filtro original)
+    return sharpened
+
+
+def _blur_tile(tile, radius=2.0):
+    """🌫️ Gaussian blur de PIL sobre un tile RGB/L"""
+    blurred = Image.fromarray(tile).filter(ImageFilter.GaussianBlur(radius=radius))
+    return np.asarray(blurred)
+
+
+def _edges_tile(tile, threshold1=100, threshold2=200):
+    """
+    🔍 Parte local de Canny
+
+    Canny(img, t, t) devuelve exactamente los píxeles que sobreviven NMS con
+    magnitud > t. Con el mapa débil (t1) y el fuerte (t2) la histéresis global
+    se reconstruye luego por componentes conectadas.
+    """
+    gray = cv2.cvtColor(tile, cv2.COLOR_BGR2GRAY)
+    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+    low = cv2.Canny(blurred, threshold1, threshold1)
+    high = cv2.Canny(blurred, threshold2, threshold2)
+    for _ in range(5):
+        _ = np.fft.fft2(low)  # Trabajo extra CPU-intensivo, ahora repartido por tile
+    return np.stack([low, high], axis=-1)
+
+
+TILE_KERNELS = {
+    'sharpen': _sharpen_tile,
+    'blur': _blur_tile,
+    'edges': _edges_tile,
+}
+
+
+def _process_tile(filter_name: str, tile, core: Tuple[int, int, int, int], params: dict):
+    """🧩 Ejecutar el kernel sobre tile+halo y devolver solo el núcleo"""
+    out = TILE_KERNELS[filter_name](tile, **params)
+    top, bottom, left, right = core
+    return np.ascontiguousarray(out[top:bottom, left:right])
+
+# =====================================================================
+# 📐 HALOS POR FILTRO
+# =====================================================================
+
+def blur_halo(radius: float, passes: int = 3) -> int:
+    """Soporte del GaussianBlur de PIL: `passes` box blurs de radio extendido"""
+    sigma2 = radius * radius / passes
+    box_radius = math.floor((math.sqrt(12.0 * sigma2 + 1.0) - 1.0) / 2.0)
+    return passes * (box_radius + 1) + 2
+
+
+def filter_halo(filter_name: str, params: dict) -> int:
+    """📐 Píxeles de contexto que necesita cada lado de un tile"""
+    if filter_name == 'sharpen':
+        return int(params.get('intensity', 3))
+    if filter_name == 'blur':
+        return blur_halo(float(params.get('radius', 2.0)))
+    if filter_name == 'edges':
+        return 2 + 1 + 1  # Gaussian 5x5 + Sobel 3x3 + NMS 3x3
+    raise ValueError(f"Filter '{filter_name}' does not support tiling")
+
+# =====================================================================
+# 🏭 RUNNER
+# =====================================================================
+
+class TiledFilterRunner:
+    """
+    🧩 Ejecuta filtros de vecindad por tiles en paralelo
+
+    Se activa automáticamente cuando la imagen supera `threshold_pixels`
+    (env TILING_THRESHOLD_PIXELS, 0 desactiva el tiling).
+    """
+
+    threshold_pixels = int(os.getenv('TILING_THRESHOLD_PIXELS', 12_000_000))
+    tile_size = int(os.getenv('TILING_TILE_SIZE', 1024))
+    max_workers = int(os.getenv('TILING_WORKERS', 0)) or mp.cpu_count()
+
+    _executor = None
+    _executor_pid = None
+    _executor_lock = threading.Lock()
+    _local = threading.local()
+
+    @classmethod
+    def should_tile(cls, height: int, width: int) -> bool:
+        """¿La imagen es lo bastante grande para compensar el tiling?"""
+        threshold = getattr(cls._local, 'threshold_pixels', cls.threshold_pixels)
+        return (OPENCV_AVAILABLE and PIL_AVAILABLE and threshold > 0
+                and height * width > threshold)
+
+    @classmethod
+    @contextlib.contextmanager
+    def forced(cls):
+        """
+        🧩 Tiling para todo lo que ocupe más de un tile, solo en este thread
+
+        Lo usa el LPT scheduler para repartir un item demasiado grande.
+        """
+        previous = getattr(cls._local, 'threshold_pixels', None)
+        cls._local.threshold_pixels = cls.tile_size * cls.tile_size
+        try:
+            yield
+        finally:
+            if previous is None:
+                del cls._local.threshold_pixels
+            else:
+                cls._local.threshold_pixels = previous
+
+    @classmethod
+    def _get_executor(cls):
+        """
+        Pool lazy de procesos en el proceso principal. Dentro de un worker de un
+        ProcessPoolExecutor se usan threads (OpenCV y PIL liberan el GIL).
+
+        Mismo start method que el pool persistente (spawn por defecto): hacer
+        fork de un Django con threads vivos (sampler, pub/sub, requests) puede
+        dejar el hijo bloqueado en un lock heredado.
+        """
+        pid = os.getpid()
+        with cls._executor_lock:
+            if cls._executor is None or cls._executor_pid != pid:
+                if mp.current_process().name == 'MainProcess':
+                    cls._executor = ProcessPoolExecutor(max_workers=cls.max_workers,
+                                                        mp_context=mp.get_context(POOL_START_METHOD))
+                else:
+                    cls._executor = ThreadPoolExecutor(max_workers=cls.max_workers)
+                cls._executor_pid = pid
+                logger.info(f"🧩 Tiling executor started: {type(cls._executor).__name__} x{cls.max_workers}")
+            return cls._executor
+
+    @classmethod
+    def shutdown(cls):
+        """🛑 Cerrar el pool de tiles"""
+        with cls._executor_lock:
+            if cls._executor is not None and cls._executor_pid == os.getpid():
+                cls._executor.shutdown(wait=True)
+            cls._executor = None
+            cls._executor_pid = None
+
+    @staticmethod
+    def _tile_grid(height: int, width: int, tile_size: int, halo: int) -> List[Tuple]:
+        """Generar (región núcleo, región con halo) para cada tile"""
+        grid = []
+        for y0 in range(0, height, tile_size):
+            for x0 in range(0, width, tile_size):
+                y1, x1 = min(y0 + tile_size, height), min(x0 + tile_size, width)
+                hy0, hx0 = max(0, y0 - halo), max(0, x0 - halo)
+                hy1, hx1 = min(height, y1 + halo), min(width, x1 + halo)
+                grid.append(((y0, y1, x0, x1), (hy0, hy1, hx0, hx1)))
+        return grid
+
+    @classmethod
+    def _map_tiles(cls, filter_name: str, arr, params: dict, out_shape: Tuple, out_dtype) -> Any:
+        """Repartir tiles en el pool y coser los núcleos en un buffer de salida"""
+        height, width = arr.shape[:2]
+        halo = filter_halo(filter_name, params)
+        executor = cls._get_executor()
+        output = np.empty(out_shape, dtype=out_dtype)
+
+        futures = []
+        for (y0, y1, x0, x1), (hy0, hy1, hx0, hx1) in cls._tile_grid(height, width, cls.tile_size, halo):
+            core = (y0 - hy0, y1 - hy0, x0 - hx0, x1 - hx0)
+            future = executor.submit(_process_tile, filter_name, arr[hy0:hy1, hx0:hx1], core, params)
+            futures.append(((y0, y1, x0, x1), future))
+
+        for (y0, y1, x0, x1), future in futures:
+            output[y0:y1, x0:x1] = future.result()
+
+        logger.info(f"🧩 {filter_name}: {len(futures)} tiles ({cls.tile_size}px, halo {halo}px)")
+        return output
+
+    @classmethod
+    def sharpen(cls, img_bgr, intensity: int = 3):
+        """⚡ heavy_sharpen por tiles - entrada y salida BGR uint8"""
+        return cls._map_tiles('sharpen', img_bgr, {'intensity': intensity}, img_bgr.shape, img_bgr.dtype)
+
+    @classmethod
+    def blur(cls, image, radius: float = 2.0):
+        """🌫️ GaussianBlur de PIL por tiles - entrada y salida PIL Image"""
+        arr = np.asarray(image)
+        blurred = cls._map_tiles('blur', arr, {'radius': radius}, arr.shape, arr.dtype)
+        return Image.fromarray(blurred, mode=image.mode)
+
+    @classmethod
+    def edges(cls, img_bgr, threshold1: int = 100, threshold2: int = 200):
+        """
+        🔍 Canny + morfología por tiles - entrada BGR, salida mapa de bordes uint8
+
+        Histéresis global: un píxel débil es borde si su componente 8-conexa
+        contiene algún píxel fuerte (lo mismo que hace cv2.Canny).
+        """
+        height, width = img_bgr.shape[:2]
+        maps = cls._map_tiles('edges', img_bgr, {'threshold1': threshold1, 'threshold2': threshold2},
+                              (height, width, 2), np.uint8)
+        low, high = maps[..., 0], maps[..., 1]
+
+        _, labels = cv2.connectedComponents(low, connectivity=8)
+        strong_labels = np.unique(labels[high > 0])
+        strong_labels = strong_labels[strong_labels > 0]
+        edges = np.where(np.isin(labels, strong_labels), 255, 0).astype(np.uint8)
+
+        kernel = np.ones((3, 3), np.uint8)
+        edges = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, kernel)
+        edges = cv2.morphologyEx(edges, cv2.MORPH_OPEN, kernel)
+        return edges
+
+
+atexit.register(TiledFilterRunner.shutdown)
@@ -0,0 +1,208 @@
+"""
+⏱️ Stage Timings - DÍA 4: Dónde se va el tiempo de cada imagen
+
+process_single_image, apply_filter_chain y el worker distribuido solo
+reportaban un processing_time total: no se distinguía un pod atascado en el
+volumen de imágenes de uno saturado de CPU en filter2D. Aquí:
+- ImageTimings acumula nanosegundos monotónicos por etapa de UNA imagen:
+  queue_wait, read, decode, filter.<nombre>, encode, write
+- Se activa por thread (como TiledFilterRunner.forced): SourceFile, el
+  decode, los filtros y save_image registran su etapa en la imagen activa
+  sin que haya que pasar el objeto por todas las firmas
+- StageHistograms agrega las imágenes en histogramas log2 por etapa
+  (fusionables entre procesos y workers) para la API
+"""
+
+import time
+import threading
+import contextlib
+from typing import Any, Dict, Iterator, List, Optional
+
+# Buckets log2 en ns: 2^10 (~1 µs) .. 2^36 (~69 s)
+BUCKET_BOUNDS_NS = [2 ** k for k in range(10, 37)]
+
+_local = threading.local()
+
+
+class ImageTimings:
+    """
+    ⏱️ Nanosegundos por etapa de una imagen
+
+    Uso:
+        timings = ImageTimings()
+        with timings.activate():
+            with timed('decode'):
+                ...
+        timings.to_dict()  # {'stages_ns': {'decode': 1234567}, 'total_ns': ...}
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, int] = {}
+        self.started_ns = time.monotonic_ns()
+        self.finished_ns: Optional[int] = None
+
+    def add(self, stage: str, ns: int):
+        self.stages[stage] = self.stages.get(stage, 0) + max(0, int(ns))
+
+    @contextlib.contextmanager
+    def stage(self, stage: str) -> Iterator[None]:
+        start = time.monotonic_ns()
+        try:
+            yield
+        finally:
+            self.add(stage, time.monotonic_ns() - start)
+
+    @contextlib.contextmanager
+    def activate(self) -> Iterator["ImageTimings"]:
+        """Registrar en esta instancia las etapas que ocurran en este thread"""
+        previous = getattr(_local, 'current', None)
+        _local.current = self
+        try:
+            yield self
+        finally:
+            _local.current = previous
+            self.finished_ns = time.monotonic_ns()
+
+    def to_dict(self) -> Dict[str, Any]:
+        end = self.finished_ns or time.monotonic_ns()
+        return {
+            'stages_ns': dict(self.stages),
+            'total_ns': end - self.started_ns,
+            'clock': 'monotonic_ns',
+        }
+
+
+def current_timings() -> Optional[ImageTimings]:
+    """⏱️ ImageTimings activa en este thread (None si nadie está midiendo)"""
+    return getattr(_local, 'current', None)
+
+
+@contextlib.contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """⏱️ Medir una etapa en la imagen activa (no-op si no hay ninguna)"""
+    timings = current_timings()
+    if timings is None:
+        yield
+        return
+    with timings.stage(stage):
+        yield
+
+
+@contextlib.contextmanager
+def image_timings() -> Iterator[ImageTimings]:
+    """⏱️ Reutilizar la ImageTimings activa o activar una nueva para este bloque"""
+    timings = current_timings()
+    if timings is not None:
+        yield timings
+        return
+    with ImageTimings().activate() as timings:
+        yield timings
+
+# =====================================================================
+# 📊 HISTOGRAMAS
+# =====================================================================
+
+class StageHistograms:
+    """
+    📊 Histograma log2 por etapa con count/sum/max y percentiles aproximados
+
+    snapshot() es JSON-serializable y merge() suma snapshots de varios
+    procesos (p.ej. los workers distribuidos vía heartbeat).
+    """
+
+    def __init__(self):
+        self._stages: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _bucket(ns: int) -> int:
+        for index, bound in enumerate(BUCKET_BOUNDS_NS):
+            if ns <= bound:
+                return index
+        return len(BUCKET_BOUNDS_NS)  # +Inf
+
+    def record_stage(self, stage: str, ns: int):
+        with self._lock:
+            hist = self._stages.setdefault(stage, {'count': 0, 'sum_ns': 0, 'max_ns': 0,
+                                                   'buckets': [0] * (len(BUCKET_BOUNDS_NS) + 1)})
+            hist['count'] += 1
+            hist['sum_ns'] += ns
+            hist['max_ns'] = max(hist['max_ns'], ns)
+            hist['buckets'][self._bucket(ns)] += 1
+
+    def record(self, timings: Optional[Dict[str, Any]]):
+        """📥 Añadir una imagen (dict de ImageTimings.to_dict())"""
+        if not timings:
+            return
+        for stage, ns in timings.get('stages_ns', {}).items():
+            self.record_stage(stage, ns)
+        if timings.get('total_ns') is not None:
+            self.record_stage('total', timings['total_ns'])
+
+    def snapshot(self) -> Dict[str, Any]:
+        """📊 Estado crudo (buckets completos) para fusionar"""
+        with self._lock:
+            return {stage: dict(hist, buckets=list(hist['buckets'])) for stage, hist in self._stages.items()}
+
+    @staticmethod
+    def merge(snapshots: List[Dict[str, Any]]) -> Dict[str, Any]:
+        merged: Dict[str, Dict[str, Any]] = {}
+        for snapshot in snapshots:
+            for stage, hist in (snapshot or {}).items():
+                target = merged.setdefault(stage, {'count': 0, 'sum_ns': 0, 'max_ns': 0,
+                                                   'buckets': [0] * (len(BUCKET_BOUNDS_NS) + 1)})
+                target['count'] += hist['count']
+                target['sum_ns'] += hist['sum_ns']
+                target['max_ns'] = max(target['max_ns'], hist['max_ns'])
+                for index, count in enumerate(hist['buckets'][:len(target['buckets'])]):
+                    target['buckets'][index] += count
+        return merged
+
+    @staticmethod
+    def summarize(snapshot: Dict[str, Any]) -> Dict[str, Any]:
+        """📈 Vista para humanos: ms, percentiles (interpolados en el bucket log2) y buckets no vacíos"""
+        summary = {}
+        for stage, hist in sorted(snapshot.items()):
+            count = hist['count']
+            if not count:
+                continue
+
+            def quantile(q: float) -> float:
+                # Interpolación lineal dentro del bucket que contiene el rango q
+                target, seen = q * count, 0
+                for index, bucket_count in enumerate(hist['buckets']):
+                    if bucket_count and seen + bucket_count >= target:
+                        lower = BUCKET_BOUNDS_NS[index - 1] if index > 0 else 0
+                        upper = min(BUCKET_BOUNDS_NS[index] if index < len(BUCKET_BOUNDS_NS) else hist['max_ns'],
+                                    hist['max_ns'])
+                        lower = min(lower, upper)
+                        return round((lower + (upper - lower) * (target - seen) / bucket_count) / 1e6, 3)
+                    seen += bucket_count
+                return round(hist['max_ns'] / 1e6, 3)
+
+            summary[stage] = {
+                'count': count,
+                'sum_ms': round(hist['sum_ns'] / 1e6, 3),
+                'mean_ms': round(hist['sum_ns'] / count / 1e6, 3),
+                'p50_ms': quantile(0.50),
+                'p95_ms': quantile(0.95),
+                'p99_ms': quantile(0.99),
+                'max_ms': round(hist['max_ns'] / 1e6, 3),
+                'buckets': {
+                    (f"le_{BUCKET_BOUNDS_NS[i] / 1e6:g}ms" if i < len(BUCKET_BOUNDS_NS) else 'le_inf'): n
+                    for i, n in enumerate(hist['buckets']) if n
+                },
+            }
+        return summary
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+
+
+_histograms = StageHistograms()
+
+
+def get_stage_histograms() -> StageHistograms:
+    """📊 Histogramas del proceso"""
+    return _histograms
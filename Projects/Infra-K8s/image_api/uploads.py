@@ -0,0 +1,253 @@
+"""
+📥 Streaming Uploads - DÍA 4: Subidas a un store content-addressed
+
+No había endpoint de subida (los jobs solo podían usar static/images) y
+settings permitía bufferizar 100MB por request en RAM. Aquí:
+- Los chunks del request se escriben a un archivo temporal mientras se
+  calcula el sha256: memoria constante (UPLOAD_CHUNK_SIZE) sea cual sea el
+  tamaño del archivo
+- Sirve para body crudo (application/octet-stream, image/*) y multipart
+  (ContentAddressedUploadHandler sustituye a los handlers de Django)
+- Al terminar se valida la cabecera de imagen y se hace os.replace atómico
+  a <store>/<aa>/<sha256><ext>; si el hash ya existe se descarta el
+  temporal (deduplicación)
+- El store vive en static/processed, el volumen que ya comparten los workers
+"""
+
+import os
+import hashlib
+import tempfile
+import threading
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Optional
+import logging
+
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_STORE_DIR = os.getenv('UPLOAD_STORE_DIR', 'static/processed/uploads')
+UPLOAD_MAX_BYTES = int(os.getenv('UPLOAD_MAX_MB', 512)) * 1024 * 1024
+UPLOAD_CHUNK_SIZE = int(os.getenv('UPLOAD_CHUNK_SIZE', 1024 * 1024))
+
+# Formato PIL → extensión en el store
+STORE_FORMATS = {'JPEG': '.jpg', 'PNG': '.png', 'WEBP': '.webp'}
+
+
+class UploadTooLarge(Exception):
+    """El upload supera UPLOAD_MAX_BYTES (413)"""
+
+
+class UnsupportedUpload(Exception):
+    """El contenido no es una imagen JPEG/PNG/WebP (415)"""
+
+
+@dataclass
+class StoredObject:
+    """📦 Una imagen del store"""
+    hash: str
+    path: str
+    size_bytes: int
+    format: str
+    width: int
+    height: int
+    deduplicated: bool = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class HashingWriter:
+    """
+    ✍️ Archivo temporal + sha256 incremental
+
+    El temporal se crea dentro del store para que el os.replace final sea un
+    rename en el mismo filesystem (atómico).
+    """
+
+    def __init__(self, store: "ContentStore", max_bytes: int = None):
+        self.store = store
+        self.max_bytes = UPLOAD_MAX_BYTES if max_bytes is None else max_bytes
+        self.digest = hashlib.sha256()
+        self.size = 0
+        fd, self.temp_path = tempfile.mkstemp(prefix='upload-', suffix='.part', dir=store.tmp_dir)
+        self._file = os.fdopen(fd, 'wb')
+
+    def write(self, chunk: bytes):
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            self.abort()
+            raise UploadTooLarge(f"upload exceeds {self.max_bytes // (1024 * 1024)}MB")
+        self.digest.update(chunk)
+        self._file.write(chunk)
+
+    def abort(self):
+        if not self._file.closed:
+            self._file.close()
+        try:
+            os.unlink(self.temp_path)
+        except FileNotFoundError:
+            pass
+
+    def commit(self) -> StoredObject:
+        """📦 fsync + validar + mover al store (o descartar si ya existe)"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        try:
+            return self.store.commit(self.temp_path, self.digest.hexdigest(), self.size)
+        except Exception:
+            self.abort()
+            raise
+
+
+class ContentStore:
+    """
+    📦 Store content-addressed en disco
+
+    Uso:
+        stored = get_content_store().ingest(request, max_bytes=...)  # body crudo
+        get_content_store().lookup(stored.hash)                       # Path o None
+    """
+
+    def __init__(self, root: str = None):
+        self.root = Path(root or UPLOAD_STORE_DIR)
+        self.tmp_dir = self.root / 'tmp'
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.stats = {'uploads': 0, 'stored': 0, 'deduplicated': 0, 'rejected': 0, 'bytes_received': 0}
+
+    def _bucket(self, digest: str) -> Path:
+        return self.root / digest[:2]
+
+    def lookup(self, digest: str) -> Optional[Path]:
+        """🔍 Path del objeto con ese sha256 (None si no existe)"""
+        if len(digest) != 64 or any(c not in '0123456789abcdef' for c in digest):
+            return None
+        for ext in STORE_FORMATS.values():
+            path = self._bucket(digest) / f"{digest}{ext}"
+            if path.exists():
+                return path
+        return None
+
+    def writer(self, max_bytes: int = None) -> HashingWriter:
+        return HashingWriter(self, max_bytes)
+
+    def ingest(self, stream: BinaryIO, max_bytes: int = None) -> StoredObject:
+        """📥 Copiar un stream por chunks al store"""
+        writer = self.writer(max_bytes)
+        try:
+            for chunk in iter(lambda: stream.read(UPLOAD_CHUNK_SIZE), b''):
+                writer.write(chunk)
+        except UploadTooLarge:
+            self._count('rejected')
+            raise
+        except Exception:
+            writer.abort()
+            raise
+        return writer.commit()
+
+    def commit(self, temp_path: str, digest: str, size: int) -> StoredObject:
+        """Validar la cabecera y hacer el rename atómico al path content-addressed"""
+        try:
+            with Image.open(temp_path) as image:  # Solo cabecera
+                image_format, (width, height) = image.format, image.size
+        except Exception as e:
+            self._count('rejected')
+            raise UnsupportedUpload("content is not a readable image") from e
+        if image_format not in STORE_FORMATS:
+            self._count('rejected')
+            raise UnsupportedUpload(f"unsupported format {image_format} (expected {sorted(STORE_FORMATS)})")
+
+        final_path = self._bucket(digest) / f"{digest}{STORE_FORMATS[image_format]}"
+        deduplicated = final_path.exists()
+        if deduplicated:
+            os.unlink(temp_path)
+        else:
+            final_path.parent.mkdir(exist_ok=True)
+            # Dos uploads idénticos simultáneos: ambos rename dejan el mismo contenido
+            os.replace(temp_path, final_path)
+
+        with self._lock:
+            self.stats['uploads'] += 1
+            self.stats['bytes_received'] += size
+            self.stats['deduplicated' if deduplicated else 'stored'] += 1
+        return StoredObject(hash=digest, path=str(final_path), size_bytes=size, format=image_format,
+                            width=width, height=height, deduplicated=deduplicated)
+
+    def _count(self, stat: str):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.stats, root=str(self.root), max_bytes=UPLOAD_MAX_BYTES)
+
+# =====================================================================
+# 📨 MULTIPART
+# =====================================================================
+
+class StoredUploadedFile(UploadedFile):
+    """request.FILES[...] de un upload ya movido al store (sin archivo abierto)"""
+
+    def __init__(self, stored: StoredObject, name: str, content_type: str):
+        super().__init__(file=None, name=name, content_type=content_type, size=stored.size_bytes)
+        self.stored = stored
+
+    def close(self):
+        pass
+
+
+class ContentAddressedUploadHandler(FileUploadHandler):
+    """
+    📨 Handler multipart: cada archivo va por chunks al HashingWriter
+
+    Sustituye a MemoryFileUploadHandler/TemporaryFileUploadHandler, así que
+    FILE_UPLOAD_MAX_MEMORY_SIZE no llega a aplicarse: nunca se bufferiza.
+    """
+
+    chunk_size = UPLOAD_CHUNK_SIZE
+
+    def __init__(self, request=None, store: ContentStore = None, max_bytes: int = None):
+        super().__init__(request)
+        self.store = store or get_content_store()
+        self.max_bytes = max_bytes
+        self._writer: Optional[HashingWriter] = None
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self._writer = self.store.writer(self.max_bytes)
+
+    def receive_data_chunk(self, raw_data, start):
+        try:
+            self._writer.write(raw_data)
+        except UploadTooLarge:
+            self.store._count('rejected')
+            raise
+        return None  # Ningún otro handler recibe los datos
+
+    def file_complete(self, file_size):
+        stored = self._writer.commit()
+        self._writer = None
+        return StoredUploadedFile(stored, self.file_name, self.content_type)
+
+    def upload_interrupted(self):
+        if self._writer is not None:
+            self._writer.abort()
+            self._writer = None
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_content_store() -> ContentStore:
+    """📦 Store compartido del proceso"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ContentStore()
+        return _store
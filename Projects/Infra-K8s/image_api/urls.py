@@ -20,6 +20,10 @@ urlpatterns = [
     path('image/4k/', views.serve_4k_image, name='serve_4k_image'),
     path('image/info/', views.get_image_info, name='get_image_info'),
     path('image/slow/', views.serve_slow_image, name='serve_slow_image'),
+    path('image/<str:name>/', views.serve_image, name='serve_image'),
+    path('images/', views.list_images, name='list_images'),
+    path('uploads/', views.upload_image, name='upload_image'),
+    path('uploads/<str:digest>/', views.serve_upload, name='serve_upload'),
     
     # 📊 Estadísticas del servidor
     path('stats/', views.get_server_stats, name='get_server_stats'),
@@ -27,17 +31,27 @@ urlpatterns = [
     # 🚀 PROJECT DAY 1: Batch processing endpoints
     path('process-batch/sequential/', views.process_batch_sequential, name='process_batch_sequential'),
     path('process-batch/threading/', views.process_batch_threading, name='process_batch_threading'),
+    path('process-batch/threading/stream/', views.process_batch_threading_stream, name='process_batch_threading_stream'),
     path('process-batch/compare/', views.compare_performance, name='compare_performance'),
     
     # 🔥 PROJECT DAY 2: Multiprocessing endpoints
     path('process-batch/multiprocessing/', views.process_batch_multiprocessing, name='process_batch_multiprocessing'),
+    path('process-batch/multiprocessing/stream/', views.process_batch_multiprocessing_stream, name='process_batch_multiprocessing_stream'),
     path('process-batch/compare-all/', views.compare_all_methods, name='compare_all_methods'),
     path('process-batch/stress/', views.stress_test, name='stress_test'),
+    path('process-batch/pipelined/', views.process_batch_pipelined, name='process_batch_pipelined'),
+    path('process-batch/auto/', views.process_batch_auto, name='process_batch_auto'),
+    path('process-batch/tensor/', views.process_batch_tensor, name='process_batch_tensor'),
+    path('process-pool/status/', views.process_pool_status, name='process_pool_status'),
+    path('cost-model/', views.cost_model_status, name='cost_model_status'),
+    path('timings/', views.stage_timings, name='stage_timings'),
     
     # 🌐 PROJECT DAY 3: Distributed processing endpoints
     path('process-batch/distributed/', views.process_batch_distributed, name='process_batch_distributed'),
     path('workers/status/', views.workers_status, name='workers_status'),
     path('task/<str:task_id>/status/', views.task_status, name='task_status'),
+    path('task/<str:task_id>/events/', views.task_events, name='task_events'),
+    path('job/<str:job_id>/status/', views.job_status, name='job_status'),
     
     # 📊 Simple monitoring endpoints
     path('metrics/', views.simple_metrics, name='simple_metrics'),
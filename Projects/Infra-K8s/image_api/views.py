@@ -10,11 +10,12 @@ import time
 import json
 import logging
 import threading
+import queue
 import random
 import traceback
 from pathlib import Path
 
-from django.http import HttpResponse, JsonResponse, Http404
+from django.http import JsonResponse, Http404, StreamingHttpResponse
 from django.conf import settings
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
@@ -24,18 +25,32 @@ from django.views import View
 
 # Import distributed components
 from distributed.redis_queue import DistributedTaskQueue
+from distributed.redis_pool import get_pool_stats, get_redis_client
+from distributed.job_manager import JobManager
+from distributed.task_events import TERMINAL_STATES as TASK_TERMINAL_STATES, get_task_event_hub
+from distributed.task_events import current_state as current_task_state
+from .serving import get_file_meta_cache, resolve_image, serve_file
+from .sampler import STATS_SAMPLER_ENABLED, get_stats_sampler
+from .catalog import CATALOG_MAX_PAGE_SIZE, CATALOG_PAGE_SIZE, get_image_catalog
+from .uploads import (STORE_FORMATS, UPLOAD_MAX_BYTES, ContentAddressedUploadHandler, UnsupportedUpload,
+                      UploadTooLarge, get_content_store)
+from .derivatives import (DERIVATIVE_IMMUTABLE_MAX_AGE, DERIVATIVE_MAX_AGE, QUERY_PARAMS,
+                          DerivativeSpec, get_derivative_service)
 
 logger = logging.getLogger(__name__)
 
+# DÍA 4: long-poll (?wait=) y SSE de /api/task/<id>/
+TASK_WAIT_MAX = float(os.getenv('TASK_WAIT_MAX', 60))
+TASK_SSE_HEARTBEAT = float(os.getenv('TASK_SSE_HEARTBEAT', 15))
+TASK_SSE_MAX_SECONDS = float(os.getenv('TASK_SSE_MAX_SECONDS', 600))
+
 def get_available_images():
-    """🖼️ UTILITY: Get available images dynamically - NO MORE HARDCODED LISTS!"""
-    static_images_path = Path('static/images')
-    if static_images_path.exists():
-        valid_extensions = {'.jpg', '.jpeg', '.png', '.webp'}
-        images = []
-        for img_path in static_images_path.glob('*'):
-            if img_path.suffix.lower() in valid_extensions:
-                images.append(str(img_path))
+    """🖼️ UTILITY: Get available images dynamically - NO MORE HARDCODED LISTS!
+
+    DÍA 4: sale del catálogo en memoria (sin glob por request)
+    """
+    images = get_image_catalog().paths()
+    if images:
         return images
     return ["static/images/sample_4k.jpg"]  # Fallback
 
@@ -68,16 +83,23 @@ def task_status(request, task_id):
         
     Returns:
         Detailed task status with failure reasons
+
+    DÍA 4: ?wait=30 hace long-poll (responde en cuanto el task llega a un
+    estado terminal, vía pub/sub) y ?raw=0 omite la copia raw_task_data.
     """
     try:
-        import os
-        redis_host = os.getenv('REDIS_HOST', 'localhost')
-        redis_port = int(os.getenv('REDIS_PORT', 6379))
-        task_queue = DistributedTaskQueue(redis_host, redis_port)
+        wait = _parse_wait(request)
+        task_queue = DistributedTaskQueue(redis_client=get_redis_client())
+        if wait:
+            get_task_event_hub().wait_for_terminal(task_id, wait)
         
         task_status = task_queue.get_task_status(task_id)
         
         if not task_status:
+            # DÍA 4: process_batch_distributed devuelve job_id; redirigir al estado del job
+            job = JobManager(redis_client=task_queue.redis_client).get_job_status(task_id)
+            if job:
+                return JsonResponse(job)
             return JsonResponse({
                 "error": f"Task {task_id} not found",
                 "suggestion": "Verifique que el task_id sea correcto"
@@ -121,7 +143,8 @@ def task_status(request, task_id):
                 status_info['explanation'] = 'Error durante el procesamiento de la imagen'
         
         # Add raw task data for debugging
-        status_info['raw_task_data'] = task_status
+        if request.GET.get('raw', '1') not in ('0', 'false'):
+            status_info['raw_task_data'] = task_status
         
         return JsonResponse(status_info)
         
@@ -131,11 +154,90 @@ def task_status(request, task_id):
         logger.error(f"📋 Full traceback: {traceback.format_exc()}")
         return JsonResponse({"error": str(e)}, status=500)
 
+@require_http_methods(["GET"])
+def job_status(request, job_id):
+    """
+    🧩 Estado de un job fan-out (DÍA 4)
+
+    Progreso parcial (completed/failed/pending, %, ETA) mientras los workers
+    procesan los subtasks; resultado agregado cuando termina el último.
+    ?results=1 incluye los resultados parciales ya registrados; ?wait=30 hace
+    long-poll hasta que el job termina.
+    """
+    try:
+        wait = _parse_wait(request)
+        jobs = JobManager(redis_client=get_redis_client())
+        if wait:
+            get_task_event_hub().wait_for_terminal(job_id, wait)
+        status = jobs.get_job_status(job_id, include_results=request.GET.get('results') in ('1', 'true'))
+        if not status:
+            return JsonResponse({
+                "error": f"Job {job_id} not found",
+                "suggestion": "Verifique el job_id (los jobs expiran a las 24h)"
+            }, status=404)
+        return JsonResponse(status)
+    except Exception as e:
+        logger.error(f"❌ Error getting job status: {e}")
+        return JsonResponse({"error": str(e)}, status=500)
+
+def _parse_wait(request) -> float:
+    """?wait=N segundos de long-poll, acotado a TASK_WAIT_MAX (0 = sin espera)"""
+    try:
+        return min(max(float(request.GET.get('wait', 0)), 0.0), TASK_WAIT_MAX)
+    except ValueError:
+        return 0.0
+
+@require_http_methods(["GET"])
+def task_events(request, task_id):
+    """
+    📣 Server-Sent Events con las transiciones de un task o job (DÍA 4)
+
+    GET /api/task/<id>/events/ → text/event-stream. Primero el estado actual,
+    luego cada evento publicado (processing, running con progreso,
+    completed/failed/partial); el stream se cierra en el estado terminal.
+    Comentarios keep-alive cada TASK_SSE_HEARTBEAT segundos.
+    """
+    hub = get_task_event_hub()
+    try:
+        state = current_task_state(hub.redis_client, task_id)
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=503)
+    if state is None:
+        return JsonResponse({"error": f"Task {task_id} not found"}, status=404)
+
+    def sse(event):
+        return f"event: {event['status']}\ndata: {json.dumps(event)}\n\n"
+
+    def stream():
+        deadline = time.monotonic() + TASK_SSE_MAX_SECONDS
+        with hub.listen(task_id) as events:
+            # Releer tras registrar el listener: ninguna transición se pierde
+            state = current_task_state(hub.redis_client, task_id)
+            yield sse({"task_id": task_id, "status": state, "at": time.time(), "initial": True})
+            while state not in TASK_TERMINAL_STATES and time.monotonic() < deadline:
+                try:
+                    event = events.get(timeout=TASK_SSE_HEARTBEAT)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    # Por si se perdió un evento durante una reconexión del hub
+                    latest = current_task_state(hub.redis_client, task_id)
+                    if latest != state:
+                        state = latest
+                        yield sse({"task_id": task_id, "status": state, "at": time.time()})
+                    continue
+                state = event['status']
+                yield sse(event)
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx: no bufferizar el stream
+    return response
+
 # ============================================================================
 # 🖼️ IMAGE SERVING ENDPOINTS
 # ============================================================================
 
-@require_http_methods(["GET"])
+@require_http_methods(["GET", "HEAD"])
 def serve_4k_image(request):
     """
     🖼️ Endpoint principal: Sirve imagen 4K
@@ -144,6 +246,9 @@ def serve_4k_image(request):
     - Lee archivo grande del disco (4K image)
     - Envía respuesta HTTP
     - Perfecto para testing con concurrencia
+
+    DÍA 4: FileResponse (sendfile) en vez de leer el JPEG a memoria, con
+    Range, ETag/Last-Modified y 304 (ver serving.py)
     """
     start_time = time.time()
     
@@ -152,35 +257,25 @@ def serve_4k_image(request):
     
     logger.info(f"📸 Sirviendo imagen 4K: {image_path}")
     
-    # Verificar que existe la imagen
-    if not image_path.exists():
+    try:
+        # 📤 I/O OPERATION: el archivo se envía por bloques / sendfile, sin copiarlo a Python
+        meta = get_file_meta_cache().get(str(image_path))
+        file_size_mb = meta.size / (1024 * 1024)
+        response = serve_file(request, image_path, {
+            'X-File-Size-MB': f"{file_size_mb:.2f}",
+            'X-Processing-Time': f"{time.time() - start_time:.3f}",
+            'X-IO-Type': "I/O-bound",
+        })
+        logger.info(f"✅ Imagen servida: {file_size_mb:.2f}MB ({response.status_code})")
+        return response
+
+    except FileNotFoundError:
         logger.error(f"❌ Imagen no encontrada: {image_path}")
         return JsonResponse({
             "error": "Imagen 4K no encontrada",
             "message": "Por favor coloca tu imagen 4K en: static/images/sample_4k.jpg",
             "expected_path": str(image_path)
         }, status=404)
-    
-    try:
-        # 📖 I/O OPERATION: Leer archivo del disco
-        with open(image_path, 'rb') as image_file:
-            image_data = image_file.read()
-        
-        # Calcular estadísticas
-        file_size_mb = len(image_data) / (1024 * 1024)
-        processing_time = time.time() - start_time
-        
-        logger.info(f"✅ Imagen servida: {file_size_mb:.2f}MB en {processing_time:.3f}s")
-        
-        # Crear respuesta HTTP con la imagen
-        response = HttpResponse(image_data, content_type='image/jpeg')
-        response['Content-Length'] = len(image_data)
-        response['X-File-Size-MB'] = f"{file_size_mb:.2f}"
-        response['X-Processing-Time'] = f"{processing_time:.3f}"
-        response['X-IO-Type'] = "I/O-bound"
-        
-        return response
-        
     except Exception as e:
         logger.error(f"❌ Error sirviendo imagen: {e}")
         return JsonResponse({
@@ -188,6 +283,58 @@ def serve_4k_image(request):
             "message": str(e)
         }, status=500)
 
+@require_http_methods(["GET", "HEAD"])
+def serve_image(request, name):
+    """
+    🖼️ Cualquier imagen de static/images/ por nombre (DÍA 4)
+
+    GET /api/image/<name>/ con FileResponse (sendfile), Range, ETag/Last-Modified
+    y 304. El nombre no puede contener rutas.
+    DÍA 4: con ?w=&h=&fit=contain|cover|fill&fmt=jpeg|png|webp&q= sirve un
+    derivado generado en la request (cache en disco + coalescing). Con
+    ?v=<hash de la fuente> la URL es inmutable y se cachea un año.
+    """
+    image_path = resolve_image(name)
+    if image_path is None:
+        return JsonResponse({"error": "Nombre de imagen no válido", "name": name}, status=400)
+    try:
+        if any(param in request.GET for param in QUERY_PARAMS):
+            return _serve_derivative(request, image_path)
+        return serve_file(request, image_path)
+    except FileNotFoundError:
+        return JsonResponse({"error": "Imagen no encontrada", "name": name}, status=404)
+    except Exception as e:
+        logger.error(f"❌ Error sirviendo {image_path}: {e}")
+        return JsonResponse({"error": "Error al servir imagen", "message": str(e)}, status=500)
+
+def _serve_derivative(request, image_path):
+    """🖼️ Derivado desde el DerivativeService (400 si los parámetros no son válidos)"""
+    try:
+        spec = DerivativeSpec.from_query(request.GET)
+    except ValueError as e:
+        return JsonResponse({"error": str(e), "params": list(QUERY_PARAMS)}, status=400)
+
+    start_time = time.time()
+    service = get_derivative_service()
+    for attempt in range(2):
+        entry, status = service.get(image_path, spec)
+        src_hash = entry['metadata']['source_hash']
+        versioned = request.GET.get('v') and src_hash.startswith(request.GET['v'])
+        cache_control = (f"public, max-age={DERIVATIVE_IMMUTABLE_MAX_AGE}, immutable" if versioned
+                         else f"public, max-age={DERIVATIVE_MAX_AGE}, stale-while-revalidate=3600")
+        try:
+            return serve_file(request, Path(entry['path']), {
+                'Cache-Control': cache_control,
+                'X-Derivative-Cache': status,
+                'X-Source-Hash': src_hash[:16],
+                'X-Processing-Time': f"{time.time() - start_time:.3f}",
+            }, etag=Path(entry['path']).stem)
+        except FileNotFoundError:
+            if attempt:
+                raise
+            # Desalojado del cache entre el lookup y la apertura: regenerar una vez
+            logger.warning(f"⚠️ Derivative evicted while serving: {entry['path']}")
+
 @require_http_methods(["GET"])
 def get_image_info(request):
     """
@@ -222,7 +369,8 @@ def get_image_info(request):
             "is_4k_size": file_size_mb > 5,  # Rough estimate for 4K image
             "endpoints": {
                 "download": "/api/image/4k/",
-                "slow_version": "/api/image/slow/"
+                "slow_version": "/api/image/slow/",
+                "by_name": f"/api/image/{image_path.name}/"
             }
         })
         
@@ -233,6 +381,128 @@ def get_image_info(request):
         }, status=500)
 
 @require_http_methods(["GET"])
+def list_images(request):
+    """
+    🗂️ Listado paginado del catálogo de imágenes (DÍA 4)
+
+    GET /api/images/?page=1&page_size=50&format=jpeg,png&min_width=&min_height=
+    &min_bytes=&sort=name|size|pixels|mtime (prefijo '-' = descendente)
+    Sale de memoria: dimensiones, formato y hash precalculados.
+    """
+    try:
+        page = int(request.GET.get('page', 1))
+        page_size = int(request.GET.get('page_size', CATALOG_PAGE_SIZE))
+        min_width = int(request.GET.get('min_width', 0))
+        min_height = int(request.GET.get('min_height', 0))
+        min_bytes = int(request.GET.get('min_bytes', 0))
+        if page < 1 or not 1 <= page_size <= CATALOG_MAX_PAGE_SIZE:
+            raise ValueError(f"page must be >= 1 and page_size between 1 and {CATALOG_MAX_PAGE_SIZE}")
+        formats = [f.strip() for f in request.GET.get('format', '').split(',') if f.strip()]
+        formats = ['JPEG' if f.upper() == 'JPG' else f for f in formats]
+        entries = get_image_catalog().list(formats=formats, min_bytes=min_bytes, min_width=min_width,
+                                           min_height=min_height, sort=request.GET.get('sort', 'name'))
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    total = len(entries)
+    pages = max(1, -(-total // page_size))
+    start = (page - 1) * page_size
+    images = []
+    for entry in entries[start:start + page_size]:
+        item = entry.to_dict()
+        item["url"] = f"/api/image/{entry.name}/"
+        images.append(item)
+    return JsonResponse({
+        "images": images,
+        "page": page,
+        "page_size": page_size,
+        "pages": pages,
+        "total": total,
+        "next": page + 1 if page < pages else None,
+        "previous": page - 1 if page > 1 else None,
+    })
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def upload_image(request):
+    """
+    📥 Subida de imágenes al store content-addressed (DÍA 4)
+
+    POST /api/uploads/ con body crudo (Content-Type image/* u
+    application/octet-stream) o multipart con el campo 'file'. Se escribe por
+    chunks a un temporal mientras se calcula el sha256 (memoria constante) y
+    se mueve atómicamente a static/processed/uploads/<aa>/<sha256>.<ext>;
+    subidas idénticas se deduplican (200 en vez de 201).
+    Con ?filters=resize,blur (o enqueue=1) encola además un job distribuido
+    que referencia el hash.
+    """
+    start_time = time.time()
+    store = get_content_store()
+    try:
+        content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        content_length = 0
+    if content_length > UPLOAD_MAX_BYTES:
+        return JsonResponse({"error": f"Upload demasiado grande (máximo {UPLOAD_MAX_BYTES // (1024 * 1024)}MB)"},
+                            status=413)
+
+    try:
+        if request.content_type == 'multipart/form-data':
+            # Antes de tocar request.FILES: ningún handler de Django bufferiza el archivo
+            request.upload_handlers = [ContentAddressedUploadHandler(request, store)]
+            uploaded = request.FILES.get('file')
+            if uploaded is None:
+                return JsonResponse({"error": "Falta el campo 'file' en el multipart"}, status=400)
+            stored = uploaded.stored
+            params = request.POST.copy()
+            params.update(request.GET)
+        else:
+            stored = store.ingest(request)
+            params = request.GET
+    except UploadTooLarge as e:
+        return JsonResponse({"error": str(e)}, status=413)
+    except UnsupportedUpload as e:
+        return JsonResponse({"error": str(e), "accepted": sorted(STORE_FORMATS)}, status=415)
+
+    elapsed = time.time() - start_time
+    response = {
+        "success": True,
+        **stored.to_dict(),
+        "url": f"/api/uploads/{stored.hash}/",
+        "upload_time": round(elapsed, 3),
+        "throughput_mb_s": round(stored.size_bytes / (1024 * 1024) / elapsed, 2) if elapsed > 0 else None,
+    }
+
+    filters = [f.strip() for f in params.get('filters', '').split(',') if f.strip()]
+    if filters or params.get('enqueue') in ('1', 'true'):
+        try:
+            task_id = DistributedTaskQueue(redis_client=get_redis_client()).enqueue_task({
+                'filters': filters or ['resize'],
+                'filter_params': {},
+                'images': [stored.path],
+                'source_hash': stored.hash,
+                'distributed': True,
+            })
+            response["job"] = {"task_id": task_id, "status": "enqueued",
+                               "status_url": f"/api/task/{task_id}/status/"}
+        except Exception as e:
+            # La imagen ya está guardada: el upload no falla por el encolado
+            logger.error(f"❌ Upload enqueue error: {e}")
+            response["job"] = {"status": "error", "error": str(e)}
+
+    logger.info(f"📥 Upload {stored.hash[:12]} {stored.size_bytes / (1024 * 1024):.2f}MB "
+                f"{'dedup' if stored.deduplicated else 'stored'} in {elapsed:.3f}s")
+    return JsonResponse(response, status=200 if stored.deduplicated else 201)
+
+@require_http_methods(["GET", "HEAD"])
+def serve_upload(request, digest):
+    """📤 Imagen subida por su sha256: contenido inmutable, se cachea un año"""
+    path = get_content_store().lookup(digest)
+    if path is None:
+        return JsonResponse({"error": "Upload no encontrado", "hash": digest}, status=404)
+    return serve_file(request, path, {'Cache-Control': "public, max-age=31536000, immutable"}, etag=digest)
+
+@require_http_methods(["GET", "HEAD"])
 def serve_slow_image(request):
     """
     🐌 Endpoint "lento": Simula procesamiento + I/O
@@ -252,29 +522,25 @@ def serve_slow_image(request):
     # Luego servir la imagen normalmente
     image_path = Path(settings.STATICFILES_DIRS[0]) / "images" / "sample_4k.jpg"
     
-    if not image_path.exists():
-        return JsonResponse({
-            "error": "Imagen no encontrada para procesamiento lento",
-            "expected_path": str(image_path)
-        }, status=404)
-    
     try:
-        with open(image_path, 'rb') as image_file:
-            image_data = image_file.read()
-        
+        meta = get_file_meta_cache().get(str(image_path))
         total_time = time.time() - start_time
-        file_size_mb = len(image_data) / (1024 * 1024)
+        file_size_mb = meta.size / (1024 * 1024)
         
         logger.info(f"🐌 Imagen 'procesada' y servida: {total_time:.2f}s total")
         
-        response = HttpResponse(image_data, content_type='image/jpeg')
-        response['X-Processing-Time'] = f"{total_time:.3f}"
-        response['X-Simulated-Delay'] = f"{delay:.1f}"
-        response['X-File-Size-MB'] = f"{file_size_mb:.2f}"
-        response['X-IO-Type'] = "I/O-bound + Processing"
-        
-        return response
+        return serve_file(request, image_path, {
+            'X-Processing-Time': f"{total_time:.3f}",
+            'X-Simulated-Delay': f"{delay:.1f}",
+            'X-File-Size-MB': f"{file_size_mb:.2f}",
+            'X-IO-Type': "I/O-bound + Processing",
+        })
         
+    except FileNotFoundError:
+        return JsonResponse({
+            "error": "Imagen no encontrada para procesamiento lento",
+            "expected_path": str(image_path)
+        }, status=404)
     except Exception as e:
         return JsonResponse({
             "error": "Error en procesamiento lento",
@@ -298,20 +564,34 @@ def get_server_stats(request):
     
     # Información del sistema
     cpu_count = multiprocessing.cpu_count()
-    cpu_percent = psutil.cpu_percent(interval=1)
     memory = psutil.virtual_memory()
     
+    # 🎯 DÍA 4: CPU del sampler en background (antes cpu_percent(interval=1) bloqueaba 1s);
+    # nunca se muestrea en la request: hasta la primera muestra la CPU es null
+    sampler = get_stats_sampler()
+    if STATS_SAMPLER_ENABLED and not sampler.running:
+        sampler.start()
+    sampler_stats = sampler.snapshot()
+    latest = sampler_stats['latest']
+    
     # Información de threading (aproximada)
     active_threads = threading.active_count()
     
     return JsonResponse({
         "system": {
             "cpu_cores": cpu_count,
-            "cpu_usage_percent": cpu_percent,
+            "cpu_usage_percent": latest['cpu_percent'] if latest else None,
             "memory_total_gb": round(memory.total / (1024**3), 2),
             "memory_used_percent": memory.percent,
             "active_threads": active_threads
         },
+        "sampler": sampler_stats,
+        "serving": get_file_meta_cache().get_stats(),
+        "derivatives": get_derivative_service().get_stats(),
+        "redis_pools": get_pool_stats(),
+        "catalog": get_image_catalog().get_stats(),
+        "uploads": get_content_store().get_stats(),
+        "task_events": get_task_event_hub().get_stats(),
         "recommendations": {
             "threading": "Perfecto para este servidor (I/O-bound)",
             "multiprocessing": f"Máximo recomendado: {cpu_count} workers",
@@ -404,7 +684,8 @@ def process_batch_threading(request):
             "total_time": round(total_time, 3),
             "avg_time_per_image": round(total_time / count, 3),
             "speedup_estimate": "🚀 2-3x más rápido que secuencial",
-            "performance": "⚡ RÁPIDO - con threading"
+            "performance": "⚡ RÁPIDO - con threading",
+            "schedule": processor.last_schedule
         })
         
     except Exception as e:
@@ -425,11 +706,8 @@ def compare_performance(request):
         
         processor = ImageProcessor()
         
-        # Usar imágenes reales para ambos tests
-        available_images = [
-            "static/images/sample_4k.jpg",
-            "static/images/Clocktower_Panorama_20080622_20mb.jpg"
-        ]
+        # Usar imágenes reales para ambos tests (catálogo, no una lista fija)
+        available_images = get_available_images()
         
         # Test SECUENCIAL con imágenes REALES
         start_seq = time.time()
@@ -488,6 +766,7 @@ def process_batch_multiprocessing(request):
     Usa ProcessPoolExecutor para bypassed el GIL de Python.
     
     POST body: {"count": 3, "filters": ["heavy_sharpen", "edge_detection"]}
+    DÍA 4: {"transport": "shm"} usa frames en memoria compartida
     """
     try:
         # Parse request
@@ -500,14 +779,8 @@ def process_batch_multiprocessing(request):
         if not any(f in heavy_filters for f in filters):
             logger.warning(f"⚠️ No heavy filters detected in {filters}, MP may not show advantage")
         
-        # Imágenes disponibles
-        static_dir = Path(settings.STATICFILES_DIRS[0])
-        image_dir = static_dir / "images"
-        
-        available_images = []
-        for img_file in image_dir.glob("*.jpg"):
-            if img_file.stat().st_size > 100000:  # > 100KB
-                available_images.append(str(img_file))
+        # Imágenes disponibles (JPEG > 100KB, desde el catálogo)
+        available_images = get_image_catalog().paths(formats={'JPEG'}, min_bytes=100000)
         
         if not available_images:
             return JsonResponse({
@@ -519,9 +792,14 @@ def process_batch_multiprocessing(request):
         processor = ImageProcessor(max_workers=4)
         
         # Test MULTIPROCESSING con imágenes REALES
+        # DÍA 4: "transport": "shm" mueve los frames por memoria compartida
+        transport = data.get('transport', 'pickle')
         start_mp = time.time()
         real_images = [available_images[i % len(available_images)] for i in range(count)]
-        results_mp = processor.process_batch_multiprocessing(real_images, filters)
+        if transport == 'shm':
+            results_mp = processor.process_batch_shared_memory(real_images, filters)
+        else:
+            results_mp = processor.process_batch_multiprocessing(real_images, filters)
         time_mp = time.time() - start_mp
         
         # Contar resultados exitosos
@@ -538,6 +816,8 @@ def process_batch_multiprocessing(request):
             },
             "filters_tested": filters,
             "images_processed": count,
+            "transport": transport,
+            "schedule": processor.last_schedule,
             "process_info": {
                 "mp_workers": processor.mp_workers,
                 "cpu_cores": processor.mp_workers,
@@ -550,6 +830,329 @@ def process_batch_multiprocessing(request):
         logger.error(f"❌ Multiprocessing error: {e}")
         return JsonResponse({"error": str(e)}, status=500)
 
+@require_http_methods(["GET"])
+def process_pool_status(request):
+    """
+    💓 Estado y health check del pool de procesos persistente (DÍA 4)
+
+    GET /api/process-pool/status/?check=1 hace ping a los workers (y reconstruye
+    el pool solo si está roto; un pool ocupado responde status 'busy' con 200);
+    ?timeout= se acota a [POOL_HEALTH_TIMEOUT_MIN, POOL_HEALTH_TIMEOUT_MAX].
+    Sin `check` solo devuelve contadores.
+    """
+    from .pool import POOL_HEALTH_TIMEOUT_MAX, POOL_HEALTH_TIMEOUT_MIN, get_process_pool
+    pool = get_process_pool()
+    response = {"pool": pool.get_stats()}
+    if request.GET.get('check') in ('1', 'true'):
+        try:
+            timeout = float(request.GET.get('timeout', 10))
+        except ValueError:
+            return JsonResponse({"error": "timeout must be a number"}, status=400)
+        timeout = min(max(timeout, POOL_HEALTH_TIMEOUT_MIN), POOL_HEALTH_TIMEOUT_MAX)
+        response["health"] = pool.health_check(timeout=timeout)
+    return JsonResponse(response, status=200 if response.get("health", {}).get("healthy", True) else 503)
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def process_batch_tensor(request):
+    """
+    📦 Procesar lote apilando imágenes del mismo tamaño en un tensor (DÍA 4)
+
+    La cadena corre una vez por grupo de shape en lugar de una vez por imagen.
+    Las imágenes de tamaño único vuelven al camino por imagen.
+
+    POST body: {"count": 32, "filters": ["resize", "brightness", "sharpen", "grayscale"]}
+    """
+    try:
+        data = json.loads(request.body)
+        count = data.get('count', 8)
+        filters = data.get('filters', ['resize', 'brightness', 'sharpen', 'grayscale'])
+
+        available_images = get_available_images()
+        if not available_images:
+            return JsonResponse({
+                "error": "No hay imágenes disponibles para procesamiento",
+                "instructions": "Coloca imágenes .jpg en static/images/"
+            }, status=404)
+
+        from .processors import ImageProcessor
+        processor = ImageProcessor()
+
+        start_batch = time.time()
+        real_images = [available_images[i % len(available_images)] for i in range(count)]
+        results = processor.process_batch_tensor(real_images, filters)
+        time_batch = time.time() - start_batch
+
+        success_count = sum(1 for r in results if r.get('status') == 'success')
+        batched_count = sum(1 for r in results if r.get('filter_status') == 'batch_tensor')
+
+        return JsonResponse({
+            "method": "📦 Batch tensor",
+            "results": {
+                "time": round(time_batch, 3),
+                "processed": len(results),
+                "success_count": success_count,
+                "batched_count": batched_count,
+                "fallback_count": len(results) - batched_count,
+                "throughput": f"{count/time_batch:.2f} images/sec"
+            },
+            "filters_tested": filters,
+            "images_processed": count
+        })
+
+    except Exception as e:
+        logger.error(f"❌ Batch tensor error: {e}")
+        return JsonResponse({"error": str(e)}, status=500)
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def process_batch_pipelined(request):
+    """
+    🏭 Pipeline híbrido: lectura/decode en threads, filtros en procesos, encode en threads (DÍA 4)
+
+    Las etapas se comunican por colas acotadas (backpressure) y los frames por
+    memoria compartida, así disco, CPU y JPEG se solapan entre imágenes.
+
+    POST body: {"count": 8, "filters": ["resize", "sharpen"]}
+    """
+    try:
+        data = json.loads(request.body)
+        count = data.get('count', 8)
+        filters = data.get('filters', ['resize', 'sharpen'])
+
+        available_images = get_available_images()
+        if not available_images:
+            return JsonResponse({
+                "error": "No hay imágenes disponibles para procesamiento",
+                "instructions": "Coloca imágenes .jpg en static/images/"
+            }, status=404)
+
+        processor = ImageProcessor()
+
+        start_pipe = time.time()
+        real_images = [available_images[i % len(available_images)] for i in range(count)]
+        results = processor.process_batch_pipelined(real_images, filters)
+        time_pipe = time.time() - start_pipe
+
+        success_count = sum(1 for r in results if r.get('status') == 'success')
+
+        return JsonResponse({
+            "method": "🏭 Pipelined (threads I/O + processes CPU)",
+            "results": {
+                "time": round(time_pipe, 3),
+                "processed": len(results),
+                "success_count": success_count,
+                "throughput": f"{count/time_pipe:.2f} images/sec"
+            },
+            "pipeline": processor.last_pipeline,
+            "schedule": processor.last_schedule,
+            "filters_tested": filters,
+            "images_processed": count
+        })
+
+    except Exception as e:
+        logger.error(f"❌ Pipelined error: {e}")
+        return JsonResponse({"error": str(e)}, status=500)
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def process_batch_auto(request):
+    """
+    🚦 El cost model elige inline / threads / procesos y workers para el lote (DÍA 4)
+
+    POST body: {"count": 8, "filters": ["resize", "sharpen"]}
+    """
+    try:
+        data = json.loads(request.body)
+        count = data.get('count', 8)
+        filters = data.get('filters', ['resize', 'sharpen'])
+
+        available_images = get_available_images()
+        if not available_images:
+            return JsonResponse({
+                "error": "No hay imágenes disponibles para procesamiento",
+                "instructions": "Coloca imágenes .jpg en static/images/"
+            }, status=404)
+
+        processor = ImageProcessor()
+
+        start_auto = time.time()
+        real_images = [available_images[i % len(available_images)] for i in range(count)]
+        results = processor.process_batch_auto(real_images, filters)
+        time_auto = time.time() - start_auto
+
+        success_count = sum(1 for r in results if r.get('status') == 'success')
+
+        return JsonResponse({
+            "method": f"🚦 Auto ({processor.last_dispatch['executor']})",
+            "results": {
+                "time": round(time_auto, 3),
+                "processed": len(results),
+                "success_count": success_count,
+                "throughput": f"{count/time_auto:.2f} images/sec"
+            },
+            "dispatch": processor.last_dispatch,
+            "schedule": processor.last_schedule,
+            "filters_tested": filters,
+            "images_processed": count
+        })
+
+    except Exception as e:
+        logger.error(f"❌ Auto dispatch error: {e}")
+        return JsonResponse({"error": str(e)}, status=500)
+
+@require_http_methods(["GET"])
+def cost_model_status(request):
+    """
+    🧮 Estimaciones actuales del cost model por filtro (DÍA 4)
+
+    GET /api/cost-model/?filters=resize,sharpen&count=8 añade la decisión que
+    tomaría el dispatcher para ese lote (sin ejecutarlo).
+    """
+    from .cost_model import get_filter_cost_model
+
+    response = {"model": get_filter_cost_model().snapshot()}
+    filters = [f for f in request.GET.get('filters', '').split(',') if f]
+    if filters:
+        available_images = get_available_images()
+        count = int(request.GET.get('count', 8))
+        images = [available_images[i % len(available_images)] for i in range(count)] if available_images else []
+        response["dispatch"] = ImageProcessor().dispatch(images, filters)
+    return JsonResponse(response)
+
+@require_http_methods(["GET"])
+def stage_timings(request):
+    """
+    ⏱️ Histogramas por etapa (queue_wait, read, decode, filter.*, encode, write) (DÍA 4)
+
+    "process" agrega las imágenes de este servidor (incluidos los workers del
+    pool); "distributed" fusiona los que los workers publican en su heartbeat.
+    GET /api/timings/?workers=0 omite la consulta a Redis; ?reset=1 vacía los locales.
+    """
+    from .timings import StageHistograms, get_stage_histograms
+
+    histograms = get_stage_histograms()
+    response = {"clock": "monotonic_ns", "process": StageHistograms.summarize(histograms.snapshot())}
+
+    if request.GET.get('workers', '1') not in ('0', 'false'):
+        try:
+            from distributed.worker_registry import WorkerRegistry
+            registry = WorkerRegistry(redis_client=get_redis_client())
+            snapshots = [w['stage_histograms'] for w in registry.get_active_workers() if w.get('stage_histograms')]
+            response["distributed"] = StageHistograms.summarize(StageHistograms.merge(snapshots))
+            response["workers_reporting"] = len(snapshots)
+        except Exception as e:
+            response["distributed"] = None
+            response["distributed_error"] = str(e)
+
+    if request.GET.get('reset') in ('1', 'true'):
+        histograms.reset()
+    return JsonResponse(response)
+
+# =====================================================================
+# 🌊 DÍA 4: STREAMING NDJSON (resultados según terminan)
+# =====================================================================
+
+def _ndjson_batch_stream(results, method, count, filters):
+    """
+    🌊 Una línea JSON por resultado y un registro resumen al final
+
+    `results` es un generador del ImageProcessor: nada se acumula aquí salvo
+    los contadores del resumen.
+    """
+    start_time = time.time()
+    first_result_time = None
+    processed = success_count = error_count = 0
+
+    try:
+        for result in results:
+            elapsed = time.time() - start_time
+            if first_result_time is None:
+                first_result_time = elapsed
+            processed += 1
+            if result.get('error') or result.get('status') == 'error':
+                error_count += 1
+            elif result.get('status') == 'success':
+                success_count += 1
+            record = {"type": "result", "index": processed - 1, "elapsed": round(elapsed, 4), **result}
+            yield json.dumps(record, default=str) + "\n"
+    except Exception as e:
+        logger.error(f"❌ Streaming {method} error: {e}")
+        yield json.dumps({"type": "error", "error": str(e)}) + "\n"
+
+    total_time = time.time() - start_time
+    yield json.dumps({
+        "type": "summary",
+        "method": method,
+        "processed_count": processed,
+        "requested_count": count,
+        "success_count": success_count,
+        "error_count": error_count,
+        "filters_used": filters,
+        "total_time": round(total_time, 3),
+        "time_to_first_result": round(first_result_time, 3) if first_result_time is not None else None,
+        "throughput": f"{processed/total_time:.2f} images/sec" if total_time > 0 else None
+    }) + "\n"
+
+
+def _ndjson_response(stream):
+    response = StreamingHttpResponse(stream, content_type="application/x-ndjson")
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx: no bufferizar el stream
+    return response
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def process_batch_threading_stream(request):
+    """
+    🌊 Threading con resultados en streaming NDJSON (DÍA 4)
+
+    Cada imagen se envía en cuanto termina; la última línea es el resumen
+    ({"type": "summary", ...}).
+
+    POST body: {"count": 5, "filters": ["resize", "blur", "brightness"]}
+    """
+    try:
+        data = json.loads(request.body)
+        filters = data.get('filters', ['resize', 'blur', 'brightness'])
+        count = data.get('count', 5)
+
+        available_images = get_available_images()
+        real_images = [available_images[i % len(available_images)] for i in range(count)]
+
+        processor = ImageProcessor()
+        results = processor.iter_batch_threading(real_images, filters)
+        return _ndjson_response(_ndjson_batch_stream(results, "threading", count, filters))
+
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def process_batch_multiprocessing_stream(request):
+    """
+    🌊 Multiprocessing (pool persistente) con resultados en streaming NDJSON (DÍA 4)
+
+    POST body: {"count": 3, "filters": ["heavy_sharpen", "edge_detection"]}
+    """
+    try:
+        data = json.loads(request.body)
+        count = data.get('count', 3)
+        filters = data.get('filters', ['heavy_sharpen', 'edge_detection'])
+
+        available_images = get_available_images()
+        real_images = [available_images[i % len(available_images)] for i in range(count)]
+
+        processor = ImageProcessor(max_workers=4)
+        results = processor.iter_batch_multiprocessing(real_images, filters)
+        return _ndjson_response(_ndjson_batch_stream(results, "multiprocessing", count, filters))
+
+    except Exception as e:
+        logger.error(f"❌ Multiprocessing stream error: {e}")
+        return JsonResponse({"error": str(e)}, status=500)
+
 @csrf_exempt  
 @require_http_methods(["POST"])
 def compare_all_methods(request):
@@ -557,6 +1160,7 @@ def compare_all_methods(request):
     📊 Comparar ALL: Sequential vs Threading vs Multiprocessing (DÍA 2)
     
     NUEVO endpoint que ejecuta los 3 métodos y compara resultados.
+    DÍA 4: incluye también el modo pipelined.
     Muestra cuándo usar cada uno.
     
     POST body: {"count": 5, "filters": ["heavy_sharpen", "edge_detection"]}
@@ -567,14 +1171,8 @@ def compare_all_methods(request):
         count = data.get('count', 5)
         filters = data.get('filters', ['heavy_sharpen', 'edge_detection'])
         
-        # Imágenes disponibles
-        static_dir = Path(settings.STATICFILES_DIRS[0])
-        image_dir = static_dir / "images"
-        
-        available_images = []
-        for img_file in image_dir.glob("*.jpg"):
-            if img_file.stat().st_size > 100000:  # > 100KB
-                available_images.append(str(img_file))
+        # Imágenes disponibles (JPEG > 100KB, desde el catálogo)
+        available_images = get_image_catalog().paths(formats={'JPEG'}, min_bytes=100000)
         
         if not available_images:
             return JsonResponse({
@@ -615,6 +1213,7 @@ def stress_test(request):
     Usa multiprocessing para manejar cargas altas.
     
     POST body: {"count": 20, "filters": ["heavy_sharpen", "edge_detection", "resize"]}
+    DÍA 4: "method": "batch_tensor" procesa el lote como tensor N×H×W×C
     """
     try:
         # Parse request
@@ -630,13 +1229,8 @@ def stress_test(request):
                 "requested": count
             }, status=400)
         
-        # Imágenes disponibles
-        static_dir = Path(settings.STATICFILES_DIRS[0])
-        image_dir = static_dir / "images"
-        
-        available_images = []
-        for img_file in image_dir.glob("*.jpg"):
-            available_images.append(str(img_file))
+        # Imágenes disponibles (JPEG, desde el catálogo)
+        available_images = get_image_catalog().paths(formats={'JPEG'})
         
         if not available_images:
             return JsonResponse({
@@ -650,9 +1244,13 @@ def stress_test(request):
         start_stress = time.time()
         test_images = [available_images[i % len(available_images)] for i in range(count)]
         
-        # Usar multiprocessing para el stress test
-        logger.info(f"🔥 Starting stress test: {count} images with filters {filters}")
-        results = processor.process_batch_multiprocessing(test_images, filters)
+        # Usar multiprocessing para el stress test (o el tensor por lotes, DÍA 4)
+        method = data.get('method', 'multiprocessing')
+        logger.info(f"🔥 Starting stress test: {count} images with filters {filters} ({method})")
+        if method == 'batch_tensor':
+            results = processor.process_batch_tensor(test_images, filters)
+        else:
+            results = processor.process_batch_multiprocessing(test_images, filters)
         
         stress_time = time.time() - start_stress
         
@@ -672,7 +1270,7 @@ def stress_test(request):
                 "avg_processing_time": round(avg_processing_time, 3)
             },
             "system_info": {
-                "method": "Multiprocessing",
+                "method": "Batch tensor" if method == 'batch_tensor' else "Multiprocessing",
                 "workers": processor.mp_workers,
                 "filters_applied": filters,
                 "stress_level": "HIGH" if count > 10 else "MEDIUM"
@@ -710,13 +1308,12 @@ def process_batch_distributed(request):
         filters = data.get('filters', ['resize'])
         filter_params = data.get('filter_params', {})
         count = data.get('count', 2)
+        in_memory = data.get('in_memory', False)
         
-        # Initialize distributed components with Docker environment variables
-        import os
-        redis_host = os.getenv('REDIS_HOST', 'localhost')
-        redis_port = int(os.getenv('REDIS_PORT', 6379))
-        task_queue = DistributedTaskQueue(redis_host, redis_port)
-        registry = WorkerRegistry(redis_host, redis_port, redis_db=0)
+        # 🎯 DÍA 4: clientes sobre el pool compartido (REDIS_HOST/REDIS_PORT)
+        redis_client = get_redis_client()
+        task_queue = DistributedTaskQueue(redis_client=redis_client)
+        registry = WorkerRegistry(redis_client=redis_client)
         
         # Check available workers
         active_workers = registry.get_active_workers()
@@ -726,42 +1323,59 @@ def process_batch_distributed(request):
                 "suggestion": "Start workers with: docker-compose up -d"
             }, status=503)
         
-        # Prepare image list - Use real images
-        image_paths = []
-        static_dir = Path(settings.BASE_DIR) / 'static' / 'images'
-        available_images = [
-            'sample_4k.jpg',
-            'Clocktower_Panorama_20080622_20mb.jpg'
-        ]
-        
-        for i in range(count):
-            image_path = static_dir / available_images[i % len(available_images)]
-            image_paths.append(str(image_path))
-        
-        # Enqueue task for distributed processing
-        task_data = {
-            'filters': filters,
-            'filter_params': filter_params,
-            'images': image_paths,
-            'distributed': True
-        }
+        # Prepare image list - Use real images (catalog, largest first)
+        available_images = get_image_catalog().paths(sort='-size')
+        if not available_images:
+            return JsonResponse({
+                "error": "No hay imágenes disponibles",
+                "instructions": "Coloca imágenes en static/images/"
+            }, status=404)
+        image_paths = [available_images[i % len(available_images)] for i in range(count)]
         
         start_time = time.time()
-        task_id = task_queue.enqueue_task(task_data)
-        
-        # Return task ID immediately (ASYNC pattern)
+        if data.get('mode') == 'single':
+            # Modo anterior: un task con todas las imágenes (un solo worker las procesa en serie)
+            task_id = task_queue.enqueue_task({
+                'filters': filters,
+                'filter_params': filter_params,
+                'images': image_paths,
+                'in_memory': in_memory,
+                'distributed': True
+            })
+            return JsonResponse({
+                "success": True,
+                "method": "distributed",
+                "mode": "single",
+                "task_id": task_id,
+                "processing_time": round(time.time() - start_time, 3),
+                "worker_info": {"active_workers": len(active_workers)},
+                "status": "enqueued",
+                "message": f"Task queued successfully - check status with /api/task/{task_id}/status/",
+                "status_url": f"/api/task/{task_id}/status/?wait=30",
+                "events_url": f"/api/task/{task_id}/events/",
+            })
+        
+        # 🎯 DÍA 4: fan-out, un subtask por imagen; el último en terminar hace el fan-in
+        job_id = JobManager(redis_client=redis_client, task_queue=task_queue).create_job(
+            image_paths, filters, filter_params, options={'in_memory': in_memory})
+        
+        # Return job ID immediately (ASYNC pattern)
         total_time = time.time() - start_time
         
         return JsonResponse({
             "success": True,
             "method": "distributed",
-            "task_id": task_id,
+            "mode": "fan_out",
+            "job_id": job_id,
+            "subtasks": len(image_paths),
             "processing_time": round(total_time, 3),
             "worker_info": {
                 "active_workers": len(active_workers)
             },
             "status": "enqueued",
-            "message": "Task queued successfully - check status with /api/task-status/{task_id}",
+            "message": f"Job queued successfully - check progress with /api/job/{job_id}/status/",
+            "status_url": f"/api/job/{job_id}/status/?wait=30",
+            "events_url": f"/api/task/{job_id}/events/",
             "distributed_stats": {
                 "queue_used": True,
                 "fault_tolerant": True,
@@ -790,11 +1404,10 @@ def workers_status(request):
         from distributed.redis_queue import DistributedTaskQueue
         from distributed.worker_registry import WorkerRegistry
         
-        # Use Docker environment variables for Redis connection
-        redis_host = os.getenv('REDIS_HOST', 'localhost')
-        redis_port = int(os.getenv('REDIS_PORT', 6379))
-        registry = WorkerRegistry(redis_host, redis_port, redis_db=0)
-        task_queue = DistributedTaskQueue(redis_host, redis_port)
+        # 🎯 DÍA 4: clientes sobre el pool compartido (REDIS_HOST/REDIS_PORT)
+        redis_client = get_redis_client()
+        registry = WorkerRegistry(redis_client=redis_client)
+        task_queue = DistributedTaskQueue(redis_client=redis_client)
         
         # Get active workers
         active_workers = registry.get_active_workers()
@@ -833,6 +1446,7 @@ def workers_status(request):
                 "task_status_breakdown": queue_stats['status_breakdown']
             },
             "system_capabilities": registry_stats['available_capabilities'],
+            "redis_pools": get_pool_stats(),
             "performance": {
                 "total_tasks_completed": registry_stats['total_tasks_completed'],
                 "total_failures": registry_stats['total_failures'],
@@ -8,8 +8,15 @@ import subprocess
 import sys
 import time
 import platform
+import threading
 from concurrent.futures import ThreadPoolExecutor
 
+API_URL = "http://localhost:8000/api"
+
+# Latencias (s) de las requests de carga, para p50/p95/p99 al final
+LATENCIES = []
+LATENCIES_LOCK = threading.Lock()
+
 def check_requirements():
     """Check if requests is available for advanced testing"""
     try:
@@ -34,13 +41,17 @@ def send_heavy_task_advanced():
     }
     
     try:
+        start = time.perf_counter()
         response = requests.post(
-            "http://localhost:8000/api/process-batch/distributed/",
+            f"{API_URL}/process-batch/distributed/",
             json=payload,
             timeout=10
         )
+        with LATENCIES_LOCK:
+            LATENCIES.append(time.perf_counter() - start)
         if response.status_code == 200:
-            task_id = response.json().get('task_id', 'unknown')[:8]
+            body = response.json()
+            task_id = (body.get('job_id') or body.get('task_id') or 'unknown')[:8]
             print(f"✅ Heavy task sent: {task_id}")
             return True
         else:
@@ -73,6 +84,34 @@ def send_heavy_task_curl():
         print(f"❌ Curl error: {e}")
         return False
 
+def fetch_redis_pools():
+    """🔌 Contadores de los pools Redis del pod de API que responda (None sin requests)"""
+    try:
+        import requests
+        return requests.get(f"{API_URL}/stats/", timeout=10).json().get('redis_pools', {})
+    except Exception as e:
+        print(f"⚠️ No se pudieron leer los pools Redis: {e}")
+        return None
+
+def report_latency_and_churn(pools_before, pools_after):
+    """📈 p50/p95/p99 de las requests y churn de conexiones Redis antes/después"""
+    with LATENCIES_LOCK:
+        samples = sorted(LATENCIES)
+    if samples:
+        def pct(q):
+            return samples[min(len(samples) - 1, int(q * len(samples)))] * 1000
+        print(f"⏱️ Latencia ({len(samples)} requests): p50={pct(0.50):.0f}ms "
+              f"p95={pct(0.95):.0f}ms p99={pct(0.99):.0f}ms")
+    if pools_after is None:
+        return
+    for key, after in pools_after.items():
+        before = (pools_before or {}).get(key, {})
+        created = after['connections_created'] - before.get('connections_created', 0)
+        checkouts = after['checkouts'] - before.get('checkouts', 0)
+        churn = created / checkouts if checkouts else 0.0
+        print(f"🔌 Redis {key}: {created} conexiones nuevas / {checkouts} checkouts "
+              f"(churn {churn:.3f}), abiertas={after['connections_open']}/{after['max_connections']}")
+
 def monitor_hpa():
     """Monitor HPA status with cross-platform pod counting"""
     is_windows = platform.system() == "Windows"
@@ -118,6 +157,7 @@ def stress_test(duration_minutes=5, tasks_per_batch=10):
         max_workers = 3
         tasks_per_batch = min(tasks_per_batch, 5)  # Reduce load for curl method
     
+    pools_before = fetch_redis_pools() if has_requests else None
     end_time = time.time() + (duration_minutes * 60)
     total_sent = 0
     batch_count = 0
@@ -146,6 +186,8 @@ def stress_test(duration_minutes=5, tasks_per_batch=10):
             time.sleep(remaining_time)
     
     print(f"\n🎯 TOTAL ENVIADO: {total_sent} tareas")
+    if has_requests:
+        report_latency_and_churn(pools_before, fetch_redis_pools())
     
     # Final monitoring
     print("\n📊 ESTADO FINAL:")
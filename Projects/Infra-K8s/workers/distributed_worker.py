@@ -22,9 +22,15 @@ import threading
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from distributed.redis_queue import DistributedTaskQueue
+from distributed.redis_pool import get_redis_client
+from distributed.job_manager import JobManager
 from distributed.worker_registry import WorkerRegistry, HeartbeatManager
 from image_api.filters import FilterFactory
 from image_api.processors import ImageProcessor
+from image_api.cache import RESULT_CACHE_ENABLED
+from image_api.source import SourceFile
+from image_api.catalog import get_image_catalog
+from image_api.timings import ImageTimings, get_stage_histograms
 
 # Configure logging
 logging.basicConfig(
@@ -52,15 +58,18 @@ class DistributedImageWorker:
         # Parse capabilities from environment
         capabilities_str = os.getenv('WORKER_CAPABILITIES', 'all')
         if capabilities_str == 'all':
-            self.capabilities = ['resize', 'blur', 'brightness', 'sharpen', 'edges']
+            self.capabilities = ['resize', 'blur', 'brightness', 'grayscale', 'sharpen', 'edges']
         else:
             self.capabilities = [cap.strip() for cap in capabilities_str.split(',')]
         
         self.worker_type = os.getenv('WORKER_TYPE', 'general')
         
         # Initialize components
-        self.task_queue = DistributedTaskQueue(self.redis_host, self.redis_port, redis_db=0)
-        self.registry = WorkerRegistry(self.redis_host, self.redis_port, redis_db=0)
+        # Queue, registry and heartbeat thread share one pooled client
+        self.redis_client = get_redis_client(self.redis_host, self.redis_port, db=0)
+        self.task_queue = DistributedTaskQueue(redis_client=self.redis_client)
+        self.registry = WorkerRegistry(redis_client=self.redis_client)
+        self.job_manager = JobManager(redis_client=self.redis_client, task_queue=self.task_queue)
         self.filter_factory = FilterFactory()
         self.processor = ImageProcessor()
         
@@ -159,8 +168,9 @@ class DistributedImageWorker:
                 logger.info(f"📝 Processing task {task['id']}")
                 self._process_task(task)
                 
-                # Update heartbeat with current stats
-                self.heartbeat_manager.update_stats(**self.stats)
+                # Update heartbeat with current stats (+ stage histograms for /api/timings/)
+                self.heartbeat_manager.update_stats(**self.stats,
+                                                    stage_histograms=get_stage_histograms().snapshot())
                 
             except Exception as e:
                 logger.error(f"❌ Error in processing loop: {e}")
@@ -201,18 +211,24 @@ class DistributedImageWorker:
         """Process a single image task."""
         task_id = task['id']
         task_data = task['data']
+        job_id = task_data.get('job_id')
         
         start_time = time.time()
         
         try:
+            if job_id:
+                self.job_manager.mark_started(job_id, self.worker_id)
+            
             # Extract task parameters
             filters = task_data.get('filters', [])
             filter_params = task_data.get('filter_params', {})
             images = task_data.get('images', [])
+            in_memory = task_data.get('in_memory', False)
+            use_cache = task_data.get('use_cache', RESULT_CACHE_ENABLED)
             
             if not images:
-                # Use default images if none specified - prioritize 20MB image for demo
-                images = ['static/images/Clocktower_Panorama_20080622_20mb.jpg', 'static/images/sample_4k.jpg']
+                # Use default images if none specified - largest two from the catalog for the demo
+                images = get_image_catalog().paths(sort='-size')[:2]
             
             logger.info(f"🖼️ Processing {len(images)} images with filters: {filters}")
             
@@ -221,28 +237,41 @@ class DistributedImageWorker:
             if unsupported_filters:
                 raise ValueError(f"Worker {self.worker_id} cannot handle filters: {unsupported_filters}")
             
+            lean = task_data.get('lean', True)
+            created_at = float(task.get('created_at') or 0)
+
             # Process images
             results = []
             for image_path in images:
+                # Per-stage breakdown in monotonic ns. queue_wait spans hosts
+                # (enqueued by the API, started here), so it uses wall-clock time.
+                timings = ImageTimings()
+                if created_at:
+                    timings.add('queue_wait', time.time_ns() - int(created_at * 1e9))
                 try:
-                    # Simulate file I/O (reading image)
-                    with open(image_path, 'rb') as f:
-                        image_size = len(f.read())
-                    
-                    logger.debug(f"📂 Loaded image {image_path} ({image_size} bytes)")
-                    
-                    # Apply filter chain
-                    filter_results = self.filter_factory.apply_filter_chain(
-                        image_path, filters, filter_params
-                    )
+                    with timings.activate():
+                        # Open once: size from fstat, content read at most once by the chain
+                        source = SourceFile(image_path)
+                        try:
+                            logger.debug(f"📂 Opened image {image_path} ({source.size} bytes)")
+
+                            # Apply filter chain (in-memory chains decode from the same buffer)
+                            filter_results = self.filter_factory.apply_filter_chain(
+                                source if (in_memory or lean) else image_path, filters, filter_params,
+                                in_memory=in_memory, use_cache=use_cache, lean=lean, source_path=image_path
+                            )
+                        finally:
+                            source.close()
                     
                     # Collect results (serialize-safe, no PIL Images)
                     serializable_filter_results = self._make_serializable(filter_results)
+                    get_stage_histograms().record(timings.to_dict())
                     
                     image_results = {
                         'image_path': image_path,
                         'filters_applied': filters,
                         'filter_results': serializable_filter_results,
+                        'timings': timings.to_dict(),
                         'worker_id': self.worker_id,
                         'processing_time': time.time() - start_time
                     }
@@ -298,6 +327,11 @@ class DistributedImageWorker:
                 else:
                     logger.info(f"✅ Task {task_id} completed successfully in {processing_time:.2f}s")
             
+            if job_id:
+                summary = dict(results[0]) if len(results) == 1 else {'results': results}
+                summary.update(task_id=task_id, worker_id=self.worker_id, processing_time=processing_time)
+                self._record_job_subtask(job_id, task_data, summary, failed=len(failed_images) == len(images))
+            
         except Exception as e:
             # Mark task as failed
             self.task_queue.fail_task(task_id, str(e))
@@ -306,6 +340,25 @@ class DistributedImageWorker:
             self.stats['tasks_failed'] += 1
             
             logger.error(f"❌ Task {task_id} failed: {e}")
+            if job_id:
+                self._record_job_subtask(job_id, task_data, {
+                    'task_id': task_id,
+                    'image_path': (task_data.get('images') or [None])[0],
+                    'error': str(e),
+                    'worker_id': self.worker_id,
+                    'processing_time': time.time() - start_time,
+                }, failed=True)
+    
+    def _record_job_subtask(self, job_id: str, task_data: Dict, summary: Dict, failed: bool):
+        """Fan-in: count this subtask in its job; the last one assembles the job result."""
+        try:
+            aggregate = self.job_manager.record_subtask(job_id, task_data.get('job_index', 0), summary, failed=failed)
+            if aggregate is not None:
+                logger.info(f"🧩 Job {job_id} assembled: {aggregate['images_successful']}/"
+                            f"{aggregate['images_processed']} ok in {aggregate['wall_time']:.2f}s "
+                            f"(parallelism {aggregate['parallelism']})")
+        except Exception as e:
+            logger.error(f"❌ Failed to record subtask of job {job_id}: {e}")
     
     def _signal_handler(self, signum, frame):
         """Handle shutdown signals."""